@@ -0,0 +1,300 @@
+"""
+CRUD処理の関数ごとの実行時間とメモリ割り当てを計測するベンチマーク。
+
+    python -m benchmarks.cruds --save baseline.json
+    python -m benchmarks.cruds --baseline baseline.json --threshold 0.2
+
+src/cruds/forum.py・src/cruds/comment.py・src/cruds/search.pyの関数を、10件・1000件・100000件のデータセットで計測する。
+データセットはSQLiteのファイルで、掲示板の件数とforum_id=1のコメントの件数がデータセットの件数となる。
+関数ごとに実行時間の中央値と最小値(ミリ秒)と、tracemallocで計測した1回の呼び出しのメモリ割り当てのピーク(KiB)、
+呼び出し後も解放されずに残ったメモリブロックの件数を出力する。
+--baselineを指定した場合は、実行時間の中央値またはメモリ割り当てのピークが基準値から--thresholdの割合を超えて増えた関数を表示し、
+終了コード1で終了する。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.load import git_commit
+from src import generate_testdata_database
+from src import migrate_database
+from src.cruds import comment as comment_crud
+from src.cruds import forum as forum_crud
+from src.cruds import search as search_crud
+from src.schemas import comment as comment_schema
+from src.schemas import forum as forum_schema
+
+DEFAULT_SIZES: tuple[int, ...] = (10, 1000, 100000)
+# メモリ割り当てのピークの増加を誤差として扱う上限(KiB)
+MIN_PEAK_INCREASE_KIB: float = 16.0
+# データセットの形式を変更した場合に増やし、作成済みのデータセットを再利用しないようにする。
+DATASET_VERSION: int = 2
+
+FORUM_CREATE = forum_schema.ForumCreate(title="ベンチマーク", content="ベンチマークの掲示板")
+COMMENT_CREATE = comment_schema.CommentCreate(comment="ベンチマークのコメント")
+
+
+@dataclass
+class Case:
+    """
+    計測対象の関数の呼び出し
+    function(session, size, iteration)で呼び出す。iterationは0から始まる呼び出し回数。
+    """
+
+    name: str
+    function: Callable[[AsyncSession, int, int], Awaitable[Any]]
+    # データセットの件数から、呼び出せる回数の上限を求める関数(削除など、呼び出すたびにレコードが減る場合に指定する)
+    max_calls: Callable[[int], int] | None = None
+
+
+def _cold(cache: Any, function: Callable[[AsyncSession, int, int], Awaitable[Any]]) -> Callable:
+    """
+    キャッシュを破棄してから呼び出し、データベースから取得する処理を計測する。
+    """
+
+    async def call(session: AsyncSession, size: int, iteration: int) -> Any:
+        cache.clear()
+        return await function(session, size, iteration)
+
+    return call
+
+
+def _get_forum(session: AsyncSession, size: int, iteration: int) -> Awaitable[Any]:
+    return forum_crud.get_forum(session, forum_id=size // 2)
+
+
+def _get_comment(session: AsyncSession, size: int, iteration: int) -> Awaitable[Any]:
+    return comment_crud.get_comment(session, forum_id=1, comment_id=size // 2)
+
+
+CASES: list[Case] = [
+    Case("forum.get_forums[limit=20]", lambda session, size, iteration: forum_crud.get_forums(session, limit=20)),
+    Case("forum.get_forums[all]", lambda session, size, iteration: forum_crud.get_forums(session)),
+    Case("forum.get_forums_etag[limit=20]", lambda session, size, iteration: forum_crud.get_forums_etag(session, limit=20)),
+    Case("forum.get_forum", _cold(forum_crud.forum_cache, _get_forum)),
+    Case("forum.get_forum[cached]", _get_forum),
+    Case("forum.create_forum", lambda session, size, iteration: forum_crud.create_forum(session, FORUM_CREATE)),
+    Case(
+        "forum.create_forums[100]",
+        lambda session, size, iteration: forum_crud.create_forums(session, [FORUM_CREATE] * 100),
+    ),
+    Case(
+        "forum.edit_forum",
+        lambda session, size, iteration: forum_crud.edit_forum(session, iteration % size + 1, FORUM_CREATE),
+    ),
+    # forum_id=1はコメントを持つため、末尾の掲示板から削除し、forum_id=1は削除しない。
+    Case(
+        "forum.delete_forum",
+        lambda session, size, iteration: forum_crud.delete_forum(session, size - iteration),
+        max_calls=lambda size: size - 1,
+    ),
+    Case(
+        "forum.get_forums[activity,limit=20]",
+        lambda session, size, iteration: forum_crud.get_forums(session, limit=20, sort="activity"),
+    ),
+    Case(
+        "forum.reconcile_comment_counts[1000]",
+        lambda session, size, iteration: forum_crud.reconcile_comment_counts(session, 1, min(size, 1000)),
+    ),
+    Case(
+        "comment.get_comments[limit=50]",
+        lambda session, size, iteration: comment_crud.get_comments(session, 1, limit=50, after_comment_id=size // 2),
+    ),
+    Case("comment.get_comments[all]", lambda session, size, iteration: comment_crud.get_comments(session, 1)),
+    Case(
+        "comment.get_comments_etag[limit=50]",
+        lambda session, size, iteration: comment_crud.get_comments_etag(session, 1, limit=50, after_comment_id=size // 2),
+    ),
+    Case("comment.get_comment", _cold(comment_crud.comment_cache, _get_comment)),
+    Case("comment.get_comment[cached]", _get_comment),
+    Case("comment.create_comment", lambda session, size, iteration: comment_crud.create_comment(session, 1, COMMENT_CREATE)),
+    Case(
+        "comment.create_comments[100]",
+        lambda session, size, iteration: comment_crud.create_comments(session, 1, [COMMENT_CREATE] * 100),
+    ),
+    Case(
+        "comment.edit_comment",
+        lambda session, size, iteration: comment_crud.edit_comment(session, 1, iteration % size + 1, COMMENT_CREATE),
+    ),
+    Case(
+        "comment.delete_comment",
+        lambda session, size, iteration: comment_crud.delete_comment(session, 1, size - iteration),
+        max_calls=lambda size: size,
+    ),
+    Case("search.search[1 term]", lambda session, size, iteration: search_crud.search(session, "音楽", limit=20)),
+    Case("search.search[2 terms]", lambda session, size, iteration: search_crud.search(session, "音楽 旅行", limit=20)),
+]
+
+
+async def create_dataset(path: Path, size: int) -> None:
+    """
+    size件の掲示板と、forum_id=1にsize件のコメントを持つデータセットを、検索用の索引とともに作成する。
+    """
+    url: str = f"sqlite+aiosqlite:///{path}"
+    engine: AsyncEngine = create_async_engine(url)
+    counts = array("q", [size] + [0] * (size - 1))
+    rng = random.Random(0)
+    # 進捗は標準エラー出力に出力する。
+    with contextlib.redirect_stdout(sys.stderr):
+        async with engine.connect() as connection:
+            await connection.run_sync(migrate_database.upgrade)
+            await connection.commit()
+            await generate_testdata_database.insert_rows(
+                connection,
+                generate_testdata_database.ForumTable,
+                generate_testdata_database.forum_rows(1, counts, rng),
+                5000,
+                generate_testdata_database.forum_document,
+            )
+            await generate_testdata_database.insert_rows(
+                connection,
+                generate_testdata_database.CommentTable,
+                generate_testdata_database.comment_rows(1, counts, rng),
+                5000,
+                generate_testdata_database.comment_document,
+            )
+    await engine.dispose()
+    return None
+
+
+async def measure(path: Path, size: int, case: Case, repeat: int) -> dict:
+    """
+    データセットの複製に対して関数をrepeat回呼び出し、実行時間とメモリ割り当てを計測する。
+    メモリ割り当ては実行時間に影響するため、実行時間の計測とは別に1回だけ計測する。
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        copy: Path = Path(directory) / path.name
+        shutil.copyfile(path, copy)
+        engine: AsyncEngine = create_async_engine(f"sqlite+aiosqlite:///{copy}")
+        async_session = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)  # type: ignore
+        forum_crud.forum_cache.clear()
+        comment_crud.comment_cache.clear()
+        iteration: int = 0
+
+        async def call() -> None:
+            nonlocal iteration
+            async with async_session() as session:  # type: ignore
+                await case.function(session, size, iteration)
+            iteration += 1
+            return None
+
+        # 接続の作成やクエリのコンパイルを計測に含めないように、1回実行しておく。
+        await call()
+        timings: list[float] = list()
+        for _ in range(repeat):
+            started: float = time.perf_counter()
+            await call()
+            timings.append(time.perf_counter() - started)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        await call()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        await engine.dispose()
+    retained_blocks: int = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "min_ms": round(min(timings) * 1000, 4),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    実行時間の中央値またはメモリ割り当てのピークが、基準値からthresholdの割合を超えて増えた関数を取得する。
+    メモリ割り当てのピークは、増加量がMIN_PEAK_INCREASE_KIB未満の場合は誤差として扱う。
+    """
+    regressions: list[str] = list()
+    for size, cases in results.items():
+        for name, result in cases.items():
+            base: dict | None = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for key, unit in (("median_ms", "ms"), ("peak_kib", "KiB")):
+                if base[key] == 0:
+                    continue
+                change: float = result[key] / base[key] - 1
+                if change <= threshold:
+                    continue
+                if key == "peak_kib" and result[key] - base[key] < MIN_PEAK_INCREASE_KIB:
+                    continue
+                regressions.append(
+                    f"{name} (size={size}) {key}: {base[key]:.3f}{unit} -> {result[key]:.3f}{unit} ({change:+.1%})"
+                )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    data_directory: Path = args.data_directory
+    data_directory.mkdir(parents=True, exist_ok=True)
+    cases: list[Case] = [case for case in CASES if args.only is None or any(word in case.name for word in args.only)]
+    results: dict[str, dict[str, dict]] = dict()
+    for size in args.sizes:
+        path: Path = data_directory / f"cruds_v{DATASET_VERSION}_{size}.db"
+        if not path.exists():
+            await create_dataset(path, size)
+        results[str(size)] = dict()
+        for case in cases:
+            # 準備の1回とメモリ割り当ての計測の1回を含めて、呼び出す回数がmax_callsを超えないようにする。
+            repeat: int = args.repeat if case.max_calls is None else min(args.repeat, case.max_calls(size) - 2)
+            result: dict = await measure(path, size, case, repeat)
+            results[str(size)][case.name] = result
+            print(
+                f"{size:>7} {case.name:<40} median {result['median_ms']:>10.3f}ms  min {result['min_ms']:>10.3f}ms"
+                f"  peak {result['peak_kib']:>10.1f}KiB  retained {result['retained_blocks']:>6}",
+                file=sys.stderr,
+            )
+    report: dict = {"commit": git_commit(), "repeat": args.repeat, "results": results}
+    if args.save is not None:
+        Path(args.save).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.baseline is None:
+        return 0
+    baseline: dict = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    regressions: list[str] = find_regressions(results, baseline["results"], args.threshold)
+    if len(regressions) > 0:
+        print(f"{baseline.get('commit')}から{args.threshold:.0%}を超えて遅くなった関数があります。", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    print(f"{baseline.get('commit')}から{args.threshold:.0%}を超えて遅くなった関数はありません。", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="データセットの件数")
+    parser.add_argument("--repeat", type=int, default=20, help="関数ごとの計測回数(既定値: 20)")
+    parser.add_argument("--only", nargs="+", default=None, help="名前に指定した文字列を含む関数のみ計測する")
+    parser.add_argument(
+        "--data-directory",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "forum-benchmarks",
+        help="データセットを保存するディレクトリ。作成済みのデータセットは再利用する",
+    )
+    parser.add_argument("--save", default=None, help="結果を基準値として保存するJSONファイル")
+    parser.add_argument("--baseline", default=None, help="比較する基準値のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2, help="遅くなった・メモリが増えたと判定する割合(既定値: 0.2)")
+    args = parser.parse_args()
+    # forum.delete_forumを1回以上計測できるように、forum_id=1以外に3件以上の掲示板を作成する。
+    if any(size < 4 for size in args.sizes):
+        parser.error("--sizesは4以上を指定してください。")
+    sys.exit(asyncio.run(main(args)))
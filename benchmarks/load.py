@@ -0,0 +1,325 @@
+"""
+APIのスループットとレイテンシを計測する負荷試験のベンチマーク。
+
+    python -m benchmarks.load --forums 1000 --comments 50000 --concurrency 32 --duration 30 --output result.json
+
+src.main.appをhttpx.ASGITransportでプロセス内から呼び出し、データベースはSQLiteのファイルで代用する。
+データベースのファイルが存在しない場合は、src.generate_testdata_databaseでテストデータを生成する。
+エンドポイントごとに件数・ステータスコード・requests/s・レイテンシのp50/p95/p99(ミリ秒)をJSONで出力する。
+コミットごとの結果を比較できるように、実行時のgitのコミットも出力する。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncGenerator, Callable
+
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import generate_testdata_database
+from src.database import get_read_session, get_session
+from src.main import app
+from src.cruds import comment as comment_crud
+from src.cruds import forum as forum_crud
+
+# 既定のリクエストの割合(エンドポイント名=重み)
+DEFAULT_MIX = "get_forums=30,get_forum=20,get_comments=30,get_comment=10,post_comment=5,put_forum=3,post_forum=2"
+
+
+@dataclass
+class Dataset:
+    """
+    リクエストの対象とする掲示板と、掲示板ごとのコメントIDの採番値
+    """
+
+    last_comment_ids: dict[int, int]
+    forum_ids: list[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.forum_ids = list(self.last_comment_ids)
+
+    def forum_id(self, rng: random.Random) -> int:
+        return rng.choice(self.forum_ids)
+
+    def comment_id(self, rng: random.Random, forum_id: int) -> int:
+        return rng.randint(1, max(1, self.last_comment_ids[forum_id]))
+
+
+async def _get_forums(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.get("/forums", params={"limit": 20})
+
+
+async def _get_forum(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.get(f"/forums/{dataset.forum_id(rng)}")
+
+
+async def _get_comments(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.get(f"/forums/{dataset.forum_id(rng)}/comments", params={"limit": 50})
+
+
+async def _get_comment(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    forum_id: int = dataset.forum_id(rng)
+    return await client.get(f"/forums/{forum_id}/comments/{dataset.comment_id(rng, forum_id)}")
+
+
+async def _post_comment(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.post(f"/forums/{dataset.forum_id(rng)}/comments", json={"comment": "負荷試験のコメント"})
+
+
+async def _put_forum(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.put(
+        f"/forums/{dataset.forum_id(rng)}",
+        json={"title": "負荷試験", "content": "負荷試験で更新した掲示板"},
+    )
+
+
+async def _post_forum(client: AsyncClient, rng: random.Random, dataset: Dataset) -> Response:
+    return await client.post("/forums", json={"title": "負荷試験", "content": "負荷試験で作成した掲示板"})
+
+
+# エンドポイント名と、(ルート, リクエストを送信する関数)
+REQUESTS: dict[str, tuple[str, Callable]] = {
+    "get_forums": ("GET /forums", _get_forums),
+    "get_forum": ("GET /forums/{forum_id}", _get_forum),
+    "get_comments": ("GET /forums/{forum_id}/comments", _get_comments),
+    "get_comment": ("GET /forums/{forum_id}/comments/{comment_id}", _get_comment),
+    "post_comment": ("POST /forums/{forum_id}/comments", _post_comment),
+    "put_forum": ("PUT /forums/{forum_id}", _put_forum),
+    "post_forum": ("POST /forums", _post_forum),
+}
+
+
+@dataclass
+class EndpointResult:
+    """
+    エンドポイントごとの計測結果
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status_code: int) -> None:
+        self.latencies.append(latency)
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        return None
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """
+    リクエストの割合を解析する。
+    """
+    weights: dict[str, float] = dict()
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in REQUESTS:
+            raise ValueError(f"不明なエンドポイントです。: {name}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    昇順に並んだ値の百分位数を最近傍順位法で取得する。
+    """
+    if len(sorted_values) == 0:
+        return 0.0
+    rank: int = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(result: EndpointResult, elapsed: float) -> dict:
+    """
+    計測結果を集計する。レイテンシはミリ秒で出力する。
+    """
+    latencies: list[float] = sorted(latency * 1000 for latency in result.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status_code, count in result.status_codes.items() if status_code >= 500),
+        "status_codes": {str(status_code): count for status_code, count in sorted(result.status_codes.items())},
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / max(1, len(latencies)), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1] if latencies else 0.0, 3),
+        },
+    }
+
+
+async def load_dataset(engine: AsyncEngine) -> Dataset:
+    """
+    リクエストの対象とする掲示板を取得する。
+    """
+    async with engine.connect() as connection:
+        database_result = await connection.execute(text("SELECT forum_id, last_comment_id FROM forum"))
+        return Dataset(last_comment_ids={forum_id: last_comment_id for forum_id, last_comment_id in database_result})
+
+
+async def run(
+    url: str,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    weights: dict[str, float],
+    seed: int,
+) -> dict:
+    """
+    concurrency個のワーカーで、duration秒間リクエストを送信し続ける。
+    最初のwarmup秒間の結果は集計しない。
+    """
+    engine: AsyncEngine = create_async_engine(url, pool_size=concurrency, max_overflow=0)
+    async_session = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)  # type: ignore
+
+    async def get_benchmark_session() -> AsyncGenerator[AsyncSession, None]:
+        async with async_session() as session:  # type: ignore
+            yield session
+
+    app.dependency_overrides[get_session] = get_benchmark_session
+    app.dependency_overrides[get_read_session] = get_benchmark_session
+    forum_crud.forum_cache.clear()
+    comment_crud.comment_cache.clear()
+
+    dataset: Dataset = await load_dataset(engine)
+    if len(dataset.forum_ids) == 0:
+        raise ValueError("掲示板が存在しません。--forumsを指定してテストデータを生成してください。")
+    names: list[str] = list(weights)
+    results: dict[str, EndpointResult] = {name: EndpointResult() for name in names}
+    started: float = time.perf_counter()
+    measure_from: float = started + warmup
+    deadline: float = measure_from + duration
+
+    async def worker(client: AsyncClient, rng: random.Random) -> None:
+        while True:
+            name: str = rng.choices(names, weights=[weights[name] for name in names])[0]
+            request_started: float = time.perf_counter()
+            if request_started >= deadline:
+                return None
+            response: Response = await REQUESTS[name][1](client, rng, dataset)
+            if request_started >= measure_from:
+                results[name].record(time.perf_counter() - request_started, response.status_code)
+
+    # アプリケーションの例外は送出せず、500として集計する。
+    transport = ASGITransport(app=app, raise_app_exceptions=False)  # type: ignore
+    async with AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await asyncio.gather(*[worker(client, random.Random(seed + index)) for index in range(concurrency)])
+    elapsed: float = time.perf_counter() - measure_from
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+    total = EndpointResult()
+    for result in results.values():
+        for latency in result.latencies:
+            total.latencies.append(latency)
+        for status_code, count in result.status_codes.items():
+            total.status_codes[status_code] = total.status_codes.get(status_code, 0) + count
+    return {
+        "endpoints": {REQUESTS[name][0]: summarize(result, elapsed) for name, result in results.items()},
+        "total": summarize(total, elapsed),
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+def git_commit() -> str | None:
+    """
+    実行時のgitのコミットを取得する。取得できない場合はNoneを返却する。
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> str:
+    """
+    比較元の結果からの変化率を、エンドポイントごとに表形式で作成する。
+    """
+    lines: list[str] = [f"{'endpoint':<48} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    endpoints: dict = {**report["endpoints"], "total": report["total"]}
+    base_endpoints: dict = {**baseline["endpoints"], "total": baseline["total"]}
+    for name, result in endpoints.items():
+        base: dict | None = base_endpoints.get(name)
+        if base is None:
+            continue
+        values: list[tuple[float, float]] = [
+            (result["requests_per_second"], base["requests_per_second"]),
+            *[(result["latency_ms"][key], base["latency_ms"][key]) for key in ("p50", "p95", "p99")],
+        ]
+        changes: str = " ".join(
+            f"{(value / base_value - 1) * 100:>+7.1f}%" if base_value else f"{'-':>8}" for value, base_value in values
+        )
+        lines.append(f"{name:<48} {changes}")
+    return "\n".join(lines)
+
+
+async def main(args: argparse.Namespace) -> None:
+    url: str = f"sqlite+aiosqlite:///{args.database}"
+    if not Path(args.database).exists():
+        # 結果のJSONと混ざらないように、テストデータ生成の進捗は標準エラー出力に出力する。
+        with contextlib.redirect_stdout(sys.stderr):
+            await generate_testdata_database.generate(
+                url,
+                forums=args.forums,
+                comments=args.comments,
+                seed=args.seed,
+                batch_size=5000,
+                migrate=True,
+            )
+    report: dict = {
+        "commit": git_commit(),
+        "config": {
+            "database": str(args.database),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": parse_mix(args.mix),
+            "seed": args.seed,
+        },
+        **await run(url, args.concurrency, args.duration, args.warmup, parse_mix(args.mix), args.seed),
+    }
+    output: str = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    if args.compare is not None:
+        baseline: dict = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"{baseline.get('commit')}からの変化率", file=sys.stderr)
+        print(compare(report, baseline), file=sys.stderr)
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", type=Path, default=Path("benchmark.db"), help="SQLiteのファイル(既定値: benchmark.db)")
+    parser.add_argument("--forums", type=int, default=1000, help="テストデータの掲示板の件数(既定値: 1000)")
+    parser.add_argument("--comments", type=int, default=50000, help="テストデータのコメントの件数(既定値: 50000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時に送信するリクエスト数(既定値: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測する時間(秒)(既定値: 10)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="計測前に送信する時間(秒)(既定値: 1)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"リクエストの割合(既定値: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード(既定値: 0)")
+    parser.add_argument("--output", default=None, help="結果を出力するJSONファイル(既定値: 標準出力)")
+    parser.add_argument("--compare", default=None, help="比較元の結果のJSONファイル。変化率を標準エラー出力に出力する")
+    args = parser.parse_args()
+    try:
+        parse_mix(args.mix)
+    except ValueError as error:
+        parser.error(str(error))
+    asyncio.run(main(args))
@@ -0,0 +1,125 @@
+"""
+レスポンスのシリアライズに要する1件あたりの時間を計測するベンチマーク。
+
+    python -m benchmarks.serialization [--rows 10 100 1000 10000] [--repeat 5]
+
+変更前: CRUDでスキーマを検証付きで作成し、FastAPIがresponse_modelで再検証してJSONに変換する。
+変更後: CRUDでスキーマを検証なしで作成し、ModelResponseがpydanticのシリアライザで直接JSONに変換する。
+"""
+
+import argparse
+import datetime
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.schemas import forum as forum_schema
+from src.responses import ModelResponse
+
+
+def make_rows(count: int) -> list[SimpleNamespace]:
+    """
+    データベースから取得したレコードの代わりとなる行を作成する。
+    """
+    now = datetime.datetime(2024, 1, 1, 12, 34, 56)
+    return [
+        SimpleNamespace(
+            forum_id=forum_id,
+            title=f"掲示板{forum_id}",
+            content="掲示板の内容" * 10,
+            comment_count=forum_id * 10,
+            created_at=now,
+            updated_at=now,
+            last_commented_at=now,
+        )
+        for forum_id in range(count, 0, -1)
+    ]
+
+
+def serialize_validated(rows: list[SimpleNamespace]) -> bytes:
+    """
+    変更前の処理。
+    フィールドごとに検証してスキーマを作成し、response_modelで再度検証してからJSONに変換する。
+    """
+    schema = forum_schema.Forums(
+        forums=[
+            forum_schema.Forum(
+                forum_id=row.forum_id,
+                title=row.title,
+                content=row.content,
+                comment_count=row.comment_count,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                last_commented_at=row.last_commented_at,
+            )
+            for row in rows
+        ],
+        next_cursor=None,
+    )
+    # FastAPIのserialize_responseと同様に、response_modelで検証してからJSONに変換する。
+    adapter: TypeAdapter = TypeAdapter(forum_schema.Forums)
+    validated = adapter.validate_python(schema, from_attributes=True)
+    content: Any = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_trusted(rows: list[SimpleNamespace]) -> bytes:
+    """
+    変更後の処理。
+    検証せずにスキーマを作成し、ModelResponseでJSONに変換する。
+    """
+    schema = forum_schema.Forums.model_construct(
+        forums=[
+            forum_schema.Forum.model_construct(
+                forum_id=row.forum_id,
+                title=row.title,
+                content=row.content,
+                comment_count=row.comment_count,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                last_commented_at=row.last_commented_at,
+            )
+            for row in rows
+        ],
+        next_cursor=None,
+    )
+    return ModelResponse(schema).body
+
+
+def measure(function: Callable[[list[SimpleNamespace]], bytes], rows: list[SimpleNamespace], repeat: int) -> float:
+    """
+    関数をrepeat回実行し、最も速かった回の1件あたりの時間(マイクロ秒)を返却する。
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        started: float = time.perf_counter()
+        function(rows)
+        best = min(best, time.perf_counter() - started)
+    return best / max(1, len(rows)) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 10000], help="1レスポンスあたりの件数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    # 変更前後で同じJSONを返却することを確認する。
+    sample = make_rows(3)
+    assert json.loads(serialize_validated(sample)) == json.loads(serialize_trusted(sample))
+
+    print(f"{'rows':>8} {'before(us/row)':>16} {'after(us/row)':>16} {'speedup':>8}")
+    for count in args.rows:
+        rows = make_rows(count)
+        before: float = measure(serialize_validated, rows, args.repeat)
+        after: float = measure(serialize_trusted, rows, args.repeat)
+        print(f"{count:>8} {before:>16.2f} {after:>16.2f} {before / after:>7.1f}x")
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+プロセス内のキャッシュを定義するモジュール。
+"""
+
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from typing import Callable, Generic, Hashable, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+@dataclass
+class CacheStats:
+    """
+    キャッシュの統計情報
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class LRUCache(Generic[KeyType, ValueType]):
+    """
+    件数の上限と有効期限を持つLRUキャッシュ
+
+    上限を超えた場合は最も長く参照されていないエントリを破棄し、
+    有効期限を過ぎたエントリは参照時に破棄する。
+    イベントループ内から呼び出す前提のため、排他制御は行わない。
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+        hold: float = 0.0,
+    ) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        # 無効化したキーはhold秒間は登録しない。レプリカの遅延で古い値を登録しないために使用する。
+        self.hold: float = hold
+        self._timer: Callable[[], float] = timer
+        # hold秒以内に無効化したキーと無効化した時刻(無効化した順)
+        self._held_keys: OrderedDict[KeyType, float] = OrderedDict()
+        # hold秒以内にinvalidate_ifで無効化した条件と無効化した時刻(無効化した順)
+        self._held_predicates: deque[tuple[float, Callable[[KeyType], bool]]] = deque()
+        # 保持する無効化の件数がmaxsizeを超えた場合は、溢れた分の無効化の時刻からhold秒間はすべてのキーを登録しない。
+        self._invalidated_at: float = float("-inf")
+        self._entries: OrderedDict[KeyType, tuple[float, ValueType]] = OrderedDict()
+        self._stats: CacheStats = CacheStats()
+        # 無効化のたびに増加する世代番号
+        self._generation: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """
+        現在の世代番号を取得する。
+        データベースから読み込む前に取得し、setに渡すことで、
+        読み込み中に無効化されたエントリを古い値で上書きしないようにする。
+        """
+        return self._generation
+
+    def get(self, key: KeyType) -> ValueType | None:
+        """
+        エントリを取得する。
+        エントリが存在しない場合や有効期限を過ぎた場合はNoneを返却する。
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._timer():
+            del self._entries[key]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return value
+
+    def set(self, key: KeyType, value: ValueType, generation: int | None = None) -> None:
+        """
+        エントリを登録する。
+        generationを指定した場合、その世代以降に無効化が行われていれば登録しない。
+        キーを無効化してからhold秒以内の場合も登録しない。
+        """
+        if generation is not None and generation != self._generation:
+            return None
+        if self._is_held(key):
+            return None
+        self._entries[key] = (self._timer() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+        return None
+
+    def invalidate(self, key: KeyType) -> None:
+        """
+        エントリを無効化する。
+        """
+        self._generation += 1
+        self._hold_key(key)
+        if self._entries.pop(key, None) is not None:
+            self._stats.invalidations += 1
+        return None
+
+    def invalidate_if(self, predicate: Callable[[KeyType], bool]) -> None:
+        """
+        条件に一致するキーのエントリをすべて無効化する。
+        """
+        self._generation += 1
+        self._hold_predicate(predicate)
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+            self._stats.invalidations += 1
+        return None
+
+    def _prune_holds(self, now: float) -> None:
+        """
+        無効化してからhold秒を過ぎた無効化を破棄する。
+        """
+        while len(self._held_keys) > 0 and now - next(iter(self._held_keys.values())) >= self.hold:
+            self._held_keys.popitem(last=False)
+        while len(self._held_predicates) > 0 and now - self._held_predicates[0][0] >= self.hold:
+            self._held_predicates.popleft()
+        return None
+
+    def _hold_key(self, key: KeyType) -> None:
+        """
+        キーを無効化した時刻を記録する。
+        """
+        if self.hold <= 0:
+            return None
+        now: float = self._timer()
+        self._prune_holds(now)
+        self._held_keys[key] = now
+        self._held_keys.move_to_end(key)
+        if len(self._held_keys) > self.maxsize:
+            _, invalidated_at = self._held_keys.popitem(last=False)
+            self._invalidated_at = max(self._invalidated_at, invalidated_at)
+        return None
+
+    def _hold_predicate(self, predicate: Callable[[KeyType], bool]) -> None:
+        """
+        invalidate_ifで無効化した条件と時刻を記録する。
+        """
+        if self.hold <= 0:
+            return None
+        now: float = self._timer()
+        self._prune_holds(now)
+        self._held_predicates.append((now, predicate))
+        if len(self._held_predicates) > self.maxsize:
+            invalidated_at, _ = self._held_predicates.popleft()
+            self._invalidated_at = max(self._invalidated_at, invalidated_at)
+        return None
+
+    def _is_held(self, key: KeyType) -> bool:
+        """
+        キーを無効化してからhold秒以内かどうかを判定する。
+        """
+        if self.hold <= 0:
+            return False
+        now: float = self._timer()
+        self._prune_holds(now)
+        if now - self._invalidated_at < self.hold or key in self._held_keys:
+            return True
+        return any(predicate(key) for _, predicate in self._held_predicates)
+
+    def clear(self) -> None:
+        """
+        すべてのエントリと統計情報を破棄する。
+        """
+        self._generation += 1
+        self._entries.clear()
+        self._stats = CacheStats()
+        return None
+
+    def stats(self) -> CacheStats:
+        """
+        統計情報の複製を取得する。
+        """
+        return replace(self._stats)
@@ -2,40 +2,268 @@
 掲示板コメントに対するCRUD操作を行うモジュール。
 """
 
+import datetime
+import json
+from typing import Any, Literal, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import ColumnElement, Select, select, insert, update, delete, exists, func, and_
+from sqlalchemy.engine import Row
+from src import etag, pubsub
 from src.models import forum as forum_model
+from src.cruds import common as common_crud
+from src.cruds import search as search_crud
 from src.models import comment as comment_model
 from src.schemas import common as common_schema
-from src.schemas import forum as comment_schema
 from src.schemas import comment as comment_schema
 
+# 掲示板コメントの返却に使用するカラム
+_COLUMNS = (
+    comment_model.Comment.forum_id,
+    comment_model.Comment.comment_id,
+    comment_model.Comment.comment,
+    comment_model.Comment.created_at,
+    comment_model.Comment.updated_at,
+)
+
+# 掲示板コメント取得のキャッシュ(キーは(forum_id, comment_id))
+comment_cache = common_crud.comment_cache
+
+
+def _to_schema(row: Row) -> comment_schema.Comment:
+    """
+    取得したレコードから返却オブジェクトを作成する。
+    データベースの値は検証済みとみなし、pydanticの検証を省略する。
+    """
+    return comment_schema.Comment.model_construct(
+        forum_id=row.forum_id,
+        comment_id=row.comment_id,
+        comment=row.comment,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+    )
+
+
+def _range_conditions(
+    after_comment_id: int | None,
+    before_comment_id: int | None,
+) -> list[ColumnElement[bool]]:
+    """
+    comment_idの範囲を絞り込む条件を作成する。
+    """
+    Model = comment_model.Comment
+    conditions: list[ColumnElement[bool]] = list()
+    if after_comment_id is not None:
+        conditions.append(Model.comment_id > after_comment_id)
+    if before_comment_id is not None:
+        conditions.append(Model.comment_id < before_comment_id)
+    return conditions
+
+
+def _order_by(order: Literal["asc", "desc"]) -> ColumnElement:
+    """
+    comment_idの並び順を作成する。
+    """
+    Model = comment_model.Comment
+    if order == "asc":
+        return Model.comment_id.asc()
+    return Model.comment_id.desc()
+
 
 async def get_comments(
     session: AsyncSession,
     forum_id: int,
+    limit: int | None = None,
+    after_comment_id: int | None = None,
+    before_comment_id: int | None = None,
+    order: Literal["asc", "desc"] = "asc",
 ) -> comment_schema.Comments:
     """
     コメント一覧を取得する。
+    (forum_id, comment_id)の主キーの範囲で絞り込み、comment_idの順序でlimit件を取得する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
     """
     Model = comment_model.Comment
+    ForumModel = forum_model.Forum
+    # comment_idの範囲を絞り込む。
+    conditions = [
+        Model.forum_id == ForumModel.forum_id,
+        *_range_conditions(after_comment_id, before_comment_id),
+    ]
+    # 掲示板に外部結合して、掲示板の存在確認とコメントの取得を1回のクエリで行う。
+    # ORMのエンティティではなく返却に使用するカラムのみを取得し、行から直接返却オブジェクトを作成する。
+    query = (
+        select(*_COLUMNS)
+        .select_from(ForumModel)
+        .outerjoin(Model, and_(*conditions))
+        .where(ForumModel.forum_id == forum_id)
+        .order_by(_order_by(order))
+    )
+    # 次ページの有無を判定するため、1件多く取得する。
+    if limit is not None:
+        query = query.limit(limit + 1)
     # レコードを取得する。
+    database_result = await session.execute(query)
+    rows = database_result.all()
+    # 掲示板が存在しない場合は例外を送出する。
+    if len(rows) == 0:
+        raise common_crud.ForumNotFoundError(forum_id)
+    # コメントが存在しない場合は、掲示板のみの行がcomment_idがNoneの行として取得される。
+    rows = [row for row in rows if row.comment_id is not None]
+    # 返却オブジェクトを作成して返却する。
+    schema = comment_schema.Comments.model_construct(
+        comments=[_to_schema(row) for row in rows[:limit]],
+        next_cursor=None,
+    )
+    if limit is not None and len(rows) > limit:
+        schema.next_cursor = schema.comments[-1].comment_id
+    return schema
+
+
+def _page_query(
+    columns: Sequence[Any],
+    forum_id: int,
+    limit: int | None,
+    after_comment_id: int | None,
+    before_comment_id: int | None,
+    order: Literal["asc", "desc"],
+) -> Select:
+    """
+    コメント一覧の1ページ分を取得するクエリを作成する。
+    掲示板の存在確認は行わない。
+    """
+    Model = comment_model.Comment
+    query = (
+        select(*columns)
+        .where(
+            Model.forum_id == forum_id,
+            *_range_conditions(after_comment_id, before_comment_id),
+        )
+        .order_by(_order_by(order))
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def make_comments_etag(schema: comment_schema.Comments) -> str:
+    """
+    コメント一覧のETagを作成する。
+    get_comments_etagと同じ値の組(件数、comment_idの最小値と最大値、updated_atの最大値、次ページを含めた件数)から作成する。
+    """
+    comment_ids: list[int] = [comment.comment_id for comment in schema.comments]
+    updated_ats = [comment.updated_at for comment in schema.comments]
+    return etag.make_etag(
+        len(comment_ids),
+        min(comment_ids, default=None),
+        max(comment_ids, default=None),
+        max(updated_ats, default=None),
+        len(comment_ids) + (0 if schema.next_cursor is None else 1),
+    )
+
+
+async def get_comments_etag(
+    session: AsyncSession,
+    forum_id: int,
+    limit: int | None = None,
+    after_comment_id: int | None = None,
+    before_comment_id: int | None = None,
+    order: Literal["asc", "desc"] = "asc",
+) -> str:
+    """
+    コメント一覧のETagを集計クエリで取得する。
+    レコードを取得せずに、get_commentsの結果から作成したETagと同じ値を返却する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
+    """
+    Model = comment_model.Comment
+    ForumModel = forum_model.Forum
+    page = _page_query(
+        (Model.comment_id, Model.updated_at),
+        forum_id,
+        limit,
+        after_comment_id,
+        before_comment_id,
+        order,
+    ).subquery()
+    window = _page_query(
+        (Model.comment_id,),
+        forum_id,
+        None if limit is None else limit + 1,
+        after_comment_id,
+        before_comment_id,
+        order,
+    ).subquery()
     database_result = await session.execute(
-        select(Model).where(Model.forum_id == forum_id)
+        select(
+            exists().where(ForumModel.forum_id == forum_id),
+            func.count(),
+            func.min(page.c.comment_id),
+            func.max(page.c.comment_id),
+            func.max(page.c.updated_at),
+            select(func.count()).select_from(window).scalar_subquery(),
+        ).select_from(page)
     )
-    rows = database_result.scalars().all()
-    # 返却オブジェクトを作成して返却する。
-    schema = comment_schema.Comments(comments=list())
-    for row in rows:
-        comment = comment_schema.Comment(
-            forum_id=row.forum_id,  # type: ignore
-            comment_id=row.comment_id,  # type: ignore
-            comment=str(row.comment),
-            created_at=row.created_at,  # type: ignore
-            updated_at=row.updated_at,  # type: ignore
+    forum_exists, *parts = database_result.one()
+    # 掲示板が存在しない場合は例外を送出する。
+    if not forum_exists:
+        raise common_crud.ForumNotFoundError(forum_id)
+    return etag.make_etag(*parts)
+
+
+def make_comment_etag(schema: comment_schema.Comment) -> str:
+    """
+    掲示板コメントのETagを作成する。
+    """
+    return etag.make_etag(schema.forum_id, schema.comment_id, schema.updated_at)
+
+
+def _publish_comments(event_type: str, schemas: Sequence[comment_schema.Comment]) -> None:
+    """
+    作成・更新したコメントを、掲示板のコメントの購読者に配信する。
+    コミット後に呼び出し、コミットされていない変更は配信しない。
+    """
+    for schema in schemas:
+        data: bytes = comment_schema.Comment.__pydantic_serializer__.to_json(schema)
+        pubsub.broker.publish(pubsub.Event(channel=schema.forum_id, type=event_type, data=data.decode()))
+    return None
+
+
+async def _next_comment_id(
+    session: AsyncSession,
+    forum_id: int,
+    count: int = 1,
+) -> int | None:
+    """
+    掲示板のコメントIDの採番値とコメント数をcount増やし、最終コメント日時を現在日時に更新して、
+    採番した最後のcomment_idを返却する。
+    採番したcomment_idは、返却値-count+1から返却値までの連続した範囲となる。
+    掲示板が存在しない場合はNoneを返却する。
+    採番値の更新で掲示板の行がロックされるため、同じ掲示板への同時投稿でもcomment_idは重複しない。
+    """
+    ForumModel = forum_model.Forum
+    next_value = ForumModel.last_comment_id + count
+    dialect = common_crud.get_dialect(session)
+    # MySQLはRETURNING非対応のため、LAST_INSERT_ID(expr)で採番値を受け取る。
+    if dialect.name == "mysql":
+        next_value = func.last_insert_id(next_value)
+    # updated_atは掲示板自体の更新日時のため、採番では更新しない。
+    statement = (
+        update(ForumModel)
+        .where(ForumModel.forum_id == forum_id)
+        .values(
+            last_comment_id=next_value,
+            comment_count=ForumModel.comment_count + count,
+            last_commented_at=datetime.datetime.now(),
+            updated_at=ForumModel.updated_at,
         )
-        schema.comments.append(comment)
-    return schema
+        .execution_options(synchronize_session=False)
+    )
+    if dialect.update_returning:
+        database_result = await session.execute(statement.returning(ForumModel.last_comment_id))
+        return database_result.scalar_one_or_none()
+    database_result = await session.execute(statement)
+    if database_result.rowcount == 0:  # type: ignore
+        return None
+    return database_result.lastrowid  # type: ignore
 
 
 async def create_comment(
@@ -45,37 +273,96 @@ async def create_comment(
 ) -> comment_schema.Comment:
     """
     コメントを作成する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
+    """
+    # comment_idを採番する。採番対象の掲示板が存在しない場合は例外を送出する。
+    comment_id: int | None = await _next_comment_id(session, forum_id)
+    if comment_id is None:
+        await session.rollback()
+        raise common_crud.ForumNotFoundError(forum_id)
+    # 採番と同じトランザクションでレコードを作成して、作成したレコードを取得する。
+    row = await common_crud.insert_returning(
+        session,
+        insert(comment_model.Comment).values(
+            forum_id=forum_id,
+            comment_id=comment_id,
+            **forum_comment.model_dump(),
+        ),
+        _COLUMNS,
+    )
+    # 同じトランザクションで検索用の索引を作成する。
+    await search_crud.add_documents(session, [(forum_id, comment_id, row.comment)])
+    await session.commit()
+    # 掲示板のコメント数が変わるため、掲示板のキャッシュを無効化する。
+    common_crud.forum_cache.invalidate(forum_id)
+    # 返却オブジェクトを作成し、購読者に配信して返却する。
+    schema = _to_schema(row)
+    _publish_comments("created", [schema])
+    return schema
+
+
+async def create_comments(
+    session: AsyncSession,
+    forum_id: int,
+    comment_creates: list[comment_schema.CommentCreate],
+) -> comment_schema.Comments:
+    """
+    掲示板に複数のコメントを1回のトランザクションで作成する。
+    comment_idは連続した範囲を1回で採番し、作成したコメントをcomment_createsの順に返却する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
     """
     Model = comment_model.Comment
-    # comment_idを作成する。
-    database_result = await session.execute(
-        select(func.max(Model.comment_id)).where(Model.forum_id == forum_id),
+    # comment_idの範囲を採番する。採番対象の掲示板が存在しない場合は例外を送出する。
+    last_comment_id: int | None = await _next_comment_id(session, forum_id, len(comment_creates))
+    if last_comment_id is None:
+        await session.rollback()
+        raise common_crud.ForumNotFoundError(forum_id)
+    first_comment_id: int = last_comment_id - len(comment_creates) + 1
+    # 採番と同じトランザクションで、複数行のINSERTでレコードを作成して、作成したレコードを取得する。
+    rows = await common_crud.insert_many_returning(
+        session,
+        insert(Model),
+        [
+            {"forum_id": forum_id, "comment_id": comment_id, **comment_create.model_dump()}
+            for comment_id, comment_create in enumerate(comment_creates, start=first_comment_id)
+        ],
+        _COLUMNS,
+        where=and_(
+            Model.forum_id == forum_id,
+            Model.comment_id.between(first_comment_id, last_comment_id),
+        ),
     )
-    comment_id: int | None = database_result.scalar_one_or_none()
-    if comment_id is None:
-        comment_id = 1
-    else:
-        comment_id += 1
-    # レコードを作成する。
-    row: comment_model.Comment = comment_model.Comment(
-        forum_id=forum_id,
-        comment_id=comment_id,
-        **forum_comment.model_dump(),
-    )
-    session.add(row)
+    # 同じトランザクションで検索用の索引を作成する。
+    await search_crud.add_documents(session, [(forum_id, row.comment_id, row.comment) for row in rows])
     await session.commit()
-    # 最新レコードを取得して返却する。
-    await session.refresh(row)
-    schema: comment_schema.Comment = comment_schema.Comment(
-        forum_id=row.forum_id,  # type: ignore
-        comment_id=row.comment_id,  # type: ignore
-        comment=str(row.comment),
-        created_at=row.created_at,  # type: ignore
-        updated_at=row.updated_at,  # type: ignore
+    # 掲示板のコメント数が変わるため、掲示板のキャッシュを無効化する。
+    common_crud.forum_cache.invalidate(forum_id)
+    # 返却オブジェクトを作成し、購読者に配信して返却する。
+    schema = comment_schema.Comments.model_construct(
+        comments=[_to_schema(row) for row in rows],
+        next_cursor=None,
     )
+    _publish_comments("created", schema.comments)
     return schema
 
 
+async def _raise_if_forum_not_exist(
+    session: AsyncSession,
+    forum_id: int,
+) -> None:
+    """
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
+    掲示板コメントの更新・削除の対象が見つからなかった場合のみ、404の種類を判定するために使用する。
+    """
+    ForumModel = forum_model.Forum
+    database_result = await session.execute(
+        select(ForumModel.forum_id).where(ForumModel.forum_id == forum_id),
+    )
+    if database_result.scalar_one_or_none() is None:
+        raise common_crud.ForumNotFoundError(forum_id)
+    return None
+
+
 async def get_comment(
     session: AsyncSession,
     forum_id: int,
@@ -84,27 +371,39 @@ async def get_comment(
     """
     掲示板コメントを取得する。
     掲示板コメントが存在しない場合はNoneを返却する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
+    キャッシュに存在する場合はデータベースを参照しない。
     """
     Model = comment_model.Comment
-    # レコードを取得する。
+    ForumModel = forum_model.Forum
+    # キャッシュに存在する場合はキャッシュを返却する。
+    schema: comment_schema.Comment | None = comment_cache.get((forum_id, comment_id))
+    if schema is not None:
+        return schema
+    generation: int = comment_cache.generation
+    # 掲示板に外部結合して、掲示板の存在確認とコメントの取得を1回のクエリで行う。
     database_result = await session.execute(
-        select(Model).filter(
-            Model.forum_id == forum_id,
-            Model.comment_id == comment_id,
+        select(ForumModel.forum_id.label("parent_forum_id"), *_COLUMNS)
+        .select_from(ForumModel)
+        .outerjoin(
+            Model,
+            and_(
+                Model.forum_id == ForumModel.forum_id,
+                Model.comment_id == comment_id,
+            ),
         )
+        .where(ForumModel.forum_id == forum_id)
     )
-    row = database_result.scalar_one_or_none()
-    # 取得対象のレコードが存在しない場合はNoneを返却する。
+    row = database_result.one_or_none()
+    # 掲示板が存在しない場合は例外を送出する。
     if row is None:
+        raise common_crud.ForumNotFoundError(forum_id)
+    # 取得対象のレコードが存在しない場合はNoneを返却する。
+    if row.comment_id is None:
         return None
-    # 返却オブジェクトを作成して返却する。
-    schema = comment_schema.Comment(
-        forum_id=row.forum_id,  # type: ignore
-        comment_id=row.comment_id,  # type: ignore
-        comment=row.comment,  # type: ignore
-        created_at=row.created_at,  # type: ignore
-        updated_at=row.updated_at,  # type: ignore
-    )
+    # 返却オブジェクトを作成し、キャッシュに登録して返却する。
+    schema = _to_schema(row)
+    comment_cache.set((forum_id, comment_id), schema, generation)
     return schema
 
 
@@ -117,31 +416,29 @@ async def edit_comment(
     """
     掲示板コメントを更新する。
     掲示板コメントが存在しない場合はNoneを返却する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
     """
     Model = comment_model.Comment
-    # 更新対象のレコードを取得する。
-    result = await session.execute(
-        select(Model).where(
-            Model.forum_id == forum_id,
-            Model.comment_id == comment_id,
-        ),
+    # 更新を実行して、更新後のレコードを取得する。
+    row = await common_crud.update_returning(
+        session,
+        update(Model)
+        .where(Model.forum_id == forum_id, Model.comment_id == comment_id)
+        .values(comment=comment_create.comment),
+        _COLUMNS,
     )
-    row: comment_model.Comment | None = result.scalar_one_or_none()
     # 更新対象のレコードが存在しない場合はNoneを返却する。
     if row is None:
+        await session.rollback()
+        await _raise_if_forum_not_exist(session, forum_id)
         return None
-    # 更新を実行する。
-    row.comment = comment_create.comment  # type: ignore
+    # 同じトランザクションで検索用の索引を作り直す。
+    await search_crud.replace_document(session, forum_id, comment_id, row.comment)
     await session.commit()
-    await session.refresh(row)
-    # 返却オブジェクトを作成して返却する。
-    schema = comment_schema.Comment(
-        forum_id=row.forum_id,  # type: ignore
-        comment_id=row.comment_id,  # type: ignore
-        comment=str(row.comment),
-        created_at=row.created_at,  # type: ignore
-        updated_at=row.updated_at,  # type: ignore
-    )
+    comment_cache.invalidate((forum_id, comment_id))
+    # 返却オブジェクトを作成し、購読者に配信して返却する。
+    schema = _to_schema(row)
+    _publish_comments("updated", [schema])
     return schema
 
 
@@ -153,20 +450,37 @@ async def delete_comment(
     """
     掲示板コメントを削除する。
     掲示板コメントが存在しない場合はNoneを返却する。
+    掲示板が存在しない場合はForumNotFoundErrorを送出する。
     """
     Model = comment_model.Comment
-    # 削除対象のレコードを取得する。
-    result = await session.execute(
-        select(Model).where(
-            Model.forum_id == forum_id,
-            Model.comment_id == comment_id,
-        ),
+    ForumModel = forum_model.Forum
+    # 削除を実行する。
+    database_result = await session.execute(
+        delete(Model).where(Model.forum_id == forum_id, Model.comment_id == comment_id),
     )
-    row: comment_model.Comment | None = result.scalar_one_or_none()
-    # 更新対象のレコードが存在しない場合はNoneを返却する。
-    if row is None:
+    # 削除対象のレコードが存在しない場合はNoneを返却する。
+    if database_result.rowcount == 0:  # type: ignore
+        await session.rollback()
+        await _raise_if_forum_not_exist(session, forum_id)
         return None
-    # 削除を実行してNoDataを返却する。
-    await session.delete(row)
+    # 同じトランザクションで掲示板のコメント数を減らす。updated_atは掲示板自体の更新日時のため更新しない。
+    await session.execute(
+        update(ForumModel)
+        .where(ForumModel.forum_id == forum_id)
+        .values(comment_count=ForumModel.comment_count - 1, updated_at=ForumModel.updated_at)
+        .execution_options(synchronize_session=False),
+    )
+    # 同じトランザクションで検索用の索引を削除する。
+    await search_crud.remove_documents(session, forum_id, comment_id)
     await session.commit()
+    comment_cache.invalidate((forum_id, comment_id))
+    common_crud.forum_cache.invalidate(forum_id)
+    # 削除したコメントを購読者に配信する。
+    pubsub.broker.publish(
+        pubsub.Event(
+            channel=forum_id,
+            type="deleted",
+            data=json.dumps({"forum_id": forum_id, "comment_id": comment_id}),
+        )
+    )
     return common_schema.NoData()
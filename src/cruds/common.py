@@ -0,0 +1,186 @@
+"""
+CRUD処理で共通して使用する処理を定義するモジュール。
+"""
+
+import base64
+import json
+from typing import Any, Sequence
+from sqlalchemy import ColumnElement, Insert, Row, Update, select, text
+from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
+from src import cache
+from src.settings import settings
+from src.schemas import comment as comment_schema
+from src.schemas import forum as forum_schema
+
+# 書き込み後にhold秒間はキャッシュに登録しない。レプリカを使用する場合は、書き込みがレプリカに反映されるまで待つ。
+_CACHE_HOLD: float = 0.0 if settings.database_replica_url is None else settings.read_your_writes_seconds
+
+# 掲示板取得のキャッシュ(キーはforum_id)
+# 掲示板コメントの作成・削除でもコメント数が変わるため、両方のCRUD処理から参照できるようにここで定義する。
+forum_cache: cache.LRUCache[int, forum_schema.Forum] = cache.LRUCache(
+    maxsize=settings.forum_cache_maxsize,
+    ttl=settings.cache_ttl,
+    hold=_CACHE_HOLD,
+)
+
+# 掲示板コメント取得のキャッシュ(キーは(forum_id, comment_id))
+comment_cache: cache.LRUCache[tuple[int, int], comment_schema.Comment] = cache.LRUCache(
+    maxsize=settings.comment_cache_maxsize,
+    ttl=settings.cache_ttl,
+    hold=_CACHE_HOLD,
+)
+
+
+class ForumNotFoundError(Exception):
+    """
+    掲示板が存在しない
+    """
+
+    pass
+
+
+class InvalidCursorError(ValueError):
+    """
+    ページングのカーソルが不正
+    """
+
+    pass
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """
+    ページングのカーソルを作成する。
+    最後に返却したレコードのキーをJSONに変換し、URLセーフなBase64で符号化する。
+    """
+    text: str = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: tuple[str, ...]) -> dict[str, Any]:
+    """
+    ページングのカーソルを復元する。
+    カーソルが不正な場合はInvalidCursorErrorを送出する。
+    """
+    padding: str = "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except ValueError as error:
+        raise InvalidCursorError(cursor) from error
+    # 必要なキーが揃っていない場合は不正なカーソルとする。
+    if not isinstance(values, dict) or set(values) != set(keys):
+        raise InvalidCursorError(cursor)
+    return values
+
+
+def get_dialect(session: AsyncSession) -> Dialect:
+    """
+    セッションの接続先データベースのDialectを取得する。
+    """
+    return session.get_bind().dialect
+
+
+async def update_returning(
+    session: AsyncSession,
+    statement: Update,
+    columns: Sequence[Any],
+) -> Row | None:
+    """
+    UPDATE文を実行して、更新後のレコードのcolumnsを返却する。
+    更新対象のレコードが存在しない場合はNoneを返却する。
+    RETURNING対応のデータベースでは1回のクエリで更新と取得を行い、
+    非対応のデータベース(MySQL)では更新件数を確認してから更新後のレコードを取得する。
+    """
+    statement = statement.execution_options(synchronize_session=False)
+    if get_dialect(session).update_returning:
+        database_result = await session.execute(statement.returning(*columns))
+        return database_result.one_or_none()
+    database_result = await session.execute(statement)
+    if database_result.rowcount == 0:  # type: ignore
+        return None
+    database_result = await session.execute(
+        select(*columns).where(statement.whereclause),  # type: ignore
+    )
+    return database_result.one()
+
+
+async def insert_returning(
+    session: AsyncSession,
+    statement: Insert,
+    columns: Sequence[Any],
+) -> Row:
+    """
+    INSERT文を実行して、作成したレコードのcolumnsを返却する。
+    RETURNING対応のデータベースでは1回のクエリで作成と取得を行い、
+    非対応のデータベース(MySQL)では作成したレコードを主キーで取得する。
+    """
+    if get_dialect(session).insert_returning:
+        database_result = await session.execute(statement.returning(*columns))
+        return database_result.one()
+    database_result = await session.execute(statement)
+    primary_key = statement.table.primary_key.columns  # type: ignore
+    database_result = await session.execute(
+        select(*columns).where(
+            *[
+                column == value
+                for column, value in zip(primary_key, database_result.inserted_primary_key)  # type: ignore
+            ]
+        ),
+    )
+    return database_result.one()
+
+
+async def insert_many_returning(
+    session: AsyncSession,
+    statement: Insert,
+    values: list[dict[str, Any]],
+    columns: Sequence[Any],
+    where: ColumnElement[bool] | None = None,
+) -> Sequence[Row]:
+    """
+    INSERT文で複数のレコードを作成して、作成したレコードのcolumnsをvaluesの順に返却する。
+    主キーをvaluesで指定する場合は、作成したレコードを取得する条件をwhereで指定する。
+    whereを指定しない場合は自動採番の主キーとみなし、columnsに主キーを含める必要がある。
+    RETURNING対応のデータベースでは複数行のINSERT ... RETURNINGで作成と取得を行い、
+    RETURNINGの順序をvaluesの順にできるデータベース(PostgreSQL等)ではsort_by_parameter_orderで並べる。
+    自動採番の主キーでsort_by_parameter_orderを使用すると1行ずつのINSERTになるデータベース(SQLite)では、
+    1つのINSERT文ではvaluesの順に採番されるため、RETURNINGの結果を主キーの順に並べ替える。
+    非対応のデータベース(MySQL)では1回の複数行のINSERTで作成してから、作成したレコードを主キーの順に取得する。
+    自動採番の場合は、1つのINSERT文で採番される値は連続する(auto_increment_incrementの間隔)ため、範囲から主キーを求める。
+    """
+    dialect = get_dialect(session)
+    primary_key_columns = statement.table.primary_key.columns  # type: ignore
+    # 自動採番の主キーで順序を保ったまま複数行のINSERTを行えるか
+    sorts_autoincrement: bool = bool(
+        dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT
+    )
+    if dialect.insert_executemany_returning_sort_by_parameter_order and (where is not None or sorts_autoincrement):
+        database_result = await session.execute(
+            statement.returning(*columns, sort_by_parameter_order=True),
+            values,
+        )
+        return database_result.all()
+    if where is None and dialect.insert_executemany_returning:
+        (primary_key,) = primary_key_columns
+        database_result = await session.execute(statement.returning(*columns), values)
+        return sorted(database_result.all(), key=lambda row: row._mapping[primary_key])
+    database_result = await session.execute(statement.values(values))
+    if where is not None:
+        database_result = await session.execute(
+            select(*columns)
+            .where(where)
+            .order_by(*primary_key_columns),
+        )
+        return database_result.all()
+    # LAST_INSERT_ID()は複数行のINSERTで最初に採番された値を返却する。
+    first_id: int = database_result.lastrowid  # type: ignore
+    increment_result = await session.execute(text("SELECT @@auto_increment_increment"))
+    increment: int = increment_result.scalar_one()
+    (primary_key,) = primary_key_columns
+    database_result = await session.execute(
+        select(*columns)
+        .where(primary_key.in_([first_id + index * increment for index in range(len(values))]))
+        .order_by(primary_key),
+    )
+    return database_result.all()
@@ -0,0 +1,159 @@
+"""
+掲示板と掲示板コメントのエクスポートを行うモジュール。
+"""
+
+import datetime
+from typing import AsyncIterator, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, Select, select
+from src.models import forum as forum_model
+from src.models import comment as comment_model
+from src.schemas import export as export_schema
+
+# 1回に取得する掲示板の件数と、サーバーサイドカーソルから1回に取得するコメントの件数。1回に取得した分をまとめて返却する。
+EXPORT_BATCH_SIZE = 1000
+
+
+def _forums_query(after_forum_id: int) -> Select:
+    """
+    after_forum_idより後の掲示板を、forum_idの順にEXPORT_BATCH_SIZE件取得するクエリを作成する。
+    """
+    Forum = forum_model.Forum
+    return (
+        select(
+            Forum.forum_id,
+            Forum.title,
+            Forum.content,
+            Forum.comment_count,
+            Forum.created_at,
+            Forum.updated_at,
+            Forum.last_commented_at,
+        )
+        .where(Forum.forum_id > after_forum_id)
+        .order_by(Forum.forum_id)
+        .limit(EXPORT_BATCH_SIZE)
+    )
+
+
+def _comments_query(
+    first_forum_id: int,
+    last_forum_id: int,
+    updated_since: datetime.datetime | None,
+) -> Select:
+    """
+    forum_idがfirst_forum_idからlast_forum_idまでのコメントを、主キー(forum_id・comment_id)の順に取得するクエリを作成する。
+    主キーの順に取得するため、MySQLでも一時テーブルでの並べ替えを行わずにインデックスの順に返却できる。
+    updated_sinceを指定した場合は、updated_since以降に更新されたコメントのみを取得する。
+    """
+    Comment = comment_model.Comment
+    query = (
+        select(
+            Comment.forum_id,
+            Comment.comment_id,
+            Comment.comment,
+            Comment.created_at,
+            Comment.updated_at,
+        )
+        .where(Comment.forum_id.between(first_forum_id, last_forum_id))
+        .order_by(Comment.forum_id, Comment.comment_id)
+    )
+    if updated_since is not None:
+        query = query.where(Comment.updated_at >= updated_since)
+    return query
+
+
+def _forum_line(row: Row) -> bytes:
+    """
+    掲示板の行を作成する。
+    """
+    forum = export_schema.ExportedForum.model_construct(
+        forum_id=row.forum_id,
+        title=row.title,
+        content=row.content,
+        comment_count=row.comment_count,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+        last_commented_at=row.last_commented_at,
+    )
+    return export_schema.ExportedForum.__pydantic_serializer__.to_json(forum) + b"\n"
+
+
+def _comment_line(row: Row) -> bytes:
+    """
+    掲示板コメントの行を作成する。
+    """
+    comment = export_schema.ExportedComment.model_construct(
+        forum_id=row.forum_id,
+        comment_id=row.comment_id,
+        comment=row.comment,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+    )
+    return export_schema.ExportedComment.__pydantic_serializer__.to_json(comment) + b"\n"
+
+
+def _add_forum_lines(
+    chunk: bytearray,
+    forums: Sequence[Row],
+    index: int,
+    commented_forum_id: int | None,
+    updated_since: datetime.datetime | None,
+) -> int:
+    """
+    forums[index]からcommented_forum_idまでの掲示板の行をchunkに追加し、次に追加する掲示板の位置を返却する。
+    commented_forum_idの掲示板はコメントの行が続くため、updated_sinceによらず追加する。
+    commented_forum_idがNoneの場合は、残りのすべての掲示板を対象とする。
+    """
+    while index < len(forums) and (commented_forum_id is None or forums[index].forum_id <= commented_forum_id):
+        forum: Row = forums[index]
+        if updated_since is None or forum.forum_id == commented_forum_id or forum.updated_at >= updated_since:
+            chunk += _forum_line(forum)
+        index += 1
+    return index
+
+
+async def export_ndjson(
+    session: AsyncSession,
+    updated_since: datetime.datetime | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    掲示板と掲示板コメントを1行1件のJSON(NDJSON)で返却する。
+    掲示板の行の後にその掲示板のコメントの行が続く。
+    updated_sinceを指定した場合は、updated_since以降に更新された掲示板とコメントのみを返却する。
+    コメントの作成・更新では掲示板のupdated_atは変わらないため、
+    updated_since以降に更新されたコメントがある掲示板は、コメントの行の前に掲示板の行も返却する(comment_count等の変更を含む)。
+    削除された掲示板とコメントは返却しないため、コメントの削除のみでcomment_countが変わった掲示板も返却しない。
+    掲示板をEXPORT_BATCH_SIZE件ずつ取得し、その範囲のコメントをサーバーサイドカーソルでEXPORT_BATCH_SIZE件ずつ取得するため、
+    件数によらずメモリ使用量は一定となる。同じトランザクションで取得するため、MySQLでは開始時点のデータを返却する。
+    """
+    # データベースの日時はタイムゾーンを持たないローカル時刻のため、ローカル時刻に変換する。
+    if updated_since is not None and updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone().replace(tzinfo=None)
+    after_forum_id: int = 0
+    while True:
+        database_result = await session.execute(_forums_query(after_forum_id))
+        forums: Sequence[Row] = database_result.all()
+        if len(forums) == 0:
+            return
+        after_forum_id = forums[-1].forum_id
+        index: int = 0
+        chunk: bytearray = bytearray()
+        comments_result = await session.stream(
+            _comments_query(forums[0].forum_id, after_forum_id, updated_since).execution_options(
+                yield_per=EXPORT_BATCH_SIZE,
+            ),
+        )
+        current_forum_id: int | None = None
+        async for rows in comments_result.partitions():
+            for row in rows:
+                if row.forum_id != current_forum_id:
+                    current_forum_id = row.forum_id
+                    # コメントの行の前に、その掲示板までの掲示板の行を作成する。
+                    index = _add_forum_lines(chunk, forums, index, row.forum_id, updated_since)
+                chunk += _comment_line(row)
+            yield bytes(chunk)
+            chunk.clear()
+        # コメントのない残りの掲示板の行を作成する。
+        _add_forum_lines(chunk, forums, index, None, updated_since)
+        if len(chunk) > 0:
+            yield bytes(chunk)
@@ -2,39 +2,212 @@
 掲示板のCRUD処理を行うモジュール。
 """
 
+import datetime
+import json
+from typing import Any, Literal, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import Select, select, insert, update, delete, func, and_, or_
+from sqlalchemy.engine import Row
+from src import etag, pubsub
 from src.models import forum as forum_model
+from src.models import comment as comment_model
+from src.cruds import common as common_crud
+from src.cruds import comment as comment_crud
+from src.cruds import search as search_crud
 from src.schemas import common as common_schema
 from src.schemas import forum as forum_schema
 
+# 掲示板の返却に使用するカラム
+_COLUMNS = (
+    forum_model.Forum.forum_id,
+    forum_model.Forum.title,
+    forum_model.Forum.content,
+    forum_model.Forum.comment_count,
+    forum_model.Forum.created_at,
+    forum_model.Forum.updated_at,
+    forum_model.Forum.last_commented_at,
+)
+
+# 掲示板取得のキャッシュ(キーはforum_id)
+forum_cache = common_crud.forum_cache
+
+
+def _to_schema(row: Row) -> forum_schema.Forum:
+    """
+    取得したレコードから返却オブジェクトを作成する。
+    データベースの値は検証済みとみなし、pydanticの検証を省略する。
+    """
+    return forum_schema.Forum.model_construct(
+        title=row.title,
+        content=row.content,
+        forum_id=row.forum_id,
+        comment_count=row.comment_count,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+        last_commented_at=row.last_commented_at,
+    )
+
+
+def _activity_cursor_condition(cursor: str) -> Any:
+    """
+    最終コメント日時の降順の一覧で、カーソルの続きを取得する条件を作成する。
+    (last_commented_at, forum_id)の行値比較はMySQLでインデックスを使用できない場合があるため、
+    last_commented_at < t OR (last_commented_at = t AND forum_id < id)に展開する。
+    カーソルが不正な場合はInvalidCursorErrorを送出する。
+    """
+    Model = forum_model.Forum
+    values = common_crud.decode_cursor(cursor, keys=("last_commented_at", "forum_id"))
+    if not isinstance(values["forum_id"], int) or not isinstance(values["last_commented_at"], str):
+        raise common_crud.InvalidCursorError(cursor)
+    try:
+        last_commented_at = datetime.datetime.fromisoformat(values["last_commented_at"])
+    except ValueError as error:
+        raise common_crud.InvalidCursorError(cursor) from error
+    return or_(
+        Model.last_commented_at < last_commented_at,
+        and_(Model.last_commented_at == last_commented_at, Model.forum_id < values["forum_id"]),
+    )
+
+
+def _page_query(
+    columns: Sequence[Any],
+    limit: int | None,
+    cursor: str | None,
+    sort: Literal["id", "activity"] = "id",
+) -> Select:
+    """
+    掲示板一覧の1ページ分を取得するクエリを作成する。
+    sortが"id"の場合はforum_idの降順、"activity"の場合は最終コメント日時とforum_idの降順で、
+    cursorの続きからlimit件を取得する。
+    カーソルが不正な場合はInvalidCursorErrorを送出する。
+    """
+    Model = forum_model.Forum
+    if sort == "activity":
+        query = select(*columns).order_by(Model.last_commented_at.desc(), Model.forum_id.desc())
+    else:
+        query = select(*columns).order_by(Model.forum_id.desc())
+    # カーソルが指定された場合は、前回の最後のレコードより後を取得する。
+    if cursor is not None:
+        if sort == "activity":
+            query = query.where(_activity_cursor_condition(cursor))
+        else:
+            values = common_crud.decode_cursor(cursor, keys=("forum_id",))
+            if not isinstance(values["forum_id"], int):
+                raise common_crud.InvalidCursorError(cursor)
+            query = query.where(Model.forum_id < values["forum_id"])
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _make_cursor(forum: forum_schema.Forum, sort: Literal["id", "activity"]) -> str:
+    """
+    最後に返却した掲示板から、次ページを取得するためのカーソルを作成する。
+    """
+    if sort == "activity":
+        return common_crud.encode_cursor(
+            {"last_commented_at": forum.last_commented_at.isoformat(), "forum_id": forum.forum_id},
+        )
+    return common_crud.encode_cursor({"forum_id": forum.forum_id})
+
 
 async def get_forums(
     session: AsyncSession,
+    limit: int | None = None,
+    cursor: str | None = None,
+    sort: Literal["id", "activity"] = "id",
 ) -> forum_schema.Forums:
     """
     掲示板一覧を取得する。
+    sortが"id"の場合はforum_idの降順、"activity"の場合は最終コメント日時の降順で取得する。
+    limitを指定した場合は、cursorの続きからlimit件を取得する。
+    カーソルが不正な場合はInvalidCursorErrorを送出する。
     """
     Model = forum_model.Forum
+    # 次ページの有無を判定するため、1件多く取得する。
+    # ORMのエンティティではなく返却に使用するカラムのみを取得し、行から直接返却オブジェクトを作成する。
+    # コメントIDの採番値はETagの作成に使用する。
+    query = _page_query((*_COLUMNS, Model.last_comment_id), None if limit is None else limit + 1, cursor, sort)
     # レコードを取得する。
-    database_result = await session.execute(
-        select(Model).order_by(Model.forum_id.desc())
-    )
-    rows = database_result.scalars().all()
+    database_result = await session.execute(query)
+    rows = database_result.all()
     # 返却オブジェクトを作成して返却する。
-    schema = forum_schema.Forums(forums=list())
-    for row in rows:
-        forum = forum_schema.Forum(
-            title=str(row.title),
-            content=str(row.content),
-            forum_id=row.forum_id,  # type: ignore
-            created_at=row.created_at,  # type: ignore
-            updated_at=row.updated_at,  # type: ignore
-        )
-        schema.forums.append(forum)
+    schema = forum_schema.Forums.model_construct(
+        forums=[_to_schema(row) for row in rows[:limit]],
+        next_cursor=None,
+    )
+    schema._last_comment_id_sum = sum(row.last_comment_id for row in rows[:limit])
+    if limit is not None and len(rows) > limit:
+        schema.next_cursor = _make_cursor(schema.forums[-1], sort)
     return schema
 
 
+def make_forums_etag(schema: forum_schema.Forums) -> str:
+    """
+    掲示板一覧のETagを作成する。
+    get_forums_etagと同じ値の組(件数、forum_idの最小値と最大値、updated_atの最大値、次ページを含めた件数、
+    last_commented_atの最大値、コメント数の合計、コメントIDの採番値の合計)から作成する。
+    採番値はコメントの作成で必ず増加し、コメント数はコメントの削除で必ず減少するため、
+    いずれかの掲示板でコメントが作成・削除された場合はETagが変わる。
+    """
+    forum_ids: list[int] = [forum.forum_id for forum in schema.forums]
+    updated_ats = [forum.updated_at for forum in schema.forums]
+    last_commented_ats = [forum.last_commented_at for forum in schema.forums]
+    return etag.make_etag(
+        len(forum_ids),
+        min(forum_ids, default=None),
+        max(forum_ids, default=None),
+        max(updated_ats, default=None),
+        len(forum_ids) + (0 if schema.next_cursor is None else 1),
+        max(last_commented_ats, default=None),
+        sum(forum.comment_count for forum in schema.forums),
+        schema._last_comment_id_sum,
+    )
+
+
+async def get_forums_etag(
+    session: AsyncSession,
+    limit: int | None = None,
+    cursor: str | None = None,
+    sort: Literal["id", "activity"] = "id",
+) -> str:
+    """
+    掲示板一覧のETagを集計クエリで取得する。
+    レコードを取得せずに、get_forumsの結果から作成したETagと同じ値を返却する。
+    カーソルが不正な場合はInvalidCursorErrorを送出する。
+    """
+    Model = forum_model.Forum
+    page = _page_query(
+        (Model.forum_id, Model.updated_at, Model.last_commented_at, Model.comment_count, Model.last_comment_id),
+        limit,
+        cursor,
+        sort,
+    ).subquery()
+    window = _page_query((Model.forum_id,), None if limit is None else limit + 1, cursor, sort).subquery()
+    database_result = await session.execute(
+        select(
+            func.count(),
+            func.min(page.c.forum_id),
+            func.max(page.c.forum_id),
+            func.max(page.c.updated_at),
+            select(func.count()).select_from(window).scalar_subquery(),
+            func.max(page.c.last_commented_at),
+            func.coalesce(func.sum(page.c.comment_count), 0),
+            func.coalesce(func.sum(page.c.last_comment_id), 0),
+        ).select_from(page)
+    )
+    *parts, comment_count_sum, last_comment_id_sum = database_result.one()
+    # MySQLのSUMはDecimalを返却するため、整数に変換する。
+    return etag.make_etag(*parts, int(comment_count_sum), int(last_comment_id_sum))
+
+
+def make_forum_etag(schema: forum_schema.Forum) -> str:
+    """
+    掲示板のETagを作成する。
+    """
+    return etag.make_etag(schema.forum_id, schema.updated_at, schema.comment_count, schema.last_commented_at)
+
+
 async def create_forum(
     session: AsyncSession,
     forum_create: forum_schema.ForumCreate,
@@ -42,20 +215,53 @@ async def create_forum(
     """
     掲示板を作成する。
     """
-    # レコードを作成する。
-    model = forum_model.Forum(**forum_create.model_dump())
-    session.add(model)
+    Model = forum_model.Forum
+    # レコードを作成して、作成したレコードを取得する。
+    row = await common_crud.insert_returning(
+        session,
+        insert(Model).values(**forum_create.model_dump()),
+        _COLUMNS,
+    )
+    # 同じトランザクションで検索用の索引を作成する。
+    await search_crud.add_documents(
+        session,
+        [(row.forum_id, search_crud.FORUM_DOCUMENT_ID, search_crud.forum_text(row.title, row.content))],
+    )
     await session.commit()
-    # 最新レコードを取得して返却する。
-    await session.refresh(model)
-    schema: forum_schema.Forum = forum_schema.Forum(
-        title=str(model.title),
-        content=str(model.content),
-        forum_id=model.forum_id,  # type: ignore
-        created_at=model.created_at,  # type: ignore
-        updated_at=model.updated_at,  # type: ignore
+    # 返却オブジェクトを作成して返却する。
+    return _to_schema(row)
+
+
+async def create_forums(
+    session: AsyncSession,
+    forum_creates: list[forum_schema.ForumCreate],
+) -> forum_schema.Forums:
+    """
+    複数の掲示板を1回のトランザクションで作成する。
+    作成した掲示板をforum_createsの順に返却する。
+    """
+    Model = forum_model.Forum
+    # 複数行のINSERTでレコードを作成して、作成したレコードを取得する。
+    rows = await common_crud.insert_many_returning(
+        session,
+        insert(Model),
+        [forum_create.model_dump() for forum_create in forum_creates],
+        _COLUMNS,
+    )
+    # 同じトランザクションで検索用の索引を作成する。
+    await search_crud.add_documents(
+        session,
+        [
+            (row.forum_id, search_crud.FORUM_DOCUMENT_ID, search_crud.forum_text(row.title, row.content))
+            for row in rows
+        ],
+    )
+    await session.commit()
+    # 返却オブジェクトを作成して返却する。
+    return forum_schema.Forums.model_construct(
+        forums=[_to_schema(row) for row in rows],
+        next_cursor=None,
     )
-    return schema
 
 
 async def get_forum(
@@ -65,25 +271,26 @@ async def get_forum(
     """
     掲示板を取得する。
     掲示板が存在しない場合はNoneを返却する。
+    キャッシュに存在する場合はデータベースを参照しない。
     """
     Model = forum_model.Forum
+    # キャッシュに存在する場合はキャッシュを返却する。
+    schema: forum_schema.Forum | None = forum_cache.get(forum_id)
+    if schema is not None:
+        return schema
+    generation: int = forum_cache.generation
     # レコードを取得する。
     database_result = await session.execute(
-        select(Model).filter(Model.forum_id == forum_id)
+        select(*_COLUMNS).where(Model.forum_id == forum_id)
     )
-    row = database_result.scalar_one_or_none()
+    row = database_result.one_or_none()
     # 取得対象のレコードが存在しない場合はNoneを返却する。
     if row is None:
         return None
-    # 返却オブジェクトを作成して返却する。
-    forum = forum_schema.Forum(
-        title=str(row.title),
-        content=str(row.content),
-        forum_id=row.forum_id,  # type: ignore
-        created_at=row.created_at,  # type: ignore
-        updated_at=row.updated_at,  # type: ignore
-    )
-    return forum
+    # 返却オブジェクトを作成し、キャッシュに登録して返却する。
+    schema = _to_schema(row)
+    forum_cache.set(forum_id, schema, generation)
+    return schema
 
 
 async def edit_forum(
@@ -96,28 +303,29 @@ async def edit_forum(
     掲示板が存在しない場合はNoneを返却する。
     """
     Model = forum_model.Forum
-    # 更新対象のレコードを取得する。
-    database_result = await session.execute(
-        select(Model).where(Model.forum_id == forum_id),
+    # 更新を実行して、更新後のレコードを取得する。
+    row = await common_crud.update_returning(
+        session,
+        update(Model)
+        .where(Model.forum_id == forum_id)
+        .values(title=forum_create.title, content=forum_create.content),
+        _COLUMNS,
     )
-    row: forum_model.Forum | None = database_result.scalar_one_or_none()
     # 更新対象のレコードが存在しない場合はNoneを返却する。
     if row is None:
+        await session.rollback()
         return None
-    # 更新を実行する。
-    row.title = forum_create.title  # type: ignore
-    row.content = forum_create.content  # type: ignore
-    await session.commit()
-    # 最新レコードを取得して返却する。
-    await session.refresh(row)
-    schema = forum_schema.Forum(
-        title=str(row.title),
-        content=str(row.content),
-        forum_id=row.forum_id,  # type: ignore
-        created_at=row.created_at,  # type: ignore
-        updated_at=row.updated_at,  # type: ignore
+    # 同じトランザクションで検索用の索引を作り直す。
+    await search_crud.replace_document(
+        session,
+        forum_id,
+        search_crud.FORUM_DOCUMENT_ID,
+        search_crud.forum_text(row.title, row.content),
     )
-    return schema
+    await session.commit()
+    forum_cache.invalidate(forum_id)
+    # 返却オブジェクトを作成して返却する。
+    return _to_schema(row)
 
 
 async def delete_forum(
@@ -129,15 +337,59 @@ async def delete_forum(
     掲示板が存在しない場合はNoneを返却する。
     """
     Model = forum_model.Forum
-    # 削除対象のレコードを取得する。
+    # 外部キー制約があるため、掲示板のコメントを先に削除する。
+    await session.execute(
+        delete(comment_model.Comment).where(comment_model.Comment.forum_id == forum_id),
+    )
+    # 削除を実行する。
     database_result = await session.execute(
-        select(Model).where(Model.forum_id == forum_id),
+        delete(Model).where(Model.forum_id == forum_id),
     )
-    row: forum_model.Forum | None = database_result.scalar_one_or_none()
     # 削除対象のレコードが存在しない場合はNoneを返却する。
-    if row is None:
+    if database_result.rowcount == 0:  # type: ignore
+        await session.rollback()
         return None
-    # 削除を実行してTrueを返却する。
-    await session.delete(row)
+    # 同じトランザクションで掲示板とコメントの検索用の索引を削除する。
+    await search_crud.remove_documents(session, forum_id)
     await session.commit()
+    forum_cache.invalidate(forum_id)
+    comment_crud.comment_cache.invalidate_if(lambda key: key[0] == forum_id)
+    # 掲示板のコメントの購読者に削除を配信し、購読を終了させる。
+    pubsub.broker.publish(
+        pubsub.Event(channel=forum_id, type="forum_deleted", data=json.dumps({"forum_id": forum_id})),
+    )
     return common_schema.NoData()
+
+
+async def reconcile_comment_counts(
+    session: AsyncSession,
+    first_forum_id: int,
+    last_forum_id: int,
+) -> int:
+    """
+    forum_idがfirst_forum_idからlast_forum_idまでの掲示板のコメント数を、コメントの件数に合わせて修正する。
+    修正した掲示板の件数を返却する。
+    """
+    Model = forum_model.Forum
+    CommentModel = comment_model.Comment
+    actual_count = (
+        select(func.count())
+        .select_from(CommentModel)
+        .where(CommentModel.forum_id == Model.forum_id)
+        .scalar_subquery()
+    )
+    # コメント数が一致しない掲示板のみ更新する。updated_atは掲示板自体の更新日時のため更新しない。
+    database_result = await session.execute(
+        update(Model)
+        .where(
+            Model.forum_id.between(first_forum_id, last_forum_id),
+            Model.comment_count != actual_count,
+        )
+        .values(comment_count=actual_count, updated_at=Model.updated_at)
+        .execution_options(synchronize_session=False),
+    )
+    await session.commit()
+    reconciled: int = database_result.rowcount  # type: ignore
+    if reconciled > 0:
+        forum_cache.invalidate_if(lambda key: first_forum_id <= key <= last_forum_id)
+    return reconciled
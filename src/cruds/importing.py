@@ -0,0 +1,242 @@
+"""
+NDJSONから掲示板と掲示板コメントのインポートを行うモジュール。
+
+各行は/export.ndjsonと同じ形式で、typeがforumの行はForumCreate、commentの行はCommentCreateとして検証する。
+コメントの行のforum_idは、それより前にある掲示板の行のforum_id(エクスポート元のID)を参照し、
+作成した掲示板のIDに置き換える。それより前に参照先の掲示板の行がない場合は、既存の掲示板のIDとして扱う。
+参照先はコメントの行を読み込んだ時点で決めるため、一度に作成する行数によらず結果は同じになる。
+"""
+
+import json
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.cruds import common as common_crud
+from src.cruds import forum as forum_crud
+from src.cruds import comment as comment_crud
+from src.schemas import forum as forum_schema
+from src.schemas import comment as comment_schema
+from src.schemas import importing as importing_schema
+
+# 1回のトランザクションで作成する行数の上限
+IMPORT_BATCH_SIZE = 500
+# 1行の長さの上限(バイト)。上限を超えた行はエラーとして読み飛ばす。
+MAX_LINE_BYTES = 64 * 1024
+# 返却するエラーの件数の上限
+MAX_REPORTED_ERRORS = 100
+# forum_idを指定した掲示板の行の件数の上限。エクスポート元のIDの対応を保持するため、メモリ使用量は件数に比例する。
+# 上限を超えた場合は、以降の行をインポートしない。
+MAX_FORUM_ID_MAPPINGS = 100000
+
+
+@dataclass
+class _Batch:
+    """
+    作成前の行
+    """
+
+    # (行番号, 作成する掲示板)
+    forums: list[tuple[int, forum_schema.ForumCreate]] = field(default_factory=list)
+    # エクスポート元のforum_idから、このバッチで作成する掲示板のforumsの位置への対応
+    forum_indexes: dict[int, int] = field(default_factory=dict)
+    # (行番号, 作成先のforum_id, 作成先の掲示板のforumsの位置, 作成するコメント)
+    # 作成先がこのバッチで作成する掲示板の場合はforumsの位置、それ以外の場合はforum_idを指定する。
+    comments: list[tuple[int, int | None, int | None, comment_schema.CommentCreate]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.forums) + len(self.comments)
+
+
+@dataclass
+class _ImportState:
+    """
+    インポート全体で保持する状態
+    """
+
+    result: importing_schema.ImportResult
+    # エクスポート元のforum_idから作成した掲示板のforum_idへの対応
+    forum_ids: dict[int, int] = field(default_factory=dict)
+    # 作成できなかった掲示板の行のエクスポート元のforum_id
+    failed_forum_ids: set[int] = field(default_factory=set)
+    # MAX_FORUM_ID_MAPPINGSを超えたため、以降の行をインポートしない
+    stopped: bool = False
+
+    def add_error(self, line: int, detail: str) -> None:
+        """
+        インポートできなかった行を記録する。
+        作成時のエラーは後から記録するため、行番号の順に並べ、行番号の小さい順にMAX_REPORTED_ERRORS件まで保持する。
+        """
+        self.result.error_count += 1
+        error = importing_schema.ImportLineError.model_construct(line=line, detail=detail)
+        insort(self.result.errors, error, key=lambda error: error.line)
+        if len(self.result.errors) > MAX_REPORTED_ERRORS:
+            self.result.errors.pop()
+        return None
+
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    受信したバイト列を行に分割し、(行番号, 行)を返却する。
+    MAX_LINE_BYTESを超えた行は、改行まで読み飛ばして行の代わりにNoneを返却する。
+    """
+    buffer: bytearray = bytearray()
+    line_number: int = 0
+    skipping: bool = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end: int = buffer.find(b"\n")
+            if end < 0:
+                break
+            line_number += 1
+            yield line_number, None if skipping or end > MAX_LINE_BYTES else bytes(buffer[:end])
+            del buffer[: end + 1]
+            skipping = False
+        # 改行が見つからないまま上限を超えた場合は、受信済みの分を破棄する。
+        if len(buffer) > MAX_LINE_BYTES:
+            buffer.clear()
+            skipping = True
+    if len(buffer) > 0 or skipping:
+        line_number += 1
+        yield line_number, None if skipping else bytes(buffer)
+    return
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """
+    検証エラーを1行のメッセージに変換する。
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _parse_line(line_number: int, line: bytes, batch: _Batch, state: _ImportState) -> None:
+    """
+    1行を検証して作成前の行に追加する。検証できない場合はエラーを記録する。
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        state.add_error(line_number, "JSONとして解釈できません。")
+        return None
+    if not isinstance(record, dict) or record.get("type") not in ("forum", "comment"):
+        state.add_error(line_number, "typeにはforumまたはcommentを指定してください。")
+        return None
+    forum_id = record.get("forum_id")
+    if forum_id is not None and (not isinstance(forum_id, int) or isinstance(forum_id, bool)):
+        state.add_error(line_number, "forum_idは整数で指定してください。")
+        return None
+    if record["type"] == "forum":
+        _parse_forum(line_number, record, forum_id, batch, state)
+        return None
+    if forum_id is None:
+        state.add_error(line_number, "コメントにはforum_idを指定してください。")
+        return None
+    try:
+        comment_create = comment_schema.CommentCreate.model_validate(record)
+    except ValidationError as error:
+        state.add_error(line_number, _format_validation_error(error))
+        return None
+    # 参照先を、この行より前にある掲示板の行から決める。
+    if forum_id in batch.forum_indexes:
+        batch.comments.append((line_number, None, batch.forum_indexes[forum_id], comment_create))
+    elif forum_id in state.failed_forum_ids:
+        state.add_error(line_number, "参照先の掲示板の行をインポートできませんでした。")
+    else:
+        batch.comments.append((line_number, state.forum_ids.get(forum_id, forum_id), None, comment_create))
+    return None
+
+
+def _parse_forum(line_number: int, record: dict, forum_id: int | None, batch: _Batch, state: _ImportState) -> None:
+    """
+    掲示板の行を検証して作成前の行に追加する。検証できない場合はエラーを記録する。
+    forum_idを指定した場合は、以降のコメントの行の参照先とする。
+    """
+    if forum_id is not None and forum_id not in batch.forum_indexes and forum_id not in state.forum_ids:
+        mappings: int = len(batch.forum_indexes) + len(state.forum_ids) + len(state.failed_forum_ids)
+        if forum_id not in state.failed_forum_ids and mappings >= MAX_FORUM_ID_MAPPINGS:
+            state.add_error(
+                line_number,
+                f"forum_idを指定した掲示板の行が{MAX_FORUM_ID_MAPPINGS}件を超えたため、以降の行はインポートしません。",
+            )
+            state.stopped = True
+            return None
+    try:
+        forum_create = forum_schema.ForumCreate.model_validate(record)
+    except ValidationError as error:
+        # 作成できなかった掲示板を参照するコメントもエラーとする。
+        if forum_id is not None:
+            batch.forum_indexes.pop(forum_id, None)
+            state.forum_ids.pop(forum_id, None)
+            state.failed_forum_ids.add(forum_id)
+        state.add_error(line_number, _format_validation_error(error))
+        return None
+    if forum_id is not None:
+        state.forum_ids.pop(forum_id, None)
+        state.failed_forum_ids.discard(forum_id)
+        batch.forum_indexes[forum_id] = len(batch.forums)
+    batch.forums.append((line_number, forum_create))
+    return None
+
+
+async def _flush(session: AsyncSession, batch: _Batch, state: _ImportState) -> None:
+    """
+    作成前の行を作成する。
+    掲示板は1回の一括作成で作成し、コメントは掲示板ごとに一括作成する。
+    """
+    created_forum_ids: list[int] = list()
+    if len(batch.forums) > 0:
+        forums = await forum_crud.create_forums(session, [forum_create for _, forum_create in batch.forums])
+        created_forum_ids = [forum.forum_id for forum in forums.forums]
+        for source_forum_id, index in batch.forum_indexes.items():
+            state.forum_ids[source_forum_id] = created_forum_ids[index]
+        state.result.forums += len(created_forum_ids)
+    # コメントを作成先の掲示板ごとに行の順でまとめる。
+    groups: dict[int, list[tuple[int, comment_schema.CommentCreate]]] = dict()
+    for line_number, forum_id, forum_index, comment_create in batch.comments:
+        if forum_index is not None:
+            forum_id = created_forum_ids[forum_index]
+        groups.setdefault(forum_id, list()).append((line_number, comment_create))  # type: ignore
+    for forum_id, comments in groups.items():
+        try:
+            await comment_crud.create_comments(session, forum_id, [comment_create for _, comment_create in comments])
+        except common_crud.ForumNotFoundError:
+            for line_number, _ in comments:
+                state.add_error(line_number, "掲示板が見つかりません。")
+            continue
+        state.result.comments += len(comments)
+    return None
+
+
+async def import_ndjson(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+) -> importing_schema.ImportResult:
+    """
+    NDJSONを受信しながら掲示板と掲示板コメントを作成し、作成件数とエラーを返却する。
+    IMPORT_BATCH_SIZE行ごとに作成してコミットするため、保持する行数は一定となる。
+    ただし、エクスポート元のforum_idの対応はMAX_FORUM_ID_MAPPINGS件まで保持する。
+    検証できない行はエラーとして記録し、残りの行のインポートを続ける。
+    """
+    state = _ImportState(
+        result=importing_schema.ImportResult.model_construct(forums=0, comments=0, error_count=0, errors=[]),
+    )
+    batch = _Batch()
+    async for line_number, line in _read_lines(chunks):
+        if line is None:
+            state.add_error(line_number, f"1行の長さは{MAX_LINE_BYTES}バイト以下にしてください。")
+            continue
+        # 空行は読み飛ばす。
+        if line.strip() == b"":
+            continue
+        _parse_line(line_number, line, batch, state)
+        if state.stopped:
+            break
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _flush(session, batch, state)
+            batch = _Batch()
+    await _flush(session, batch, state)
+    return state.result
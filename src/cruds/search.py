@@ -0,0 +1,222 @@
+"""
+掲示板と掲示板コメントの検索を行うモジュール。
+
+MySQLでは、ngramパーサーのFULLTEXTインデックスをMATCH AGAINSTで検索する。
+FULLTEXTインデックスはMySQLが更新するため、索引の更新は行わない。
+MySQL以外では、本文を2文字ずつに分割した文字列(bigram)の転置索引(search_index)で検索する。
+索引は掲示板と掲示板コメントの作成・更新・削除と同じトランザクションで更新する。
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Iterator
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, select, insert, delete, func, literal, union_all, and_
+from sqlalchemy.dialects import mysql
+from src.models import forum as forum_model
+from src.models import comment as comment_model
+from src.models import search as search_model
+from src.cruds import common as common_crud
+from src.schemas import search as search_schema
+
+# 掲示板自体の文書のcomment_id
+FORUM_DOCUMENT_ID = 0
+
+# 語として扱う文字の並び(文字・数字の連続)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def split_terms(text: str) -> list[str]:
+    """
+    文字列を正規化(NFKC・小文字化)して、語に分割する。
+    記号や空白は語の区切りとして扱う。
+    """
+    return _WORD_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def tokenize(text: str) -> Counter[str]:
+    """
+    文字列を語ごとに2文字ずつに分割し、bigramごとの出現回数を返却する。
+    MySQLのngramパーサーと同様に、1文字の語は索引に含めない。
+    """
+    tokens: Counter[str] = Counter()
+    for term in split_terms(text):
+        tokens.update(term[index : index + 2] for index in range(len(term) - 1))
+    return tokens
+
+
+def forum_text(title: str, content: str) -> str:
+    """
+    掲示板の索引を作成する本文を作成する。
+    タイトルと内容にまたがるbigramを作成しないように改行で区切る。
+    """
+    return f"{title}\n{content}"
+
+
+def index_rows(documents: Iterable[tuple[int, int, str]]) -> Iterator[dict]:
+    """
+    文書(forum_id, comment_id, 本文)から索引のレコードを作成する。
+    """
+    for forum_id, comment_id, text in documents:
+        for token, frequency in tokenize(text).items():
+            yield {"token": token, "forum_id": forum_id, "comment_id": comment_id, "frequency": frequency}
+
+
+def _uses_fulltext(session: AsyncSession) -> bool:
+    """
+    FULLTEXTインデックスで検索するデータベース(MySQL)かを判定する。
+    """
+    return common_crud.get_dialect(session).name == "mysql"
+
+
+async def add_documents(
+    session: AsyncSession,
+    documents: Iterable[tuple[int, int, str]],
+) -> None:
+    """
+    文書(forum_id, comment_id, 本文)の索引を作成する。コミットは呼び出し元で行う。
+    MySQLでは何もしない。
+    """
+    if _uses_fulltext(session):
+        return None
+    rows: list[dict] = list(index_rows(documents))
+    if len(rows) > 0:
+        await session.execute(insert(search_model.SearchIndex), rows)
+    return None
+
+
+async def remove_documents(
+    session: AsyncSession,
+    forum_id: int,
+    comment_id: int | None = None,
+) -> None:
+    """
+    文書の索引を削除する。コミットは呼び出し元で行う。
+    comment_idを指定しない場合は、掲示板と掲示板のすべてのコメントの索引を削除する。
+    MySQLでは何もしない。
+    """
+    if _uses_fulltext(session):
+        return None
+    Model = search_model.SearchIndex
+    statement = delete(Model).where(Model.forum_id == forum_id)
+    if comment_id is not None:
+        statement = statement.where(Model.comment_id == comment_id)
+    await session.execute(statement.execution_options(synchronize_session=False))
+    return None
+
+
+async def replace_document(
+    session: AsyncSession,
+    forum_id: int,
+    comment_id: int,
+    text: str,
+) -> None:
+    """
+    更新した文書の索引を作り直す。コミットは呼び出し元で行う。
+    MySQLでは何もしない。
+    """
+    if _uses_fulltext(session):
+        return None
+    await remove_documents(session, forum_id, comment_id)
+    await add_documents(session, [(forum_id, comment_id, text)])
+    return None
+
+
+def _fulltext_query(terms: list[str]) -> Select:
+    """
+    FULLTEXTインデックスで掲示板と掲示板コメントを検索するクエリを作成する。
+    すべての語を含む(BOOLEAN MODEの+語)文書を、MATCHの一致度とともに取得する。
+    """
+    Forum = forum_model.Forum
+    Comment = comment_model.Comment
+    # 語は文字・数字のみで構成されるため、BOOLEAN MODEの演算子を含まない。
+    against: str = " ".join(f"+{term}" for term in terms)
+    forum_match = mysql.match(Forum.title, Forum.content, against=against).in_boolean_mode()
+    comment_match = mysql.match(Comment.comment, against=against).in_boolean_mode()
+    hits = union_all(
+        select(
+            Forum.forum_id,
+            literal(FORUM_DOCUMENT_ID).label("comment_id"),
+            Forum.title.label("text"),
+            forum_match.label("score"),
+        ).where(forum_match),
+        select(
+            Comment.forum_id,
+            Comment.comment_id,
+            Comment.comment.label("text"),
+            comment_match.label("score"),
+        ).where(comment_match),
+    ).subquery()
+    return select(hits.c.forum_id, hits.c.comment_id, hits.c.text, hits.c.score).order_by(
+        hits.c.score.desc(),
+        hits.c.forum_id.desc(),
+        hits.c.comment_id.desc(),
+    )
+
+
+def _bigram_query(terms: list[str]) -> Select:
+    """
+    bigramの転置索引で掲示板と掲示板コメントを検索するクエリを作成する。
+    検索語のすべてのbigramを含む文書を、bigramの出現回数の合計を一致度として取得する。
+    """
+    Model = search_model.SearchIndex
+    Forum = forum_model.Forum
+    Comment = comment_model.Comment
+    tokens: list[str] = sorted({token for term in terms for token in tokenize(term)})
+    hits = (
+        select(Model.forum_id, Model.comment_id, func.sum(Model.frequency).label("score"))
+        .where(Model.token.in_(tokens))
+        .group_by(Model.forum_id, Model.comment_id)
+        .having(func.count() == len(tokens))
+        .subquery()
+    )
+    # 掲示板に一致した場合はタイトル、コメントに一致した場合はコメントを返却する。
+    return (
+        select(
+            hits.c.forum_id,
+            hits.c.comment_id,
+            func.coalesce(Comment.comment, Forum.title).label("text"),
+            hits.c.score,
+        )
+        .select_from(hits)
+        .join(Forum, Forum.forum_id == hits.c.forum_id)
+        .outerjoin(
+            Comment,
+            and_(Comment.forum_id == hits.c.forum_id, Comment.comment_id == hits.c.comment_id),
+        )
+        .order_by(hits.c.score.desc(), hits.c.forum_id.desc(), hits.c.comment_id.desc())
+    )
+
+
+async def search(
+    session: AsyncSession,
+    q: str,
+    limit: int,
+    offset: int = 0,
+) -> search_schema.SearchResults:
+    """
+    掲示板と掲示板コメントを検索し、一致度の降順でoffset件目からlimit件を取得する。
+    qは空白や記号で区切られた語として扱い、すべての語を含む文書を返却する。
+    2文字未満の語は索引に含まれないため無視する。
+    """
+    terms: list[str] = [term for term in split_terms(q) if len(term) >= 2]
+    if len(terms) == 0:
+        return search_schema.SearchResults.model_construct(hits=[], next_offset=None)
+    query = _fulltext_query(terms) if _uses_fulltext(session) else _bigram_query(terms)
+    # 次ページの有無を判定するため、1件多く取得する。
+    database_result = await session.execute(query.limit(limit + 1).offset(offset))
+    rows = database_result.all()
+    # 返却オブジェクトを作成して返却する。
+    return search_schema.SearchResults.model_construct(
+        hits=[
+            search_schema.SearchHit.model_construct(
+                forum_id=row.forum_id,
+                comment_id=None if row.comment_id == FORUM_DOCUMENT_ID else row.comment_id,
+                text=row.text,
+                score=float(row.score),
+            )
+            for row in rows[:limit]
+        ],
+        next_offset=offset + limit if len(rows) > limit else None,
+    )
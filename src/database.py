@@ -1,11 +1,108 @@
+import time
+from dataclasses import dataclass
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+from typing import AsyncGenerator, Mapping
+from fastapi import Request
 
-ASYNC_DB_URL = "mysql+aiomysql://root@database:3306/forum?charset=utf8"
+from src.settings import Settings, settings
 
-async_engine: AsyncEngine = create_async_engine(ASYNC_DB_URL, echo=True)
+ASYNC_DB_URL = settings.database_url
+
+
+@dataclass
+class PoolStats:
+    """
+    コネクションプールから接続を取得する際の待機時間の統計情報
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def record(self, wait_seconds: float) -> None:
+        """
+        接続の取得に要した時間を記録する。
+        """
+        self.checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        if wait_seconds > self.max_wait_seconds:
+            self.max_wait_seconds = wait_seconds
+        return None
+
+    @property
+    def average_wait_seconds(self) -> float:
+        """
+        接続の取得に要した時間の平均値を取得する。
+        """
+        if self.checkouts == 0:
+            return 0.0
+        return self.total_wait_seconds / self.checkouts
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    接続の取得に要した時間を記録するコネクションプール
+    """
+
+    def __init__(self, *args, **kwargs) -> None:  # type: ignore
+        super().__init__(*args, **kwargs)
+        self.stats: PoolStats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        started: float = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - started)
+
+    def recreate(self) -> "TimedQueuePool":
+        # dispose()で作り直した場合も統計情報を引き継ぐ。
+        pool: TimedQueuePool = super().recreate()  # type: ignore
+        pool.stats = self.stats
+        return pool
+
+
+def create_engine_from_settings(url: str, settings: Settings) -> AsyncEngine:
+    """
+    設定に従ってAsyncEngineを作成する。
+    SQLiteのインメモリデータベースはコネクションプールを使用しないため、プールの設定を適用しない。
+    """
+    options: dict = {
+        "echo": settings.database_echo,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        "pool_recycle": settings.database_pool_recycle,
+    }
+    if make_url(url).database not in (None, "", ":memory:"):
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+        )
+    return create_async_engine(url, **options)
+
+
+def get_pool_stats(engine: AsyncEngine) -> PoolStats | None:
+    """
+    エンジンのコネクションプールの統計情報を取得する。
+    統計情報を記録しないプールの場合はNoneを返却する。
+    """
+    pool = engine.sync_engine.pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.stats
+    return None
+
+
+async_engine: AsyncEngine = create_engine_from_settings(ASYNC_DB_URL, settings)
 
 async_session = sessionmaker(
     autocommit=False,
@@ -17,7 +114,63 @@ async_session = sessionmaker(
 Base = declarative_base()
 
 
+# 読み取り専用レプリカ(設定されていない場合はNone)
+replica_engine: AsyncEngine | None = None
+replica_session: sessionmaker | None = None
+if settings.database_replica_url is not None:
+    replica_engine = create_engine_from_settings(settings.database_replica_url, settings)
+    replica_session = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=replica_engine,  # type: ignore
+        class_=AsyncSession,
+    )
+
+# 最後に書き込みを行った時刻を保持するCookieの名前
+LAST_WRITE_COOKIE = "last_write_at"
+
+
+def wrote_recently(cookies: Mapping[str, str], now: float | None = None) -> bool:
+    """
+    クライアントがread_your_writes_seconds以内に書き込みを行ったかを判定する。
+    """
+    value: str | None = cookies.get(LAST_WRITE_COOKIE)
+    if value is None:
+        return False
+    try:
+        last_write_at: float = float(value)
+    except ValueError:
+        return False
+    if now is None:
+        now = time.time()
+    return now - last_write_at < settings.read_your_writes_seconds
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:  # type: ignore
         session: AsyncSession
         yield session
+
+
+def get_read_session_maker(request: Request) -> sessionmaker:
+    """
+    読み込み用のセッションを作成するsessionmakerを取得する。
+    レプリカが設定されている場合はレプリカに接続する。
+    ただし、直近に書き込みを行ったクライアントは、書き込みを読めるようにdatabase_urlに接続する。
+    依存関係のセッションはレスポンスの返却前に閉じられるため、
+    ストリーミングのレスポンスではこのsessionmakerで返却中にセッションを作成する。
+    """
+    if replica_session is not None and not wrote_recently(request.cookies):
+        return replica_session
+    return async_session
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    読み込み用のセッションを取得する。
+    接続先はget_read_session_makerと同じ規則で選択する。
+    """
+    session_maker: sessionmaker = get_read_session_maker(request)
+    async with session_maker() as session:  # type: ignore
+        session: AsyncSession
+        yield session
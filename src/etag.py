@@ -0,0 +1,43 @@
+"""
+ETagを使用した条件付きGETの処理を定義するモジュール。
+"""
+
+import hashlib
+from fastapi import HTTPException, status
+
+
+def make_etag(*parts: object) -> str:
+    """
+    取得結果を識別する値の組からWeak ETagを作成する。
+    """
+    text: str = ":".join(str(part) for part in parts)
+    digest: str = hashlib.sha1(text.encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-MatchヘッダーがETagに一致するかを判定する。
+    If-None-Matchは弱い比較で判定するため、W/の有無は区別しない。
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag: str = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == opaque_tag:
+            return True
+    return False
+
+
+def return_304_if_not_modified(if_none_match: str | None, etag: str) -> None:
+    """
+    If-None-MatchがETagに一致する場合は304を返却する。
+    """
+    if etag_matches(if_none_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag},
+        )
+    return None
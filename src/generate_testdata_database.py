@@ -0,0 +1,264 @@
+"""
+負荷試験用のテストデータを生成するモジュール。
+
+    python -m src.generate_testdata_database --forums 100000 --comments 10000000 --distribution zipf --seed 1
+
+掲示板ごとのコメント数は、一部の掲示板にコメントが集中するZipf分布、または均等な分布から選択する。
+同じ引数とシードであれば同じデータを生成する。
+batch_size件ずつ複数行のINSERTで作成し、batch_size件ごとにコミットする。
+接続先は--urlまたは環境変数DATABASE_URLで指定する(例: sqlite+aiosqlite:///./loadtest.db)。
+MySQL以外では、同じバッチで検索用の索引(search_index)も作成する。
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import time
+from array import array
+from typing import Callable, Iterator, Literal
+from sqlalchemy import Table, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src import migrate_database
+from src.settings import settings
+from src.models import forum as forum_model
+from src.models import comment as comment_model
+from src.models import search as search_model
+from src.cruds import search as search_crud
+
+ForumTable: Table = forum_model.Forum.__table__  # type: ignore
+CommentTable: Table = comment_model.Comment.__table__  # type: ignore
+SearchIndexTable: Table = search_model.SearchIndex.__table__  # type: ignore
+
+# レコードから検索用の索引を作成する文書(forum_id, comment_id, 本文)を作成する関数
+DocumentFunction = Callable[[dict], tuple[int, int, str]]
+
+
+def forum_document(row: dict) -> tuple[int, int, str]:
+    """
+    掲示板のレコードから検索用の索引を作成する文書を作成する。
+    """
+    return row["forum_id"], search_crud.FORUM_DOCUMENT_ID, search_crud.forum_text(row["title"], row["content"])
+
+
+def comment_document(row: dict) -> tuple[int, int, str]:
+    """
+    掲示板コメントのレコードから検索用の索引を作成する文書を作成する。
+    """
+    return row["forum_id"], row["comment_id"], row["comment"]
+
+# タイトル・内容・コメントに使用する単語
+WORDS: tuple[str, ...] = (
+    "最近", "音楽", "映画", "本", "旅行", "料理", "仕事", "趣味", "天気", "週末",
+    "おすすめ", "質問", "感想", "ニュース", "ゲーム", "スポーツ", "勉強", "健康", "猫", "犬",
+)
+# 生成するデータの作成日時の起点
+START_AT = datetime.datetime(2024, 1, 1)
+# 1件ごとに文字列を作成すると遅いため、作成済みの文字列から選択する。
+TEXT_POOL_SIZE = 1024
+
+
+def comment_counts(
+    forums: int,
+    comments: int,
+    distribution: Literal["zipf", "uniform"],
+    zipf_exponent: float,
+    rng: random.Random,
+) -> array:
+    """
+    掲示板ごとのコメント数を作成する。合計はcommentsと一致する。
+    zipfの場合はk番目に多い掲示板のコメント数が1/k^zipf_exponentに比例し、
+    多い掲示板が先頭に偏らないように並び順をシャッフルする。
+    """
+    counts = array("q", [comments // forums] * forums)
+    if distribution == "uniform":
+        for index in range(comments % forums):
+            counts[index] += 1
+        rng.shuffle(counts)
+        return counts
+    weights: list[float] = [1.0 / rank**zipf_exponent for rank in range(1, forums + 1)]
+    total_weight: float = sum(weights)
+    counts = array("q", (int(comments * weight / total_weight) for weight in weights))
+    # 切り捨てた端数は、コメント数の多い掲示板から1件ずつ割り当てる。
+    for index in range(comments - sum(counts)):
+        counts[index % forums] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+def text_pool(rng: random.Random, max_length: int) -> list[str]:
+    """
+    単語を組み合わせて、max_length文字以下の文字列をTEXT_POOL_SIZE件作成する。
+    """
+    return [
+        "".join(rng.choices(WORDS, k=rng.randint(1, 8)))[:max_length]
+        for _ in range(TEXT_POOL_SIZE)
+    ]
+
+
+def forum_rows(first_forum_id: int, counts: array, rng: random.Random) -> Iterator[dict]:
+    """
+    掲示板のレコードを作成する。
+    last_comment_idとcomment_countには作成するコメント数を設定し、
+    last_commented_atには最後のコメントの作成日時(コメントがない場合は掲示板の作成日時)を設定する。
+    """
+    titles: list[str] = text_pool(rng, 20)
+    contents: list[str] = text_pool(rng, 100)
+    for index, count in enumerate(counts):
+        created_at = START_AT + datetime.timedelta(minutes=index)
+        yield {
+            "forum_id": first_forum_id + index,
+            "title": rng.choice(titles),
+            "content": rng.choice(contents),
+            "last_comment_id": count,
+            "comment_count": count,
+            "created_at": created_at,
+            "updated_at": created_at,
+            "last_commented_at": created_at + datetime.timedelta(seconds=count),
+        }
+
+
+def comment_rows(first_forum_id: int, counts: array, rng: random.Random) -> Iterator[dict]:
+    """
+    掲示板コメントのレコードを作成する。
+    comment_idは掲示板ごとに1から採番し、作成日時は掲示板の作成日時より後にする。
+    """
+    comments: list[str] = text_pool(rng, 100)
+    for index, count in enumerate(counts):
+        forum_created_at = START_AT + datetime.timedelta(minutes=index)
+        for comment_id in range(1, count + 1):
+            created_at = forum_created_at + datetime.timedelta(seconds=comment_id)
+            yield {
+                "forum_id": first_forum_id + index,
+                "comment_id": comment_id,
+                "comment": rng.choice(comments),
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+
+async def insert_rows(
+    connection: AsyncConnection,
+    table: Table,
+    rows: Iterator[dict],
+    batch_size: int,
+    document: DocumentFunction | None = None,
+) -> int:
+    """
+    レコードをbatch_size件ずつ複数行のINSERTで作成し、batch_size件ごとにコミットする。
+    documentを指定した場合は、同じバッチで検索用の索引も作成する。
+    作成した件数を返却する。
+    """
+    inserted: int = 0
+    started: float = time.perf_counter()
+    batch: list[dict] = list()
+    for row in rows:
+        batch.append(row)
+        if len(batch) < batch_size:
+            continue
+        inserted += await _insert_batch(connection, table, batch, document)
+        batch = list()
+        print(f"{table.name}: {inserted:,}件 ({inserted / (time.perf_counter() - started):,.0f}件/秒)")
+    if len(batch) > 0:
+        inserted += await _insert_batch(connection, table, batch, document)
+    print(f"{table.name}: {inserted:,}件 完了 ({time.perf_counter() - started:.1f}秒)")
+    return inserted
+
+
+async def _insert_batch(
+    connection: AsyncConnection,
+    table: Table,
+    batch: list[dict],
+    document: DocumentFunction | None,
+) -> int:
+    """
+    複数行のINSERTでレコードを作成してコミットする。
+    executemanyで実行し、MySQLのドライバは1つの複数行のINSERT文に書き換えて送信する。
+    """
+    await connection.execute(insert(table), batch)
+    if document is not None:
+        index_rows: list[dict] = list(search_crud.index_rows(map(document, batch)))
+        if len(index_rows) > 0:
+            await connection.execute(insert(SearchIndexTable), index_rows)
+    await connection.commit()
+    return len(batch)
+
+
+async def generate(
+    url: str,
+    forums: int,
+    comments: int,
+    distribution: Literal["zipf", "uniform"] = "zipf",
+    zipf_exponent: float = 1.1,
+    seed: int = 0,
+    batch_size: int = 1000,
+    migrate: bool = False,
+) -> None:
+    """
+    テストデータを生成する。
+    既存の掲示板がある場合は、最大のforum_idの続きから作成する。
+    """
+    rng = random.Random(seed)
+    counts: array = comment_counts(forums, comments, distribution, zipf_exponent, rng)
+    engine = create_async_engine(url)
+    async with engine.connect() as connection:
+        if migrate:
+            await connection.run_sync(migrate_database.upgrade)
+            await connection.commit()
+        database_result = await connection.execute(select(func.coalesce(func.max(ForumTable.c.forum_id), 0)))
+        first_forum_id: int = database_result.scalar_one() + 1
+        await connection.commit()
+        # MySQLはFULLTEXTインデックスで検索するため、検索用の索引を作成しない。
+        uses_fulltext: bool = connection.dialect.name == "mysql"
+        await insert_rows(
+            connection,
+            ForumTable,
+            forum_rows(first_forum_id, counts, rng),
+            batch_size,
+            None if uses_fulltext else forum_document,
+        )
+        await insert_rows(
+            connection,
+            CommentTable,
+            comment_rows(first_forum_id, counts, rng),
+            batch_size,
+            None if uses_fulltext else comment_document,
+        )
+    await engine.dispose()
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--forums", type=int, default=1000, help="作成する掲示板の件数(既定値: 1000)")
+    parser.add_argument("--comments", type=int, default=None, help="作成するコメントの合計件数(既定値: 掲示板の件数x10)")
+    parser.add_argument(
+        "--distribution",
+        choices=("zipf", "uniform"),
+        default="zipf",
+        help="掲示板ごとのコメント数の分布(既定値: zipf)",
+    )
+    parser.add_argument("--zipf-exponent", type=float, default=1.1, help="Zipf分布の指数。大きいほど偏る(既定値: 1.1)")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード(既定値: 0)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1回のINSERTで作成する件数(既定値: 1000)")
+    parser.add_argument("--url", default=settings.database_url, help="接続先(既定値: 環境変数DATABASE_URL)")
+    parser.add_argument("--migrate", action="store_true", help="作成前にマイグレーションを実行する")
+    args = parser.parse_args()
+    if args.forums < 1 or args.batch_size < 1:
+        parser.error("--forumsと--batch-sizeは1以上を指定してください。")
+    asyncio.run(
+        generate(
+            url=args.url,
+            forums=args.forums,
+            comments=args.forums * 10 if args.comments is None else args.comments,
+            distribution=args.distribution,
+            zipf_exponent=args.zipf_exponent,
+            seed=args.seed,
+            batch_size=args.batch_size,
+            migrate=args.migrate,
+        )
+    )
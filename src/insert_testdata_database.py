@@ -63,6 +63,8 @@ def insert_record():
         comment="将来のためになる本です。",
     )
     session.add(comment)
+    forum.last_comment_id = 2  # type: ignore
+    forum.comment_count = 2  # type: ignore
 
     session.commit()
     session.close()
@@ -1,14 +1,64 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from fastapi import FastAPI
 
+from src import pubsub
+from src.database import LAST_WRITE_COOKIE
+from src.metrics import instrument_engines
+from src.middleware import MetricsMiddleware, QueryCountMiddleware, ReadYourWritesMiddleware
 from src.routers import forum
 from src.routers import comment
+from src.routers import export
+from src.routers import importing
+from src.routers import metrics
+from src.routers import search
+from src.settings import settings
 
 # MEMO: 仮実装
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    コメントの更新を配信するブローカーを、アプリケーションの開始時に開始し、終了時に終了する。
+    接続中のSSEの返却は、終了のシグナルを受信した時点で終了する。
+    """
+    await pubsub.broker.start()
+    pubsub.close_subscriptions_on_exit(pubsub.broker)
+    yield
+    await pubsub.broker.close()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(forum.router)
 app.include_router(comment.router)
+app.include_router(search.router)
+app.include_router(export.router)
+app.include_router(importing.router)
 
 # MEMO: 仮実装
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+# レプリカを使用する場合は、書き込み直後のクライアントの読み込みを書き込み先に振り分ける。
+if settings.database_replica_url is not None:
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        cookie_name=LAST_WRITE_COOKIE,
+        max_age=settings.read_your_writes_seconds,
+    )
+
+# リクエストごとのクエリ数を数え、同じSQLの繰り返し(N+1)を検出する。
+if settings.expose_query_count or settings.query_repeat_warning_threshold > 0:
+    instrument_engines()
+    app.add_middleware(
+        QueryCountMiddleware,
+        header_name="X-Query-Count" if settings.expose_query_count else None,
+        repeat_threshold=settings.query_repeat_warning_threshold,
+    )
+
+# メトリクスを計測する。すべてのミドルウェアを含めて計測するため、最後に追加する。
+if settings.metrics_enabled:
+    instrument_engines()
+    app.include_router(metrics.router)
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,350 @@
+"""
+Prometheusのテキスト形式で出力するメトリクスを定義するモジュール。
+
+メトリクスはプロセスごとに集計する(uvicornのワーカーごとに別の値となる)。
+イベントループのスレッドからのみ更新する前提のため、ロックを使用しない。
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src import database, pubsub
+from src.cruds import comment as comment_crud
+from src.cruds import forum as forum_crud
+
+# レイテンシのヒストグラムのバケット(秒)
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# 1リクエストあたりのクエリ数のヒストグラムのバケット
+QUERY_COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """
+    ラベルの値の\\、"、改行をエスケープする。
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    """
+    ラベルを{name="value",...}の形式に変換する。
+    """
+    pairs: list[str] = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra != "":
+        pairs.append(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """
+    値をPrometheusのテキスト形式の数値に変換する。
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    増加のみする値
+    """
+
+    type_name: str = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str, ...] = label_names
+        self._values: dict[LabelValues, float] = dict()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+        return None
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for label_values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """
+    増減する値
+    """
+
+    type_name: str = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+        return None
+
+    def set(self, *label_values: str, value: float) -> None:
+        self._values[label_values] = value
+        return None
+
+
+class Histogram:
+    """
+    値の分布
+    バケットごとの件数は、出力時に累積値へ変換する。
+    """
+
+    type_name: str = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str, ...] = label_names
+        self.buckets: tuple[float, ...] = buckets
+        # ラベルの値ごとの[バケットごとの件数(最後は+Inf), 合計値]
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = dict()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        entry = self._values.get(label_values)
+        if entry is None:
+            entry = ([0] * (len(self.buckets) + 1), [0.0])
+            self._values[label_values] = entry
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+        return None
+
+    def count(self, *label_values: str) -> int:
+        entry = self._values.get(label_values)
+        return 0 if entry is None else sum(entry[0])
+
+    def samples(self) -> Iterator[str]:
+        for label_values, (counts, total) in self._values.items():
+            cumulative: int = 0
+            for bucket, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels: str = _format_labels(self.label_names, label_values, f'le="{_format_value(bucket)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+Metric = Counter | Gauge | Histogram
+
+
+class Registry:
+    """
+    メトリクスの一覧
+    出力時に値を取得するメトリクスは、コールバックとして登録する。
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = list()
+        self._callbacks: list[Callable[[], Iterable[Metric]]] = list()
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, callback: Callable[[], Iterable[Metric]]) -> None:
+        self._callbacks.append(callback)
+        return None
+
+    def render(self) -> str:
+        """
+        Prometheusのテキスト形式(0.0.4)に変換する。
+        """
+        metrics: list[Metric] = list(self._metrics)
+        for callback in self._callbacks:
+            metrics.extend(callback())
+        lines: list[str] = list()
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION: Histogram = registry.register(
+    Histogram("http_request_duration_seconds", "リクエストの処理時間(秒)", ("method", "route")),
+)
+REQUESTS_IN_FLIGHT: Gauge = registry.register(
+    Gauge("http_requests_in_flight", "処理中のリクエスト数"),
+)
+RESPONSES: Counter = registry.register(
+    Counter("http_responses_total", "ステータスコードごとのレスポンス数", ("method", "route", "status")),
+)
+REQUEST_DB_QUERIES: Histogram = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "1リクエストで実行したクエリ数",
+        ("method", "route"),
+        QUERY_COUNT_BUCKETS,
+    ),
+)
+REQUEST_DB_DURATION: Histogram = registry.register(
+    Histogram("http_request_db_duration_seconds", "1リクエストでクエリの実行に要した時間(秒)", ("method", "route")),
+)
+DB_QUERY_DURATION: Histogram = registry.register(
+    Histogram("db_query_duration_seconds", "クエリの種類ごとの実行時間(秒)", ("operation",)),
+)
+REPEATED_QUERIES: Counter = registry.register(
+    Counter(
+        "http_request_repeated_queries_total",
+        "1リクエストで同じSQLを繰り返し実行した(N+1の可能性がある)リクエスト数",
+        ("method", "route"),
+    ),
+)
+
+
+@dataclass
+class QueryStats:
+    """
+    1リクエストで実行したクエリの統計情報
+    """
+
+    count: int = 0
+    seconds: float = 0.0
+    # SQL文ごとの実行回数(同じSQLの繰り返しを検出する場合のみ集計する)
+    statements: dict[str, int] | None = None
+
+
+# 処理中のリクエストのクエリの統計情報(リクエスト外ではNone)
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    """
+    SQL文の種類(SELECT・INSERT等)を取得する。
+    """
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    return None
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore
+    started: list[float] = conn.info.get("query_started", [])
+    if len(started) == 0:
+        return None
+    seconds: float = time.perf_counter() - started.pop()
+    DB_QUERY_DURATION.observe(seconds, _operation(statement))
+    stats: QueryStats | None = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+        if stats.statements is not None:
+            stats.statements[statement] = stats.statements.get(statement, 0) + 1
+    return None
+
+
+def _handle_error(exception_context) -> None:  # type: ignore
+    # 失敗したクエリはafter_cursor_executeが呼び出されないため、開始時刻を破棄する。
+    # 破棄しない場合、プールに戻した接続に残り、以降のクエリの実行時間を誤って計測する。
+    # 1つの接続で同時に実行するクエリは1つのため、残っている開始時刻はすべて失敗したクエリのものとなる。
+    connection = exception_context.connection
+    if connection is None:
+        return None
+    connection.info.get("query_started", []).clear()
+    return None
+
+
+def instrument_engines() -> None:
+    """
+    すべてのエンジンのクエリの実行を計測する。
+    Engineクラスにイベントを登録するため、テスト等で作成したエンジンも計測対象となる。
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    return None
+
+
+def _pool_metrics() -> Iterator[Metric]:
+    """
+    コネクションプールの接続の取得に要した時間を出力する。
+    """
+    engines = {"primary": database.async_engine, "replica": database.replica_engine}
+    checkouts = Counter("db_pool_checkouts_total", "コネクションプールから接続を取得した回数", ("engine",))
+    timeouts = Counter("db_pool_checkout_timeouts_total", "接続の取得がタイムアウトした回数", ("engine",))
+    wait = Counter("db_pool_checkout_wait_seconds_total", "接続の取得に要した時間の合計(秒)", ("engine",))
+    max_wait = Gauge("db_pool_checkout_wait_seconds_max", "接続の取得に要した時間の最大値(秒)", ("engine",))
+    checked_out = Gauge("db_pool_checked_out_connections", "使用中の接続数", ("engine",))
+    for name, engine in engines.items():
+        if engine is None:
+            continue
+        stats: database.PoolStats | None = database.get_pool_stats(engine)
+        if stats is None:
+            continue
+        checkouts.inc(name, amount=stats.checkouts)
+        timeouts.inc(name, amount=stats.timeouts)
+        wait.inc(name, amount=stats.total_wait_seconds)
+        max_wait.set(name, value=stats.max_wait_seconds)
+        checked_out.set(name, value=engine.sync_engine.pool.checkedout())  # type: ignore
+    yield from (checkouts, timeouts, wait, max_wait, checked_out)
+
+
+def _cache_metrics() -> Iterator[Metric]:
+    """
+    プロセス内のキャッシュの統計情報を出力する。
+    """
+    caches = {"forum": forum_crud.forum_cache, "comment": comment_crud.comment_cache}
+    counters: dict[str, Counter] = {
+        field: Counter(f"cache_{field}_total", documentation, ("cache",))
+        for field, documentation in (
+            ("hits", "キャッシュから取得した回数"),
+            ("misses", "キャッシュに存在しなかった回数"),
+            ("evictions", "件数の上限を超えて破棄した件数"),
+            ("expirations", "有効期限を過ぎて破棄した件数"),
+            ("invalidations", "更新・削除により無効化した件数"),
+        )
+    }
+    entries = Gauge("cache_entries", "キャッシュの件数", ("cache",))
+    for name, cache in caches.items():
+        stats = cache.stats()
+        for field, counter in counters.items():
+            counter.inc(name, amount=getattr(stats, field))
+        entries.set(name, value=len(cache))
+    yield from counters.values()
+    yield entries
+
+
+def _pubsub_metrics() -> Iterator[Metric]:
+    """
+    コメントの更新の配信の統計情報を出力する。
+    """
+    stats = pubsub.broker.stats()
+    subscribers = Gauge("pubsub_subscribers", "このプロセスのSSEの購読者数")
+    subscribers.set(value=pubsub.broker.subscriber_count())
+    published = Counter("pubsub_published_total", "このプロセスで発行したイベント数")
+    published.inc(amount=stats.published)
+    delivered = Counter("pubsub_delivered_total", "購読者に配信したイベント数")
+    delivered.inc(amount=stats.delivered)
+    dropped = Counter("pubsub_dropped_subscribers_total", "受信が遅く切断した購読者数")
+    dropped.inc(amount=stats.dropped_subscribers)
+    yield from (subscribers, published, delivered, dropped)
+
+
+registry.register_callback(_pool_metrics)
+registry.register_callback(_cache_metrics)
+registry.register_callback(_pubsub_metrics)
@@ -0,0 +1,165 @@
+"""
+アプリケーションに追加するミドルウェアを定義するモジュール。
+"""
+
+import logging
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# 書き込みとして扱わないHTTPメソッド
+_SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# 長時間返却を続けるレスポンスのメディアタイプ(SSE・エクスポート)
+_STREAMING_MEDIA_TYPES = frozenset(("text/event-stream", "application/x-ndjson"))
+
+
+class ReadYourWritesMiddleware:
+    """
+    書き込みに成功したクライアントに、書き込み時刻のCookieを設定するミドルウェア
+
+    get_read_sessionはこのCookieを参照し、書き込み直後のクライアントの読み込みを
+    レプリカではなく書き込み先のデータベースに振り分ける。
+    """
+
+    def __init__(self, app: ASGIApp, cookie_name: str, max_age: float) -> None:
+        self.app: ASGIApp = app
+        self.cookie_name: str = cookie_name
+        self.max_age: int = max(1, int(max_age))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return None
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{self.cookie_name}={time.time():.3f}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+        return None
+
+
+class MetricsMiddleware:
+    """
+    リクエストの処理時間・ステータスコード・クエリ数を計測するミドルウェア
+
+    ラベルにはURLではなくルートのテンプレート(例: /forums/{forum_id}/comments)を使用する。
+    ルートに一致しなかったリクエストは"unmatched"として集計する。
+    SSE等のストリーミングのレスポンスは、接続時間が処理時間の分布を歪めるため、ステータスコードのみ集計し、
+    処理中のリクエスト数からはレスポンスの返却開始時に除く。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return None
+        # レスポンスを返却する前に例外が発生した場合は500として集計する。
+        status_code: int = 500
+        streaming: bool = False
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                media_type: str = MutableHeaders(scope=message).get("content-type", "").split(";")[0].strip()
+                if media_type in _STREAMING_MEDIA_TYPES:
+                    streaming = True
+                    metrics.REQUESTS_IN_FLIGHT.dec()
+            await send(message)
+
+        query_stats = metrics.QueryStats()
+        token = metrics.current_query_stats.set(query_stats)
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        started: float = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed: float = time.perf_counter() - started
+            metrics.current_query_stats.reset(token)
+            # ルーティング後のscopeには一致したルートが設定される。
+            route: str = getattr(scope.get("route"), "path", "unmatched")
+            method: str = scope["method"]
+            metrics.RESPONSES.inc(method, route, str(status_code))
+            if not streaming:
+                metrics.REQUESTS_IN_FLIGHT.dec()
+                metrics.REQUEST_DURATION.observe(elapsed, method, route)
+                metrics.REQUEST_DB_QUERIES.observe(query_stats.count, method, route)
+                metrics.REQUEST_DB_DURATION.observe(query_stats.seconds, method, route)
+        return None
+
+
+class QueryCountMiddleware:
+    """
+    リクエストごとに実行したクエリ数を数えるミドルウェア
+
+    header_nameを指定した場合は、クエリ数をレスポンスヘッダーに設定する。
+    同じSQLをrepeat_threshold回以上実行したリクエストは、N+1の可能性があるとして警告を出力する。
+    MetricsMiddlewareの内側に追加した場合は、MetricsMiddlewareと同じ統計情報を使用する。
+    """
+
+    def __init__(self, app: ASGIApp, header_name: str | None, repeat_threshold: int) -> None:
+        self.app: ASGIApp = app
+        self.header_name: str | None = header_name
+        self.repeat_threshold: int = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return None
+        query_stats: metrics.QueryStats | None = metrics.current_query_stats.get()
+        token = None
+        if query_stats is None:
+            query_stats = metrics.QueryStats()
+            token = metrics.current_query_stats.set(query_stats)
+        if self.repeat_threshold > 0:
+            query_stats.statements = dict()
+
+        async def send_with_query_count(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.header_name is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append(self.header_name, str(query_stats.count))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_query_count)
+        finally:
+            if token is not None:
+                metrics.current_query_stats.reset(token)
+            self._warn_repeated_queries(scope, query_stats)
+        return None
+
+    def _warn_repeated_queries(self, scope: Scope, query_stats: metrics.QueryStats) -> None:
+        """
+        同じSQLをrepeat_threshold回以上実行した場合は警告を出力する。
+        """
+        if query_stats.statements is None:
+            return None
+        repeated: list[tuple[str, int]] = [
+            (statement, count)
+            for statement, count in query_stats.statements.items()
+            if count >= self.repeat_threshold
+        ]
+        if len(repeated) == 0:
+            return None
+        route: str = getattr(scope.get("route"), "path", "unmatched")
+        metrics.REPEATED_QUERIES.inc(scope["method"], route)
+        for statement, count in repeated:
+            logger.warning(
+                "N+1の可能性があります。%s %sで同じSQLを%d回実行しました。: %s",
+                scope["method"],
+                route,
+                count,
+                " ".join(statement.split())[:200],
+            )
+        return None
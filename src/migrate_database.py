@@ -1,18 +1,99 @@
-from sqlalchemy import create_engine
+"""
+データベースのマイグレーションを実行するモジュール。
 
-from src.models import forum as forum_model
-from src.models import comment as comment_model
+    python -m src.migrate_database              # 最新のリビジョンまで更新する
+    python -m src.migrate_database 0002         # 指定したリビジョンまで更新する
+    python -m src.migrate_database --downgrade 0002
+    python -m src.migrate_database --reset      # すべてのテーブルを削除して作り直す
 
-# DB_URL = "mysql+pymysql://root@0.0.0.0:3306/forum?charset=utf8"
-DB_URL = "mysql+pymysql://root@database:3306/forum?charset=utf8"
-engine = create_engine(DB_URL, echo=True)
+接続先は環境変数DATABASE_URLで指定する。
+"""
 
+import argparse
+import asyncio
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import Base
+from src.settings import settings
+
+# マイグレーションのスクリプトを配置するディレクトリ
+MIGRATIONS_DIRECTORY = Path(__file__).parent / "migrations"
+# マイグレーション導入前のreset_database()で作成したテーブル構造のリビジョン
+BASELINE_REVISION = "0001"
+
+
+def make_config(connection: Connection | None = None) -> Config:
+    """
+    Alembicの設定を作成する。
+    connectionを指定した場合は、その接続でマイグレーションを実行する。
+    """
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIRECTORY))
+    config.attributes["connection"] = connection
+    return config
+
+
+def _stamp_if_unversioned(connection: Connection) -> None:
+    """
+    マイグレーション導入前に作成したデータベースの場合は、基準のリビジョンを記録する。
+    テーブルを作り直さずに、以降のマイグレーションを適用するために使用する。
+    """
+    table_names: list[str] = inspect(connection).get_table_names()
+    if "forum" in table_names and "alembic_version" not in table_names:
+        command.stamp(make_config(connection), BASELINE_REVISION)
+    return None
+
+
+def upgrade(connection: Connection, revision: str = "head") -> None:
+    """
+    データベースを指定したリビジョンまで更新する。
+    """
+    _stamp_if_unversioned(connection)
+    command.upgrade(make_config(connection), revision)
+    return None
+
+
+def downgrade(connection: Connection, revision: str) -> None:
+    """
+    データベースを指定したリビジョンまで戻す。
+    """
+    command.downgrade(make_config(connection), revision)
+    return None
+
+
+def reset_database(connection: Connection) -> None:
+    """
+    すべてのテーブルを削除して、最新のリビジョンで作り直す。
+    """
+    Base.metadata.drop_all(bind=connection)
+    connection.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    command.upgrade(make_config(connection), "head")
+    return None
+
+
+async def main(url: str, revision: str, is_downgrade: bool, is_reset: bool) -> None:
+    engine = create_async_engine(url, echo=True)
+    async with engine.begin() as connection:
+        if is_reset:
+            await connection.run_sync(reset_database)
+        elif is_downgrade:
+            await connection.run_sync(downgrade, revision)
+        else:
+            await connection.run_sync(upgrade, revision)
+    await engine.dispose()
+    return None
 
-def reset_database():
-    forum_model.Base.metadata.drop_all(bind=engine)
-    forum_model.Base.metadata.create_all(bind=engine)
-    comment_model.Base.metadata.drop_all(bind=engine)
-    comment_model.Base.metadata.create_all(bind=engine)
 
 if __name__ == "__main__":
-    reset_database()
+    parser = argparse.ArgumentParser(description="データベースのマイグレーションを実行する。")
+    parser.add_argument("revision", nargs="?", default="head", help="更新先のリビジョン(既定値: head)")
+    parser.add_argument("--downgrade", action="store_true", help="指定したリビジョンまで戻す")
+    parser.add_argument("--reset", action="store_true", help="すべてのテーブルを削除して作り直す")
+    parser.add_argument("--url", default=settings.database_url, help="接続先(既定値: 環境変数DATABASE_URL)")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.revision, args.downgrade, args.reset))
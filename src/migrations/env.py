@@ -0,0 +1,87 @@
+"""
+Alembicのマイグレーションの実行環境を定義するモジュール。
+
+接続先は環境変数DATABASE_URL(src.settings)から取得する。
+config.attributes["connection"]に接続が渡された場合は、その接続でマイグレーションを実行する。
+"""
+
+import asyncio
+from alembic import context
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import Base
+from src.settings import settings
+from src.models import forum as forum_model  # noqa: F401
+from src.models import comment as comment_model  # noqa: F401
+from src.models import search as search_model  # noqa: F401
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """
+    接続先を取得する。
+    alembic.iniや-xオプションでsqlalchemy.urlが指定された場合はそれを優先する。
+    """
+    return config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+def run_migrations_offline() -> None:
+    """
+    データベースに接続せずに、実行するSQLを出力する。
+    """
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+    return None
+
+
+def do_run_migrations(connection: Connection) -> None:
+    """
+    接続を使用してマイグレーションを実行する。
+    """
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLiteはALTER TABLEの機能が限られるため、テーブルを作り直して変更する。
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+    return None
+
+
+async def run_async_migrations() -> None:
+    """
+    非同期のエンジンで接続してマイグレーションを実行する。
+    """
+    engine = create_async_engine(get_url())
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+    return None
+
+
+def run_migrations_online() -> None:
+    """
+    データベースに接続してマイグレーションを実行する。
+    """
+    connection: Connection | None = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return None
+    asyncio.run(run_async_migrations())
+    return None
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,50 @@
+"""掲示板とコメントのテーブルを作成する
+
+reset_database()で作成していた時点のテーブル構造。
+既存のデータベースはこのリビジョンにstampしてから以降のマイグレーションを適用する。
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-06-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "forum",
+        sa.Column("forum_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=20), nullable=False),
+        sa.Column("content", sa.String(length=100), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("forum_id"),
+    )
+    op.create_table(
+        "Comment",
+        sa.Column("forum_id", sa.Integer(), nullable=False),
+        sa.Column("comment_id", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.String(length=100), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["forum_id"], ["forum.forum_id"]),
+        sa.PrimaryKeyConstraint("forum_id", "comment_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("Comment")
+    op.drop_table("forum")
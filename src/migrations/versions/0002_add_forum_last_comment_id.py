@@ -0,0 +1,47 @@
+"""掲示板にコメントIDの採番値を追加する
+
+既存の掲示板は、コメントIDの最大値を採番値として設定する。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-06-02 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.add_column(
+            sa.Column("last_comment_id", sa.Integer(), nullable=False, server_default="0"),
+        )
+    # 既存のコメントとcomment_idが重複しないように採番値を設定する。
+    forum = sa.table("forum", sa.column("forum_id"), sa.column("last_comment_id"))
+    comment = sa.table("Comment", sa.column("forum_id"), sa.column("comment_id"))
+    op.execute(
+        forum.update().values(
+            last_comment_id=sa.func.coalesce(
+                sa.select(sa.func.max(comment.c.comment_id))
+                .where(comment.c.forum_id == forum.c.forum_id)
+                .scalar_subquery(),
+                0,
+            ),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.drop_column("last_comment_id")
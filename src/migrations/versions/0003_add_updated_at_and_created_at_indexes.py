@@ -0,0 +1,48 @@
+"""一覧の絞り込みと並べ替えに使用するインデックスを追加する
+
+MySQLではテーブルをロックせずに作成する(オンラインDDL)。
+オンラインで作成できない場合は、ロックせずにエラーとなる。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-06-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (インデックス名, テーブル名, カラム名)
+INDEXES: list[tuple[str, str, list[str]]] = [
+    ("ix_forum_updated_at", "forum", ["updated_at"]),
+    ("ix_Comment_forum_id_created_at", "Comment", ["forum_id", "created_at"]),
+    ("ix_Comment_forum_id_updated_at", "Comment", ["forum_id", "updated_at"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for index_name, table_name, column_names in INDEXES:
+        if op.get_bind().dialect.name == "mysql":
+            columns = ", ".join(f"`{column_name}`" for column_name in column_names)
+            op.execute(
+                f"CREATE INDEX `{index_name}` ON `{table_name}` ({columns}) ALGORITHM=INPLACE LOCK=NONE"
+            )
+        else:
+            op.create_index(index_name, table_name, column_names)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for index_name, table_name, _ in reversed(INDEXES):
+        if op.get_bind().dialect.name == "mysql":
+            op.execute(f"DROP INDEX `{index_name}` ON `{table_name}` ALGORITHM=INPLACE LOCK=NONE")
+        else:
+            op.drop_index(index_name, table_name)
@@ -0,0 +1,44 @@
+"""掲示板にコメント数を追加する
+
+既存の掲示板は、コメントの件数を集計して設定する。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-06-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.add_column(
+            sa.Column("comment_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    forum = sa.table("forum", sa.column("forum_id"), sa.column("comment_count"))
+    comment = sa.table("Comment", sa.column("forum_id"))
+    op.execute(
+        forum.update().values(
+            comment_count=sa.select(sa.func.count())
+            .select_from(comment)
+            .where(comment.c.forum_id == forum.c.forum_id)
+            .scalar_subquery(),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.drop_column("comment_count")
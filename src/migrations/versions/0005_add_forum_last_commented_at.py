@@ -0,0 +1,62 @@
+"""掲示板に最終コメント日時を追加する
+
+既存の掲示板は、コメントの作成日時の最大値(コメントがない場合は掲示板の作成日時)を設定する。
+最終コメント日時の降順の一覧で使用するインデックスも追加する。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-06-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME: str = "ix_forum_last_commented_at_forum_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 既存の行に値を設定してからNOT NULLに変更する。
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.add_column(sa.Column("last_commented_at", sa.DateTime(), nullable=True))
+    forum = sa.table(
+        "forum",
+        sa.column("forum_id"),
+        sa.column("created_at"),
+        sa.column("last_commented_at"),
+    )
+    comment = sa.table("Comment", sa.column("forum_id"), sa.column("created_at"))
+    op.execute(
+        forum.update().values(
+            last_commented_at=sa.func.coalesce(
+                sa.select(sa.func.max(comment.c.created_at))
+                .where(comment.c.forum_id == forum.c.forum_id)
+                .scalar_subquery(),
+                forum.c.created_at,
+            ),
+        )
+    )
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.alter_column("last_commented_at", existing_type=sa.DateTime(), nullable=False)
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(
+            f"CREATE INDEX `{INDEX_NAME}` ON `forum` (`last_commented_at`, `forum_id`) ALGORITHM=INPLACE LOCK=NONE"
+        )
+    else:
+        op.create_index(INDEX_NAME, "forum", ["last_commented_at", "forum_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX_NAME, "forum")
+    with op.batch_alter_table("forum") as batch_op:
+        batch_op.drop_column("last_commented_at")
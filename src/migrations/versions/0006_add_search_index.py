@@ -0,0 +1,95 @@
+"""検索用の索引を追加する
+
+MySQLでは、ngramパーサーのFULLTEXTインデックスを追加する。
+FULLTEXTインデックスはオンラインDDLでも書き込みをロックする(LOCK=SHARED)ため、負荷の低い時間に実行する。
+MySQL以外では、既存の掲示板とコメントからbigramの転置索引(search_index)を作成する。
+search_indexテーブルはモデルと一致させるためMySQLにも作成するが、使用しない。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-06-06 00:00:00.000000
+
+"""
+from typing import Iterable, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.cruds import search as search_crud
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (インデックス名, テーブル名, カラム名)
+FULLTEXT_INDEXES: list[tuple[str, str, list[str]]] = [
+    ("ft_forum_title_content", "forum", ["title", "content"]),
+    ("ft_Comment_comment", "Comment", ["comment"]),
+]
+
+# 索引の作成で1回に読み込む件数
+BATCH_SIZE: int = 1000
+
+
+def _insert_index_rows(documents: Iterable[tuple[int, int, str]]) -> None:
+    """
+    文書(forum_id, comment_id, 本文)の索引をBATCH_SIZE件ずつ作成する。
+    """
+    search_index = sa.table(
+        "search_index",
+        sa.column("token"),
+        sa.column("forum_id"),
+        sa.column("comment_id"),
+        sa.column("frequency"),
+    )
+    batch: list[tuple[int, int, str]] = list()
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            op.get_bind().execute(search_index.insert(), list(search_crud.index_rows(batch)))
+            batch = list()
+    rows: list[dict] = list(search_crud.index_rows(batch))
+    if len(rows) > 0:
+        op.get_bind().execute(search_index.insert(), rows)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "search_index",
+        sa.Column("token", sa.String(length=2), nullable=False),
+        sa.Column("forum_id", sa.Integer(), nullable=False),
+        sa.Column("comment_id", sa.Integer(), nullable=False),
+        sa.Column("frequency", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("token", "forum_id", "comment_id"),
+    )
+    op.create_index("ix_search_index_forum_id_comment_id", "search_index", ["forum_id", "comment_id"])
+    if op.get_bind().dialect.name == "mysql":
+        for index_name, table_name, column_names in FULLTEXT_INDEXES:
+            columns = ", ".join(f"`{column_name}`" for column_name in column_names)
+            op.execute(
+                f"CREATE FULLTEXT INDEX `{index_name}` ON `{table_name}` ({columns}) "
+                "WITH PARSER ngram ALGORITHM=INPLACE LOCK=SHARED"
+            )
+        return None
+    forum = sa.table("forum", sa.column("forum_id"), sa.column("title"), sa.column("content"))
+    forums = op.get_bind().execute(sa.select(forum.c.forum_id, forum.c.title, forum.c.content))
+    _insert_index_rows(
+        (forum_id, search_crud.FORUM_DOCUMENT_ID, search_crud.forum_text(title, content))
+        for forum_id, title, content in forums
+    )
+    comment = sa.table("Comment", sa.column("forum_id"), sa.column("comment_id"), sa.column("comment"))
+    comments = op.get_bind().execute(sa.select(comment.c.forum_id, comment.c.comment_id, comment.c.comment))
+    _insert_index_rows((forum_id, comment_id, text) for forum_id, comment_id, text in comments)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "mysql":
+        for index_name, table_name, _ in reversed(FULLTEXT_INDEXES):
+            op.execute(f"DROP INDEX `{index_name}` ON `{table_name}`")
+    op.drop_index("ix_search_index_forum_id_comment_id", "search_index")
+    op.drop_table("search_index")
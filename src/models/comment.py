@@ -3,7 +3,7 @@
 """
 
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -14,6 +14,17 @@ class Comment(Base):
     """
 
     __tablename__ = "Comment"
+    __table_args__ = (
+        Index("ix_Comment_forum_id_created_at", "forum_id", "created_at"),
+        Index("ix_Comment_forum_id_updated_at", "forum_id", "updated_at"),
+        # MySQLの全文検索で使用する。MySQL以外では作成しない。
+        Index(
+            "ft_Comment_comment",
+            "comment",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+    )
 
     # カラム定義
     forum_id = Column(
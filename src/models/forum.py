@@ -3,7 +3,7 @@
 """
 
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -14,6 +14,18 @@ class Forum(Base):
     """
 
     __tablename__ = "forum"
+    __table_args__ = (
+        # 最終コメント日時の降順の一覧で使用する。
+        Index("ix_forum_last_commented_at_forum_id", "last_commented_at", "forum_id"),
+        # MySQLの全文検索で使用する。MySQL以外では作成しない。
+        Index(
+            "ft_forum_title_content",
+            "title",
+            "content",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+    )
 
     # カラム定義
     forum_id = Column(
@@ -31,6 +43,20 @@ class Forum(Base):
         String(100),
         nullable=False,
     )
+    last_comment_id = Column(
+        "last_comment_id",
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+    comment_count = Column(
+        "comment_count",
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
     created_at = Column(
         "created_at",
         DateTime,
@@ -43,6 +69,14 @@ class Forum(Base):
         nullable=False,
         default=datetime.datetime.now,
         onupdate=datetime.datetime.now,
+        index=True,
+    )
+    # 最後にコメントが作成された日時。コメントが作成されていない場合は掲示板の作成日時。
+    last_commented_at = Column(
+        "last_commented_at",
+        DateTime,
+        nullable=False,
+        default=datetime.datetime.now,
     )
 
     # リレーション定義
@@ -0,0 +1,45 @@
+"""
+検索用の索引のモデルを定義するモジュール。
+"""
+
+from sqlalchemy import Column, Integer, String, Index
+from ..database import Base
+
+
+class SearchIndex(Base):
+    """
+    検索用の索引モデル
+
+    掲示板と掲示板コメントの本文を2文字ずつに分割した文字列(bigram)の転置索引。
+    MySQLではFULLTEXTインデックスで検索するため使用しない。
+    """
+
+    __tablename__ = "search_index"
+    __table_args__ = (
+        # 文書の索引の更新・削除で使用する。
+        Index("ix_search_index_forum_id_comment_id", "forum_id", "comment_id"),
+    )
+
+    # カラム定義
+    token = Column(
+        "token",
+        String(2),
+        primary_key=True,
+    )
+    forum_id = Column(
+        "forum_id",
+        Integer,
+        primary_key=True,
+    )
+    # 掲示板の場合は0
+    comment_id = Column(
+        "comment_id",
+        Integer,
+        primary_key=True,
+    )
+    # 文書に含まれるtokenの出現回数
+    frequency = Column(
+        "frequency",
+        Integer,
+        nullable=False,
+    )
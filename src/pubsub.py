@@ -0,0 +1,348 @@
+"""
+イベントを購読者に配信するPub/Subを定義するモジュール。
+
+チャンネル(掲示板ID)ごとに購読者を管理し、発行したイベントを購読者のキューに配信する。
+購読者のキューは件数に上限があり、上限に達した(受信が遅い)購読者は切断する。
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+import uuid
+from dataclasses import dataclass, replace
+from typing import AsyncIterator
+
+from src.settings import Settings, settings
+
+# SSEの切断後にクライアントが再接続するまでの時間(ミリ秒)
+SSE_RETRY_MILLISECONDS = 3000
+# 配信後に購読を終了するイベントの種類(掲示板の削除)
+TERMINAL_EVENT_TYPES = frozenset(("forum_deleted",))
+
+
+@dataclass(frozen=True)
+class Event:
+    """
+    配信するイベント
+    """
+
+    # チャンネル(掲示板ID)
+    channel: int
+    # イベントの種類(created, updated, deleted, forum_deleted)
+    type: str
+    # イベントの内容(JSON)
+    data: str
+
+    def encode(self) -> bytes:
+        """
+        ほかのプロセスに送信するためにバイト列に変換する。
+        """
+        return json.dumps({"channel": self.channel, "type": self.type, "data": self.data}).encode()
+
+    @classmethod
+    def decode(cls, data: bytes) -> "Event":
+        """
+        ほかのプロセスから受信したバイト列から復元する。
+        """
+        values = json.loads(data)
+        return cls(channel=values["channel"], type=values["type"], data=values["data"])
+
+
+@dataclass
+class PubSubStats:
+    """
+    Pub/Subの統計情報
+    """
+
+    published: int = 0
+    delivered: int = 0
+    dropped_subscribers: int = 0
+
+
+class Subscription:
+    """
+    チャンネルの購読
+
+    受信が遅くキューが上限に達した場合は、ブローカーから切断されてdroppedがTrueになる。
+    ブローカーの終了時も切断されるが、droppedはFalseのままとなる。
+    """
+
+    def __init__(self, broker: "LocalBroker", channel: int, maxsize: int) -> None:
+        self.channel: int = channel
+        self.dropped: bool = False
+        self._broker: LocalBroker = broker
+        # Noneは切断を表す。
+        self._queue: asyncio.Queue[Event | None] = asyncio.Queue(maxsize)
+
+    def _put(self, event: Event) -> bool:
+        """
+        イベントをキューに追加する。キューが上限に達している場合はFalseを返却する。
+        """
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def _drop(self, dropped: bool = True) -> None:
+        """
+        未受信のイベントを破棄して切断する。
+        """
+        self.dropped = dropped
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+        return None
+
+    async def get(self, timeout: float | None = None) -> Event | None:
+        """
+        次のイベントを取得する。切断された場合はNoneを返却する。
+        timeout秒以内にイベントがない場合はTimeoutErrorを送出する。
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self) -> None:
+        """
+        購読を終了する。
+        """
+        self._broker.unsubscribe(self)
+        return None
+
+
+class LocalBroker:
+    """
+    同じプロセス内の購読者にイベントを配信するブローカー
+
+    イベントループ内から呼び出す前提のため、排他制御は行わない。
+    ほかのブローカーは、このクラスを継承してpublish・start・closeを実装する。
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size: int = queue_size
+        self._subscriptions: dict[int, set[Subscription]] = dict()
+        self._stats: PubSubStats = PubSubStats()
+        self._closing: bool = False
+
+    def subscribe(self, channel: int) -> Subscription:
+        """
+        チャンネルを購読する。
+        終了中の場合は、切断済みの購読を返却する(クライアントはほかのワーカーに再接続する)。
+        """
+        subscription = Subscription(self, channel, self.queue_size)
+        if self._closing:
+            subscription._drop(dropped=False)
+            return subscription
+        self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        購読を終了する。
+        """
+        subscriptions: set[Subscription] | None = self._subscriptions.get(subscription.channel)
+        if subscriptions is None:
+            return None
+        subscriptions.discard(subscription)
+        if len(subscriptions) == 0:
+            del self._subscriptions[subscription.channel]
+        return None
+
+    def publish(self, event: Event) -> None:
+        """
+        イベントを発行する。
+        """
+        self._stats.published += 1
+        self._deliver(event)
+        return None
+
+    def _deliver(self, event: Event) -> None:
+        """
+        このプロセスの購読者にイベントを配信する。
+        キューが上限に達している購読者は切断する。
+        """
+        for subscription in list(self._subscriptions.get(event.channel, ())):
+            if subscription._put(event):
+                self._stats.delivered += 1
+                continue
+            self.unsubscribe(subscription)
+            subscription._drop()
+            self._stats.dropped_subscribers += 1
+        return None
+
+    def subscriber_count(self) -> int:
+        """
+        このプロセスの購読者数を取得する。
+        """
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def stats(self) -> PubSubStats:
+        """
+        統計情報の複製を取得する。
+        """
+        return replace(self._stats)
+
+    def close_subscriptions(self) -> None:
+        """
+        すべての購読を切断し、以降の購読も切断する。
+        サーバーは接続中のレスポンスの完了を待ってから終了するため、終了を開始した時点で呼び出してSSEの返却を終了する。
+        """
+        self._closing = True
+        subscriptions: list[Subscription] = [
+            subscription for subscriptions in self._subscriptions.values() for subscription in subscriptions
+        ]
+        self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription._drop(dropped=False)
+        return None
+
+    async def start(self) -> None:
+        """
+        ブローカーを開始する。
+        """
+        self._closing = False
+        return None
+
+    async def close(self) -> None:
+        """
+        ブローカーを終了する。
+        """
+        self.close_subscriptions()
+        return None
+
+
+class UnixDatagramBroker(LocalBroker):
+    """
+    同じホストの複数のワーカーでイベントを共有するブローカー
+
+    ワーカーごとにsocket_dirにUnixドメインのデータグラムソケットを作成し、
+    発行したイベントをこのプロセスの購読者に配信するとともに、ほかのワーカーのソケットに送信する。
+    複数のホストで共有する場合は、同じインターフェースでRedis等を使用するブローカーに置き換える。
+    """
+
+    def __init__(self, queue_size: int, socket_dir: str) -> None:
+        super().__init__(queue_size)
+        self.socket_dir: str = socket_dir
+        self.path: str = os.path.join(socket_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._socket: socket.socket | None = None
+
+    async def start(self) -> None:
+        await super().start()
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        self._socket.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._receive)
+        return None
+
+    async def close(self) -> None:
+        await super().close()
+        if self._socket is None:
+            return None
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        return None
+
+    def publish(self, event: Event) -> None:
+        super().publish(event)
+        if self._socket is None:
+            return None
+        data: bytes = event.encode()
+        for entry in os.scandir(self.socket_dir):
+            if not entry.name.endswith(".sock") or entry.path == self.path:
+                continue
+            try:
+                self._socket.sendto(data, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # 終了したワーカーのソケットは削除する。
+                if os.path.exists(entry.path):
+                    os.unlink(entry.path)
+            except BlockingIOError:
+                # 受信側のバッファが一杯の場合は、受信が遅い購読者と同様にイベントを破棄する。
+                pass
+        return None
+
+    def _receive(self) -> None:
+        """
+        ほかのワーカーから受信したイベントを、このプロセスの購読者に配信する。
+        """
+        while self._socket is not None:
+            try:
+                data: bytes = self._socket.recv(65536)
+            except BlockingIOError:
+                return None
+            self._deliver(Event.decode(data))
+        return None
+
+
+def create_broker(settings: Settings) -> LocalBroker:
+    """
+    設定に従ってブローカーを作成する。
+    """
+    if settings.pubsub_broker == "unix":
+        return UnixDatagramBroker(settings.sse_queue_size, settings.pubsub_socket_dir)
+    return LocalBroker(settings.sse_queue_size)
+
+
+def close_subscriptions_on_exit(broker: LocalBroker) -> None:
+    """
+    終了のシグナル(SIGINT・SIGTERM)を受信した時点で、ブローカーのすべての購読を切断する。
+    サーバー(uvicorn)は接続中のレスポンスの完了を待ってからアプリケーションの終了処理を行うため、
+    終了処理で切断するとSSEの接続が残っている間はワーカーが終了しない。
+    サーバーが登録したシグナルハンドラーは、購読の切断後に呼び出す。
+    シグナルハンドラーはメインスレッドでのみ登録できるため、それ以外では何もしない。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signal_number)
+
+        def handler(signal_number: int, frame, previous=previous) -> None:  # type: ignore
+            loop.call_soon_threadsafe(broker.close_subscriptions)
+            if callable(previous):
+                previous(signal_number, frame)
+            elif previous != signal.SIG_IGN:
+                # 既定の処理(終了)を行う。
+                signal.signal(signal_number, signal.SIG_DFL)
+                signal.raise_signal(signal_number)
+            return None
+
+        signal.signal(signal_number, handler)
+    return None
+
+
+async def stream_events(broker: LocalBroker, channel: int, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """
+    チャンネルを購読し、イベントをServer-Sent Eventsの形式で返却する。
+    heartbeat_seconds秒ごとにコメント行を送信し、接続が切れていないことを確認する。
+    受信が遅く切断された場合は、droppedイベントを送信して終了する。
+    掲示板の削除(TERMINAL_EVENT_TYPES)を送信した場合と、ブローカーの終了で切断された場合も終了する。
+    返却を開始してから購読するため、返却前にクライアントが切断しても購読は残らない。
+    """
+    subscription: Subscription = broker.subscribe(channel)
+    try:
+        yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n".encode()
+        while True:
+            try:
+                event: Event | None = await subscription.get(heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                if subscription.dropped:
+                    yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield f"event: {event.type}\ndata: {event.data}\n\n".encode()
+            if event.type in TERMINAL_EVENT_TYPES:
+                return
+    finally:
+        subscription.close()
+
+
+broker: LocalBroker = create_broker(settings)
@@ -0,0 +1,52 @@
+"""
+掲示板のコメント数をコメントの件数に合わせて修正するモジュール。
+
+    python -m src.reconcile_comment_count [--batch-size 1000] [--url URL]
+
+コメント数はコメントの作成・削除と同じトランザクションで更新するため通常はずれないが、
+データベースを直接操作した場合等に実行する。
+掲示板をforum_idの範囲ごとに分けて更新し、範囲ごとにコミットする。
+接続先は--urlまたは環境変数DATABASE_URLで指定する。
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.settings import settings
+from src.models import forum as forum_model
+from src.cruds import forum as forum_crud
+
+
+async def reconcile(url: str, batch_size: int) -> int:
+    """
+    すべての掲示板のコメント数を修正し、修正した掲示板の件数を返却する。
+    """
+    Model = forum_model.Forum
+    engine = create_async_engine(url)
+    reconciled: int = 0
+    async with AsyncSession(engine) as session:
+        database_result = await session.execute(select(func.min(Model.forum_id), func.max(Model.forum_id)))
+        min_forum_id, max_forum_id = database_result.one()
+        await session.commit()
+        if min_forum_id is not None:
+            for first_forum_id in range(min_forum_id, max_forum_id + 1, batch_size):
+                reconciled += await forum_crud.reconcile_comment_counts(
+                    session,
+                    first_forum_id,
+                    first_forum_id + batch_size - 1,
+                )
+    await engine.dispose()
+    return reconciled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="掲示板のコメント数をコメントの件数に合わせて修正する。")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1回のトランザクションで確認する掲示板の件数(既定値: 1000)")
+    parser.add_argument("--url", default=settings.database_url, help="接続先(既定値: 環境変数DATABASE_URL)")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-sizeは1以上を指定してください。")
+    count: int = asyncio.run(reconcile(args.url, args.batch_size))
+    print(f"{count}件の掲示板のコメント数を修正しました。")
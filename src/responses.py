@@ -0,0 +1,33 @@
+"""
+APIのレスポンスを定義するモジュール。
+"""
+
+from typing import Any, Mapping
+from fastapi import Response
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+
+class ModelResponse(Response):
+    """
+    スキーマを検証せずにJSONに変換して返却するレスポンス
+
+    FastAPIは返却値をresponse_modelで再度検証してからJSONに変換するが、
+    データベースから取得したレコードで作成したスキーマは検証済みとみなせるため、
+    pydanticのシリアライザで直接JSONのバイト列に変換する。
+    エンドポイントのresponse_modelはドキュメントの生成のみに使用される。
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: BaseModel,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, None, background)
+
+    def render(self, content: Any) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
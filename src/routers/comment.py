@@ -2,31 +2,35 @@
 掲示板コメントに関するAPIを定義するモジュール。
 """
 
-from fastapi import APIRouter, status, Path, Depends, HTTPException
+from contextlib import contextmanager
+from typing import Iterator, Literal
+from fastapi import APIRouter, status, Path, Query, Header, Body, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database import get_session
+from sqlalchemy.orm import sessionmaker
+from src import etag, pubsub
+from src.database import get_session, get_read_session, get_read_session_maker
+from src.settings import settings
 from src.schemas import common as common_schema
 from src.schemas import error as error_schema
-from src.schemas import forum as forum_schema
 from src.schemas import comment as comment_schema
-from src.cruds import forum as forum_crud
+from src.cruds import common as common_crud
 from src.cruds import comment as comment_crud
+from src.cruds import forum as forum_crud
+from src.responses import ModelResponse
 
 router = APIRouter()
 
 
-async def _return_404_if_board_not_exist(
-    database_session: AsyncSession,
-    forum_id: int,
-) -> None:
+@contextmanager
+def _return_404_if_board_not_exist() -> Iterator[None]:
     """
     掲示板が存在しない場合は404を返却する。
+    掲示板の存在確認はCRUD処理のクエリで行われ、存在しない場合はForumNotFoundErrorが送出される。
     """
-    schema: forum_schema.Forum | None = await forum_crud.get_forum(
-        session=database_session,
-        forum_id=forum_id,
-    )
-    if schema is None:
+    try:
+        yield
+    except common_crud.ForumNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="掲示板が見つかりません。",
@@ -37,26 +41,46 @@ async def _return_404_if_board_not_exist(
 @router.get(
     "/forums/{forum_id}/comments",
     summary="掲示板コメント一覧取得",
-    description="掲示板コメントの一覧を取得する。",
+    description="掲示板コメントの一覧を取得する。limitを指定した場合は、next_cursorを使用して続きを取得できる。",
     tags=["掲示板コメント"],
     status_code=status.HTTP_200_OK,
-    responses={status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage}},
+    response_model=comment_schema.Comments,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "If-None-Matchが一致した場合"},
+        status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage},
+    },
 )
 async def get_comments(
     forum_id: int = Path(..., description="掲示板ID"),
-    database_session: AsyncSession = Depends(get_session),
-) -> comment_schema.Comments:
-    # 掲示板が存在しない場合は404を返却する。
-    await _return_404_if_board_not_exist(
-        database_session=database_session,
-        forum_id=forum_id,
-    )
-    # 掲示板コメント一覧を取得して返却する。
-    schema: comment_schema.Comments = await comment_crud.get_comments(
-        session=database_session,
-        forum_id=forum_id,
-    )
-    return schema
+    limit: int | None = Query(None, ge=1, le=100, description="取得件数"),
+    after_comment_id: int | None = Query(None, description="このコメントIDより後を取得する"),
+    before_comment_id: int | None = Query(None, description="このコメントIDより前を取得する"),
+    order: Literal["asc", "desc"] = Query("asc", description="コメントIDの並び順"),
+    if_none_match: str | None = Header(None, description="前回の取得結果のETag"),
+    database_session: AsyncSession = Depends(get_read_session),
+) -> ModelResponse:
+    # 掲示板コメント一覧を取得する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        # ETagが一致する場合は、レコードを取得せずに304を返却する。
+        if if_none_match is not None:
+            current_etag: str = await comment_crud.get_comments_etag(
+                session=database_session,
+                forum_id=forum_id,
+                limit=limit,
+                after_comment_id=after_comment_id,
+                before_comment_id=before_comment_id,
+                order=order,
+            )
+            etag.return_304_if_not_modified(if_none_match, current_etag)
+        schema: comment_schema.Comments = await comment_crud.get_comments(
+            session=database_session,
+            forum_id=forum_id,
+            limit=limit,
+            after_comment_id=after_comment_id,
+            before_comment_id=before_comment_id,
+            order=order,
+        )
+    return ModelResponse(schema, headers={"ETag": comment_crud.make_comments_etag(schema)})
 
 
 @router.post(
@@ -75,18 +99,87 @@ async def create_comment(
     forum_id: int = Path(..., description="掲示板ID"),
     database_session: AsyncSession = Depends(get_session),
 ) -> comment_schema.Comment:
+    # 掲示板コメントを作成する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        schema: comment_schema.Comment = await comment_crud.create_comment(
+            session=database_session,
+            forum_id=forum_id,
+            forum_comment=body,
+        )
+    return schema
+
+
+@router.post(
+    "/forums/{forum_id}/comments/batch",
+    summary="掲示板コメントを一括作成",
+    description="掲示板に複数のコメントを1回のトランザクションで作成する。作成したコメントをリクエストの順に返却する。",
+    tags=["掲示板コメント"],
+    status_code=status.HTTP_201_CREATED,
+    response_model=comment_schema.Comments,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": error_schema.ValidationErrors},
+    },
+)
+async def create_comments(
+    body: list[comment_schema.CommentCreate] = Body(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="作成するコメントの一覧(1件以上1000件以下)",
+    ),
+    forum_id: int = Path(..., description="掲示板ID"),
+    database_session: AsyncSession = Depends(get_session),
+) -> ModelResponse:
+    # 掲示板コメントを一括作成する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        schema: comment_schema.Comments = await comment_crud.create_comments(
+            session=database_session,
+            forum_id=forum_id,
+            comment_creates=body,
+        )
+    return ModelResponse(schema, status_code=status.HTTP_201_CREATED)
+
+
+# /forums/{forum_id}/comments/{comment_id}より前に登録し、streamをcomment_idとして扱わないようにする。
+@router.get(
+    "/forums/{forum_id}/comments/stream",
+    summary="掲示板コメントの更新を購読",
+    description=(
+        "掲示板コメントの作成・更新・削除をServer-Sent Eventsで受信する。"
+        "イベントの種類はcreated・updated・deleted・forum_deletedで、dataはcreated・updatedではコメント、"
+        "deletedではforum_idとcomment_id、forum_deletedではforum_idとなる。"
+        "掲示板が削除された場合はforum_deletedイベントを送信して切断する。"
+        "受信が遅く未受信のイベントが上限に達した場合はdroppedイベントを送信して切断するため、"
+        "再接続後にコメント一覧を取得し直す。"
+    ),
+    tags=["掲示板コメント"],
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"text/event-stream": {}}},
+        status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage},
+    },
+)
+async def stream_comments(
+    forum_id: int = Path(..., description="掲示板ID"),
+    session_maker: sessionmaker = Depends(get_read_session_maker),
+) -> StreamingResponse:
+    # 接続を保持し続けないように、掲示板の存在確認のみでセッションを閉じる。
+    async with session_maker() as session:  # type: ignore
+        session: AsyncSession
+        forum = await forum_crud.get_forum(session=session, forum_id=forum_id)
     # 掲示板が存在しない場合は404を返却する。
-    await _return_404_if_board_not_exist(
-        database_session=database_session,
-        forum_id=forum_id,
-    )
-    # 掲示板コメントを作成して返却する。
-    schema: comment_schema.Comment = await comment_crud.create_comment(
-        session=database_session,
-        forum_id=forum_id,
-        forum_comment=body,
+    if forum is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="掲示板が見つかりません。",
+        )
+    return StreamingResponse(
+        pubsub.stream_events(pubsub.broker, forum_id, settings.sse_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return schema
 
 
 @router.get(
@@ -95,7 +188,9 @@ async def create_comment(
     description="掲示板コメントを取得する。",
     tags=["掲示板コメント"],
     status_code=status.HTTP_200_OK,
+    response_model=comment_schema.Comment,
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "If-None-Matchが一致した場合"},
         status.HTTP_404_NOT_FOUND: {"model": common_schema.NoData},
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": error_schema.ValidationErrors},
     },
@@ -103,27 +198,27 @@ async def create_comment(
 async def get_comment(
     forum_id: int = Path(..., description="掲示板ID"),
     comment_id: int = Path(..., description="コメントID"),
-    database_session: AsyncSession = Depends(get_session),
-) -> comment_schema.Comment:
-    # 掲示板が存在しない場合は404を返却する。
-    await _return_404_if_board_not_exist(
-        database_session=database_session,
-        forum_id=forum_id,
-    )
-    # 掲示板コメントを取得する。
-    shema: comment_schema.Comment | None = await comment_crud.get_comment(
-        session=database_session,
-        forum_id=forum_id,
-        comment_id=comment_id,
-    )
+    if_none_match: str | None = Header(None, description="前回の取得結果のETag"),
+    database_session: AsyncSession = Depends(get_read_session),
+) -> ModelResponse:
+    # 掲示板コメントを取得する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        shema: comment_schema.Comment | None = await comment_crud.get_comment(
+            session=database_session,
+            forum_id=forum_id,
+            comment_id=comment_id,
+        )
     # コメントが見つからない場合は404を返却する。
     if shema is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="掲示板コメントが見つかりません。",
         )
+    # ETagが一致する場合は304を返却する。
+    current_etag: str = comment_crud.make_comment_etag(shema)
+    etag.return_304_if_not_modified(if_none_match, current_etag)
     # 200を返却する。
-    return shema
+    return ModelResponse(shema, headers={"ETag": current_etag})
 
 
 @router.put(
@@ -143,18 +238,14 @@ async def edit_comment(
     comment_id: int = Path(..., description="コメントID"),
     database_session: AsyncSession = Depends(get_session),
 ) -> comment_schema.Comment:
-    # 掲示板が存在しない場合は404を返却する。
-    await _return_404_if_board_not_exist(
-        database_session=database_session,
-        forum_id=forum_id,
-    )
-    # データベースを更新する。
-    schema: comment_schema.Comment | None = await comment_crud.edit_comment(
-        session=database_session,
-        forum_id=forum_id,
-        comment_id=comment_id,
-        comment_create=body,
-    )
+    # データベースを更新する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        schema: comment_schema.Comment | None = await comment_crud.edit_comment(
+            session=database_session,
+            forum_id=forum_id,
+            comment_id=comment_id,
+            comment_create=body,
+        )
     # 掲示板が見つからない場合は404を返却する。
     if schema is None:
         raise HTTPException(
@@ -181,17 +272,13 @@ async def delete_comment(
     comment_id: int = Path(..., description="コメントID"),
     database_session: AsyncSession = Depends(get_session),
 ) -> common_schema.NoData:
-    # 掲示板が存在しない場合は404を返却する。
-    await _return_404_if_board_not_exist(
-        database_session=database_session,
-        forum_id=forum_id,
-    )
-    # データベースを削除する。
-    schema: common_schema.NoData | None = await comment_crud.delete_comment(
-        session=database_session,
-        forum_id=forum_id,
-        comment_id=comment_id,
-    )
+    # データベースを削除する。掲示板が存在しない場合は404を返却する。
+    with _return_404_if_board_not_exist():
+        schema: common_schema.NoData | None = await comment_crud.delete_comment(
+            session=database_session,
+            forum_id=forum_id,
+            comment_id=comment_id,
+        )
     # コメントが見つからない場合は404を返却する。
     if schema is None:
         raise HTTPException(
@@ -0,0 +1,46 @@
+"""
+エクスポートに関するAPIを定義するモジュール。
+"""
+
+import datetime
+from typing import AsyncIterator
+from fastapi import APIRouter, status, Query, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.database import get_read_session_maker
+from src.cruds import export as export_crud
+
+router = APIRouter()
+
+
+@router.get(
+    "/export.ndjson",
+    summary="エクスポート",
+    description=(
+        "掲示板と掲示板コメントを1行1件のJSON(NDJSON)で取得する。"
+        "各行のtypeはforumまたはcommentで、掲示板の行の後にその掲示板のコメントの行が続く。"
+        "updated_sinceを指定した場合は、それ以降に作成・更新された掲示板とコメントのみを取得する(差分のエクスポート)。"
+        "作成・更新されたコメントがある掲示板は、掲示板が更新されていなくても掲示板の行を含む。"
+        "削除された掲示板とコメントは含まないため、コメントの削除のみでコメント数が変わった掲示板は含まない。"
+    ),
+    tags=["データ移行"],
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_ndjson(
+    updated_since: datetime.datetime | None = Query(None, description="この日時以降に更新されたものを取得する"),
+    session_maker: sessionmaker = Depends(get_read_session_maker),
+) -> StreamingResponse:
+
+    async def stream() -> AsyncIterator[bytes]:
+        """
+        レスポンスの返却中にセッションを作成し、返却が終わるまで使用する。
+        """
+        async with session_maker() as session:  # type: ignore
+            session: AsyncSession
+            async for chunk in export_crud.export_ndjson(session, updated_since):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
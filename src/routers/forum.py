@@ -2,13 +2,17 @@
 掲示板に関するAPIを定義するモジュール。
 """
 
-from fastapi import APIRouter, status, Path, Depends, HTTPException
+from typing import Literal
+from fastapi import APIRouter, status, Path, Query, Header, Body, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database import get_session
+from src import etag
+from src.database import get_session, get_read_session
 from src.schemas import common as common_schema
 from src.schemas import error as error_schema
 from src.schemas import forum as forum_schema
+from src.cruds import common as common_crud
 from src.cruds import forum as forum_crud
+from src.responses import ModelResponse
 
 router = APIRouter()
 
@@ -16,15 +20,51 @@ router = APIRouter()
 @router.get(
     "/forums",
     summary="掲示板一覧取得",
-    description="掲示板の一覧を取得する。",
+    description=(
+        "掲示板の一覧を取得する。limitを指定した場合は、next_cursorを使用して続きを取得できる。"
+        "sortにactivityを指定した場合は、最後にコメントされた掲示板から順に取得する。"
+    ),
     tags=["掲示板"],
     status_code=status.HTTP_200_OK,
+    response_model=forum_schema.Forums,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "If-None-Matchが一致した場合"},
+        status.HTTP_400_BAD_REQUEST: {"model": error_schema.ErrorMessage},
+    },
 )
 async def get_forums(
-    database_session: AsyncSession = Depends(get_session),
-) -> forum_schema.Forums:
-    schema: forum_schema.Forums = await forum_crud.get_forums(database_session)
-    return schema
+    limit: int | None = Query(None, ge=1, le=100, description="取得件数"),
+    cursor: str | None = Query(None, description="前回の取得結果のnext_cursor"),
+    sort: Literal["id", "activity"] = Query(
+        "id",
+        description="並び順(id: 掲示板IDの降順、activity: 最終コメント日の降順)",
+    ),
+    if_none_match: str | None = Header(None, description="前回の取得結果のETag"),
+    database_session: AsyncSession = Depends(get_read_session),
+) -> ModelResponse:
+    try:
+        # ETagが一致する場合は、レコードを取得せずに304を返却する。
+        if if_none_match is not None:
+            current_etag: str = await forum_crud.get_forums_etag(
+                session=database_session,
+                limit=limit,
+                cursor=cursor,
+                sort=sort,
+            )
+            etag.return_304_if_not_modified(if_none_match, current_etag)
+        schema: forum_schema.Forums = await forum_crud.get_forums(
+            session=database_session,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+        )
+    # カーソルが不正な場合は400を返却する。
+    except common_crud.InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="カーソルが不正です。",
+        )
+    return ModelResponse(schema, headers={"ETag": forum_crud.make_forums_etag(schema)})
 
 
 @router.post(
@@ -45,18 +85,48 @@ async def create_forum(
     return schema
 
 
+@router.post(
+    "/forums/batch",
+    summary="掲示板一括作成",
+    description="複数の掲示板を1回のトランザクションで作成する。作成した掲示板をリクエストの順に返却する。",
+    tags=["掲示板"],
+    status_code=status.HTTP_201_CREATED,
+    response_model=forum_schema.Forums,
+    responses={status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": error_schema.ValidationErrors}},
+)
+async def create_forums(
+    body: list[forum_schema.ForumCreate] = Body(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="作成する掲示板の一覧(1件以上1000件以下)",
+    ),
+    database_session: AsyncSession = Depends(get_session),
+) -> ModelResponse:
+    schema: forum_schema.Forums = await forum_crud.create_forums(
+        session=database_session,
+        forum_creates=body,
+    )
+    return ModelResponse(schema, status_code=status.HTTP_201_CREATED)
+
+
 @router.get(
     "/forums/{forum_id}",
     summary="掲示板取得",
     description="掲示板を取得する。",
     tags=["掲示板"],
     status_code=status.HTTP_200_OK,
-    responses={status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage}},
+    response_model=forum_schema.Forum,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "If-None-Matchが一致した場合"},
+        status.HTTP_404_NOT_FOUND: {"model": error_schema.ErrorMessage},
+    },
 )
 async def get_forum(
     forum_id: int = Path(..., description="掲示板ID"),
-    database_session: AsyncSession = Depends(get_session),
-) -> forum_schema.Forum:
+    if_none_match: str | None = Header(None, description="前回の取得結果のETag"),
+    database_session: AsyncSession = Depends(get_read_session),
+) -> ModelResponse:
     # データベースから取得する。
     schema: forum_schema.Forum | None = await forum_crud.get_forum(
         session=database_session,
@@ -68,8 +138,11 @@ async def get_forum(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="掲示板が見つかりません。",
         )
+    # ETagが一致する場合は304を返却する。
+    current_etag: str = forum_crud.make_forum_etag(schema)
+    etag.return_304_if_not_modified(if_none_match, current_etag)
     # 取得結果を返却する。
-    return schema
+    return ModelResponse(schema, headers={"ETag": current_etag})
 
 
 @router.put(
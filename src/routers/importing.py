@@ -0,0 +1,44 @@
+"""
+インポートに関するAPIを定義するモジュール。
+"""
+
+from fastapi import APIRouter, status, Request, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import get_session
+from src.schemas import importing as importing_schema
+from src.cruds import importing as importing_crud
+from src.responses import ModelResponse
+
+router = APIRouter()
+
+
+@router.post(
+    "/import",
+    summary="インポート",
+    description=(
+        "1行1件のJSON(NDJSON)で掲示板と掲示板コメントを作成する。各行の形式は/export.ndjsonと同じ。"
+        "コメントの行のforum_idは、それより前にある掲示板の行のforum_idを参照し、作成した掲示板のIDに置き換える。"
+        "それより前に参照先の掲示板の行がない場合は、既存の掲示板のIDとして扱う。"
+        "forum_idを指定した掲示板の行が10万件を超えた場合は、以降の行をインポートしない。"
+        "リクエストボディは受信しながら一定の行数ごとに作成するため、途中で失敗した場合もそれまでの行は作成される。"
+        "検証できない行はerrorsに行番号の順に返却し、残りの行のインポートを続ける。"
+    ),
+    tags=["データ移行"],
+    status_code=status.HTTP_200_OK,
+    response_model=importing_schema.ImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        },
+    },
+)
+async def import_ndjson(
+    request: Request,
+    database_session: AsyncSession = Depends(get_session),
+) -> ModelResponse:
+    schema: importing_schema.ImportResult = await importing_crud.import_ndjson(
+        session=database_session,
+        chunks=request.stream(),
+    )
+    return ModelResponse(schema)
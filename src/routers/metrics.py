@@ -0,0 +1,24 @@
+"""
+メトリクスを公開するAPIを定義するモジュール。
+"""
+
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from src import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="メトリクス取得",
+    description="リクエスト・クエリ・コネクションプール・キャッシュのメトリクスをPrometheusのテキスト形式で取得する。",
+    tags=["運用"],
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,39 @@
+"""
+検索に関するAPIを定義するモジュール。
+"""
+
+from fastapi import APIRouter, status, Query, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import get_read_session
+from src.schemas import search as search_schema
+from src.cruds import search as search_crud
+from src.responses import ModelResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/search",
+    summary="検索",
+    description=(
+        "掲示板(タイトル・内容)と掲示板コメントを検索し、一致度の降順で取得する。"
+        "qは空白や記号で区切られた語として扱い、すべての語を含むものを返却する。2文字未満の語は無視する。"
+        "next_offsetをoffsetに指定して続きを取得できる。"
+    ),
+    tags=["検索"],
+    status_code=status.HTTP_200_OK,
+    response_model=search_schema.SearchResults,
+)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="検索語"),
+    limit: int = Query(20, ge=1, le=100, description="取得件数"),
+    offset: int = Query(0, ge=0, le=1000, description="読み飛ばす件数"),
+    database_session: AsyncSession = Depends(get_read_session),
+) -> ModelResponse:
+    schema: search_schema.SearchResults = await search_crud.search(
+        session=database_session,
+        q=q,
+        limit=limit,
+        offset=offset,
+    )
+    return ModelResponse(schema)
@@ -55,3 +55,12 @@ class Comments(BaseModel):
         description="コメントの一覧",
         default=Comment,
     )
+    next_cursor: int | None = Field(
+        description=(
+            "次ページを取得するためのカーソル。"
+            "昇順の場合はafter_comment_id、降順の場合はbefore_comment_idに指定する。"
+            "次ページが存在しない場合はnull。"
+        ),
+        examples=[20],
+        default=None,
+    )
@@ -0,0 +1,30 @@
+"""
+エクスポートに関するスキーマを定義するモジュール。
+"""
+
+from typing import Literal
+from pydantic import Field
+from src.schemas import forum as forum_schema
+from src.schemas import comment as comment_schema
+
+
+class ExportedForum(forum_schema.Forum):
+    """
+    エクスポートする掲示板(NDJSONの1行)
+    """
+
+    type: Literal["forum"] = Field(
+        description="レコードの種類",
+        default="forum",
+    )
+
+
+class ExportedComment(comment_schema.Comment):
+    """
+    エクスポートする掲示板コメント(NDJSONの1行)
+    """
+
+    type: Literal["comment"] = Field(
+        description="レコードの種類",
+        default="comment",
+    )
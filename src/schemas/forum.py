@@ -3,7 +3,7 @@
 """
 
 import datetime
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr
 
 
 class ForumCreate(BaseModel):
@@ -32,6 +32,10 @@ class Forum(ForumCreate):
         description="掲示板ID",
         examples=[1],
     )
+    comment_count: int = Field(
+        description="コメント数",
+        examples=[0],
+    )
     created_at: datetime.datetime = Field(
         description="作成日",
         examples=["2024-01-01T12:34:56"],
@@ -40,6 +44,10 @@ class Forum(ForumCreate):
         description="更新日",
         examples=["2024-01-01T12:34:56"],
     )
+    last_commented_at: datetime.datetime = Field(
+        description="最終コメント日。コメントがない場合は作成日。",
+        examples=["2024-01-01T12:34:56"],
+    )
 
     # class Config:
     #     from_attributes = True
@@ -55,3 +63,10 @@ class Forums(BaseModel):
         description="掲示板の一覧",
         default=Forum,
     )
+    next_cursor: str | None = Field(
+        description="次ページを取得するためのカーソル。次ページが存在しない場合はnull。",
+        examples=["eyJmb3J1bV9pZCI6MX0"],
+        default=None,
+    )
+    # 掲示板のコメントIDの採番値の合計。ETagの作成に使用し、レスポンスには含めない。
+    _last_comment_id_sum: int = PrivateAttr(default=0)
@@ -0,0 +1,43 @@
+"""
+インポートに関するスキーマを定義するモジュール。
+"""
+
+from pydantic import BaseModel, Field
+
+
+class ImportLineError(BaseModel):
+    """
+    インポートできなかった行
+    """
+
+    line: int = Field(
+        description="行番号(1から始まる)",
+        examples=[3],
+    )
+    detail: str = Field(
+        description="エラーメッセージ",
+        examples=["title: String should have at most 20 characters"],
+    )
+
+
+class ImportResult(BaseModel):
+    """
+    インポート結果
+    """
+
+    forums: int = Field(
+        description="作成した掲示板の件数",
+        examples=[10],
+    )
+    comments: int = Field(
+        description="作成したコメントの件数",
+        examples=[100],
+    )
+    error_count: int = Field(
+        description="インポートできなかった行の件数",
+        examples=[1],
+    )
+    errors: list[ImportLineError] = Field(
+        description="インポートできなかった行の一覧。件数が多い場合は先頭から一定件数のみ返却する。",
+        default=ImportLineError,
+    )
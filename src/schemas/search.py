@@ -0,0 +1,45 @@
+"""
+検索に関するスキーマを定義するモジュール。
+"""
+
+from pydantic import BaseModel, Field
+
+
+class SearchHit(BaseModel):
+    """
+    検索結果の1件
+    """
+
+    forum_id: int = Field(
+        description="掲示板ID",
+        examples=[1],
+    )
+    comment_id: int | None = Field(
+        description="コメントID。掲示板に一致した場合はnull。",
+        examples=[None],
+        default=None,
+    )
+    text: str = Field(
+        description="掲示板に一致した場合は掲示板のタイトル、コメントに一致した場合はコメント",
+        examples=["掲示板タイトル"],
+    )
+    score: float = Field(
+        description="一致度。大きいほど検索語に一致する。",
+        examples=[3.0],
+    )
+
+
+class SearchResults(BaseModel):
+    """
+    検索結果一覧取得用
+    """
+
+    hits: list[SearchHit] = Field(
+        description="一致度の降順の検索結果",
+        default=SearchHit,
+    )
+    next_offset: int | None = Field(
+        description="次ページを取得するためのoffset。次ページが存在しない場合はnull。",
+        examples=[20],
+        default=None,
+    )
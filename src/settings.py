@@ -0,0 +1,153 @@
+"""
+環境変数から読み込む設定を定義するモジュール。
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Mapping
+
+
+def _get_str(environ: Mapping[str, str], name: str, default: str) -> str:
+    """
+    文字列の環境変数を取得する。
+    """
+    return environ.get(name, default)
+
+
+def _get_int(environ: Mapping[str, str], name: str, default: int) -> int:
+    """
+    整数の環境変数を取得する。
+    整数に変換できない場合はValueErrorを送出する。
+    """
+    value: str | None = environ.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"環境変数{name}は整数で指定してください。: {value}")
+
+
+def _get_float(environ: Mapping[str, str], name: str, default: float) -> float:
+    """
+    数値の環境変数を取得する。
+    数値に変換できない場合はValueErrorを送出する。
+    """
+    value: str | None = environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"環境変数{name}は数値で指定してください。: {value}")
+
+
+def _get_bool(environ: Mapping[str, str], name: str, default: bool) -> bool:
+    """
+    真偽値の環境変数を取得する。
+    真偽値に変換できない場合はValueErrorを送出する。
+    """
+    value: str | None = environ.get(name)
+    if value is None:
+        return default
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"環境変数{name}は真偽値で指定してください。: {value}")
+
+
+def _get_choice(environ: Mapping[str, str], name: str, default: str, choices: tuple[str, ...]) -> str:
+    """
+    選択肢のいずれかの環境変数を取得する。
+    選択肢に含まれない場合はValueErrorを送出する。
+    """
+    value: str = environ.get(name, default)
+    if value not in choices:
+        raise ValueError(f"環境変数{name}は{'・'.join(choices)}のいずれかで指定してください。: {value}")
+    return value
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    アプリケーションの設定
+
+    コネクションプールはuvicornのワーカーごとに作成されるため、
+    データベースの最大接続数は ワーカー数 x (database_pool_size + database_max_overflow) となる。
+    """
+
+    # データベースの接続先
+    database_url: str = "mysql+aiomysql://root@database:3306/forum?charset=utf8"
+    # 読み取り専用レプリカの接続先。Noneの場合はすべてdatabase_urlに接続する。
+    database_replica_url: str | None = None
+    # 書き込み後にレプリカではなくdatabase_urlから読み込む時間(秒)
+    read_your_writes_seconds: float = 5.0
+    # 実行したSQLをログに出力するか
+    database_echo: bool = False
+    # コネクションプールで保持する接続数
+    database_pool_size: int = 5
+    # database_pool_sizeを超えて一時的に作成できる接続数
+    database_max_overflow: int = 10
+    # コネクションプールから接続を取得する際の待機時間の上限(秒)
+    database_pool_timeout: float = 30.0
+    # 接続を取得する際に接続が有効か確認するか
+    database_pool_pre_ping: bool = True
+    # 接続を再作成するまでの時間(秒)。-1の場合は再作成しない。
+    database_pool_recycle: int = 3600
+    # 掲示板取得のキャッシュの件数の上限
+    forum_cache_maxsize: int = 1024
+    # 掲示板コメント取得のキャッシュの件数の上限
+    comment_cache_maxsize: int = 4096
+    # キャッシュの有効期限(秒)
+    cache_ttl: float = 60.0
+    # /metricsでメトリクスを公開するか
+    metrics_enabled: bool = True
+    # 実行したクエリ数をレスポンスヘッダー(X-Query-Count)に設定するか。デバッグ用。
+    expose_query_count: bool = False
+    # 1リクエストで同じSQLをこの回数以上実行した場合に警告を出力する。0の場合は検出しない。
+    query_repeat_warning_threshold: int = 5
+    # コメントの更新を配信するブローカー(local: プロセス内、unix: 同じホストのワーカー間でUnixドメインソケットで共有)
+    pubsub_broker: str = "local"
+    # pubsub_brokerがunixの場合に、ワーカーごとのソケットを作成するディレクトリ
+    pubsub_socket_dir: str = "/tmp/forum-pubsub"
+    # SSEの購読者ごとに保持するイベントの件数の上限。上限に達した購読者は切断する。
+    sse_queue_size: int = 100
+    # SSEで接続を維持するためのコメント行を送信する間隔(秒)
+    sse_heartbeat_seconds: float = 15.0
+
+    @classmethod
+    def from_environ(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        """
+        環境変数から設定を作成する。
+        環境変数が存在しない項目は既定値を使用する。
+        """
+        default = cls()
+        return cls(
+            database_url=_get_str(environ, "DATABASE_URL", default.database_url),
+            database_replica_url=environ.get("DATABASE_REPLICA_URL") or None,
+            read_your_writes_seconds=_get_float(environ, "READ_YOUR_WRITES_SECONDS", default.read_your_writes_seconds),
+            database_echo=_get_bool(environ, "DATABASE_ECHO", default.database_echo),
+            database_pool_size=_get_int(environ, "DATABASE_POOL_SIZE", default.database_pool_size),
+            database_max_overflow=_get_int(environ, "DATABASE_MAX_OVERFLOW", default.database_max_overflow),
+            database_pool_timeout=_get_float(environ, "DATABASE_POOL_TIMEOUT", default.database_pool_timeout),
+            database_pool_pre_ping=_get_bool(environ, "DATABASE_POOL_PRE_PING", default.database_pool_pre_ping),
+            database_pool_recycle=_get_int(environ, "DATABASE_POOL_RECYCLE", default.database_pool_recycle),
+            forum_cache_maxsize=_get_int(environ, "FORUM_CACHE_MAXSIZE", default.forum_cache_maxsize),
+            comment_cache_maxsize=_get_int(environ, "COMMENT_CACHE_MAXSIZE", default.comment_cache_maxsize),
+            cache_ttl=_get_float(environ, "CACHE_TTL", default.cache_ttl),
+            metrics_enabled=_get_bool(environ, "METRICS_ENABLED", default.metrics_enabled),
+            expose_query_count=_get_bool(environ, "EXPOSE_QUERY_COUNT", default.expose_query_count),
+            query_repeat_warning_threshold=_get_int(
+                environ,
+                "QUERY_REPEAT_WARNING_THRESHOLD",
+                default.query_repeat_warning_threshold,
+            ),
+            pubsub_broker=_get_choice(environ, "PUBSUB_BROKER", default.pubsub_broker, ("local", "unix")),
+            pubsub_socket_dir=_get_str(environ, "PUBSUB_SOCKET_DIR", default.pubsub_socket_dir),
+            sse_queue_size=_get_int(environ, "SSE_QUEUE_SIZE", default.sse_queue_size),
+            sse_heartbeat_seconds=_get_float(environ, "SSE_HEARTBEAT_SECONDS", default.sse_heartbeat_seconds),
+        )
+
+
+settings: Settings = Settings.from_environ()
@@ -1,11 +1,19 @@
+import os
+
+# テストでクエリ数の上限を確認するため、クエリ数をレスポンスヘッダーに設定する。
+# 設定はsrcのインポート時に読み込まれるため、インポートより前に設定する。
+os.environ.setdefault("EXPOSE_QUERY_COUNT", "true")
+
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from typing import AsyncGenerator
 
-from src.database import get_session, Base
+from src.database import get_session, get_read_session, get_read_session_maker, Base
 from src.main import app
+from src.cruds import forum as forum_crud
+from src.cruds import comment as comment_crud
 
 ASYNC_DB_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -27,6 +35,12 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
             yield session
 
     app.dependency_overrides[get_session] = get_test_db
+    app.dependency_overrides[get_read_session] = get_test_db
+    app.dependency_overrides[get_read_session_maker] = lambda: async_session
+
+    # テストごとにデータベースを初期化するため、プロセス内のキャッシュも破棄する
+    forum_crud.forum_cache.clear()
+    comment_crud.comment_cache.clear()
 
     # テスト用に非同期HTTPクライアントを返却
     transport = ASGITransport(app=app)  # type: ignore
@@ -0,0 +1,136 @@
+"""
+プロセス内キャッシュ
+src/cache.py
+"""
+
+from src.cache import LRUCache
+
+
+class FakeTimer:
+    """
+    テスト用に時刻を進められるタイマー
+    """
+
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction() -> None:
+    """
+    上限を超えた場合に最も長く参照されていないエントリが破棄されることを確認するテスト
+    """
+    cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=60.0)
+    cache.set(1, "first")
+    cache.set(2, "second")
+    # 1を参照して、2を最も古いエントリにする。
+    assert cache.get(1) == "first"
+    cache.set(3, "third")
+    assert cache.get(2) is None
+    assert cache.get(1) == "first"
+    assert cache.get(3) == "third"
+    stats = cache.stats()
+    assert stats.hits == 3
+    assert stats.misses == 1
+    assert stats.evictions == 1
+    return None
+
+
+def test_ttl_expiration() -> None:
+    """
+    有効期限を過ぎたエントリが破棄されることを確認するテスト
+    """
+    timer = FakeTimer()
+    cache: LRUCache[int, str] = LRUCache(maxsize=10, ttl=5.0, timer=timer)
+    cache.set(1, "first")
+    timer.now = 4.9
+    assert cache.get(1) == "first"
+    timer.now = 5.0
+    assert cache.get(1) is None
+    assert cache.stats().expirations == 1
+    assert len(cache) == 0
+    return None
+
+
+def test_invalidation() -> None:
+    """
+    無効化したエントリが破棄され、無効化前に読み込んだ値が登録されないことを確認するテスト
+    """
+    cache: LRUCache[tuple[int, int], str] = LRUCache(maxsize=10, ttl=60.0)
+    cache.set((1, 1), "comment_1_1")
+    cache.set((1, 2), "comment_1_2")
+    cache.set((2, 1), "comment_2_1")
+    cache.invalidate_if(lambda key: key[0] == 1)
+    assert cache.get((1, 1)) is None
+    assert cache.get((1, 2)) is None
+    assert cache.get((2, 1)) == "comment_2_1"
+    # 読み込み中に無効化された場合は、古い値を登録しない。
+    generation: int = cache.generation
+    cache.invalidate((2, 1))
+    cache.set((2, 1), "stale_comment_2_1", generation)
+    assert cache.get((2, 1)) is None
+    assert cache.stats().invalidations == 3
+    return None
+
+
+def test_hold_after_invalidation() -> None:
+    """
+    無効化してからhold秒間はエントリが登録されないことを確認するテスト
+    """
+    timer = FakeTimer()
+    cache: LRUCache[int, str] = LRUCache(maxsize=10, ttl=60.0, timer=timer, hold=5.0)
+    cache.set(1, "first")
+    assert cache.get(1) == "first"
+    cache.invalidate(1)
+    timer.now = 4.9
+    cache.set(1, "stale_first")
+    assert cache.get(1) is None
+    timer.now = 5.0
+    cache.set(1, "first_edit")
+    assert cache.get(1) == "first_edit"
+    return None
+
+
+def test_hold_only_invalidated_keys() -> None:
+    """
+    無効化したキーのみhold秒間登録されず、ほかのキーは登録されることを確認するテスト
+    """
+    timer = FakeTimer()
+    cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=60.0, timer=timer, hold=5.0)
+    cache.invalidate(1)
+    cache.set(1, "stale_first")
+    cache.set(2, "second")
+    assert cache.get(1) is None
+    assert cache.get(2) == "second"
+    # invalidate_ifの場合は条件に一致するキーのみ登録しない。
+    cache.invalidate_if(lambda key: key >= 10)
+    cache.set(10, "stale_tenth")
+    cache.set(3, "third")
+    assert cache.get(10) is None
+    assert cache.get(3) == "third"
+    # hold秒を過ぎた無効化は破棄する。
+    timer.now = 5.0
+    cache.set(1, "first")
+    assert cache.get(1) == "first"
+    assert len(cache._held_keys) == 0
+    assert len(cache._held_predicates) == 0
+    return None
+
+
+def test_hold_overflow() -> None:
+    """
+    保持する無効化がmaxsizeを超えた場合、溢れた無効化からhold秒間はすべてのキーが登録されないことを確認するテスト
+    """
+    timer = FakeTimer()
+    cache: LRUCache[int, str] = LRUCache(maxsize=2, ttl=60.0, timer=timer, hold=5.0)
+    for key in (1, 2, 3):
+        cache.invalidate(key)
+    assert len(cache._held_keys) == 2
+    cache.set(4, "fourth")
+    assert cache.get(4) is None
+    timer.now = 5.0
+    cache.set(4, "fourth")
+    assert cache.get(4) == "fourth"
+    return None
@@ -58,6 +58,27 @@ async def test_delete_comment(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_comment_count(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントを削除すると、掲示板のコメント数が減ることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    for _ in range(2):
+        await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    response: Response = await async_client.get("/forums/1")
+    assert response.json()["comment_count"] == 2
+    updated_at: str = response.json()["updated_at"]
+    await async_client.delete("/forums/1/comments/1")
+    # 存在しないコメントの削除ではコメント数は変わらない。
+    await async_client.delete("/forums/1/comments/1")
+    response = await async_client.get("/forums/1")
+    assert response.json()["comment_count"] == 1
+    # コメント数の更新では掲示板の更新日時は変わらない。
+    assert response.json()["updated_at"] == updated_at
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_404(async_client: AsyncClient) -> None:
     """
@@ -65,6 +65,66 @@ async def test_get_comment(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_response_code_304(async_client: AsyncClient) -> None:
+    """
+    ResponseCode304を確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def create_comment() -> None:
+        """
+        掲示板コメントを作成する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}/comments"
+        request_body: dict = {
+            "comment": "comment_value",
+        }
+        await async_client.post(endpoint, json=request_body)
+        return None
+
+    async def get_comment_and_check_etag() -> None:
+        """
+        掲示板コメントを取得し、同じETagで再取得すると304になり、変更後は200になることを確認する。
+        """
+        endpoint: str = "/forums/1/comments/1"
+        response: Response = await async_client.get(endpoint)
+        assert response.status_code == status.HTTP_200_OK
+        etag: str = response.headers["ETag"]
+        headers: dict = {"If-None-Match": etag}
+        response = await async_client.get(endpoint, headers=headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        # 掲示板コメントを編集すると304にならない。
+        request_body: dict = {
+            "comment": "comment_value_edit",
+        }
+        await async_client.put(endpoint, json=request_body)
+        response = await async_client.get(endpoint, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        return None
+
+    await create_forum()
+    await create_comment()
+    await get_comment_and_check_etag()
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_404(async_client: AsyncClient) -> None:
     """
@@ -80,6 +140,27 @@ async def test_response_code_404(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_response_code_404_detail(async_client: AsyncClient) -> None:
+    """
+    掲示板が存在しない場合と掲示板コメントが存在しない場合の404を確認するテスト
+    """
+    # 掲示板が存在しない場合
+    response: Response = await async_client.get("/forums/1/comments/1")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "掲示板が見つかりません。"
+    # 掲示板は存在するが、掲示板コメントが存在しない場合
+    request_body: dict = {
+        "title": "title_value",
+        "content": "content_value",
+    }
+    await async_client.post("/forums", json=request_body)
+    response = await async_client.get("/forums/1/comments/1")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "掲示板コメントが見つかりません。"
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_422(async_client: AsyncClient) -> None:
     """
@@ -61,6 +61,82 @@ async def test_create_three_comments(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_comment_id_not_reused(async_client: AsyncClient) -> None:
+    """
+    削除されたコメントIDが再利用されないことを確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def create_comment() -> int:
+        """
+        掲示板コメントを作成して、コメントIDを返却する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}/comments"
+        request_body: dict = {
+            "comment": "comment_value",
+        }
+        response: Response = await async_client.post(endpoint, json=request_body)
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()["comment_id"]
+
+    await create_forum()
+    assert await create_comment() == 1
+    assert await create_comment() == 2
+    await async_client.delete("/forums/1/comments/2")
+    assert await create_comment() == 3
+    return None
+
+
+@pytest.mark.asyncio
+async def test_comment_count(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントを作成すると、掲示板のコメント数が増えることを確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post("/forums", json=request_body)
+        return None
+
+    async def get_comment_counts() -> tuple[int, int]:
+        """
+        掲示板取得と掲示板一覧取得のコメント数を取得する。
+        """
+        forum_response: Response = await async_client.get("/forums/1")
+        forums_response: Response = await async_client.get("/forums")
+        return forum_response.json()["comment_count"], forums_response.json()["forums"][0]["comment_count"]
+
+    await create_forum()
+    # キャッシュに登録された状態でコメントを作成する。
+    assert await get_comment_counts() == (0, 0)
+    await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    assert await get_comment_counts() == (1, 1)
+    await async_client.post("/forums/1/comments/batch", json=[{"comment": "comment_value"}] * 2)
+    assert await get_comment_counts() == (3, 3)
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_404(async_client: AsyncClient) -> None:
     """
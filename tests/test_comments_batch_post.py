@@ -0,0 +1,107 @@
+"""
+掲示板コメント一括作成
+POST:/forums/{forum_id}/comments/batch
+"""
+
+from datetime import datetime
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+
+@pytest.mark.asyncio
+async def test_create_three_comments(async_client: AsyncClient) -> None:
+    """
+    3件の掲示板コメントを一括作成するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post("/forums", json=request_body)
+        return None
+
+    async def create_comment() -> None:
+        """
+        一括作成の前に1件の掲示板コメントを作成する。
+        """
+        await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+        return None
+
+    async def create_comments_and_check() -> None:
+        """
+        掲示板コメントを一括作成して確認する。
+        """
+        request_body: list[dict] = [
+            {"comment": f"comment_value_{end_string}"} for end_string in ["first", "second", "third"]
+        ]
+        response: Response = await async_client.post("/forums/1/comments/batch", json=request_body)
+        assert response.status_code == status.HTTP_201_CREATED
+        response_body: dict = response.json()
+        assert response_body["next_cursor"] is None
+        # 作成済みのコメントの続きから、連続したcomment_idが採番される。
+        comments: list[dict] = response_body["comments"]
+        assert [comment["comment_id"] for comment in comments] == [2, 3, 4]
+        assert [comment["comment"] for comment in comments] == [
+            "comment_value_first",
+            "comment_value_second",
+            "comment_value_third",
+        ]
+        assert all(comment["forum_id"] == 1 for comment in comments)
+        # 日付変換はassert未使用だが失敗したら例外が発生する。
+        datetime.strptime(comments[0]["created_at"], "%Y-%m-%dT%H:%M:%S.%f")
+        datetime.strptime(comments[0]["updated_at"], "%Y-%m-%dT%H:%M:%S.%f")
+        return None
+
+    async def create_comment_and_check() -> None:
+        """
+        一括作成の後に作成した掲示板コメントが、採番した範囲の続きになることを確認する。
+        """
+        response: Response = await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+        assert response.json()["comment_id"] == 5
+        response = await async_client.get("/forums/1/comments")
+        assert len(response.json()["comments"]) == 5
+        return None
+
+    await create_forum()
+    await create_comment()
+    await create_comments_and_check()
+    await create_comment_and_check()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_404(async_client: AsyncClient) -> None:
+    """
+    掲示板が存在しない場合は404を返却するテスト
+    """
+    response: Response = await async_client.post("/forums/1/comments/batch", json=[{"comment": "comment_value"}])
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "掲示板が見つかりません。"
+    return None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        [],
+        [{"comment": "comment_value"}] * 1001,
+        [{"comment": "comment_value"}, {"comment": "a" * 101}],
+    ],
+)
+async def test_response_code_422(async_client: AsyncClient, request_body: list) -> None:
+    """
+    件数や内容が不正な場合は422を返却し、1件も作成しないことを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    response: Response = await async_client.post("/forums/1/comments/batch", json=request_body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.get("/forums/1/comments")
+    assert len(response.json()["comments"]) == 0
+    return None
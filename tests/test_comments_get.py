@@ -108,6 +108,128 @@ async def test_get_three_comments(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_get_comments_with_cursor(async_client: AsyncClient) -> None:
+    """
+    カーソルを使用して掲示板コメントをページごとに取得するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def create_five_comments() -> None:
+        """
+        5件の掲示板コメントを作成する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}/comments"
+        request_body: dict = {
+            "comment": "comment_value",
+        }
+        for _ in range(5):
+            await async_client.post(endpoint, json=request_body)
+        return None
+
+    async def get_comments_by_page_and_check(order: str, cursor_name: str) -> list[int]:
+        """
+        2件ずつ掲示板コメントを取得して、取得したコメントIDを返却する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}/comments"
+        comment_ids: list[int] = list()
+        params: dict = {"limit": 2, "order": order}
+        for expected_count in [2, 2, 1]:
+            response: Response = await async_client.get(endpoint, params=params)
+            assert response.status_code == status.HTTP_200_OK
+            response_body: dict = response.json()
+            assert len(response_body["comments"]) == expected_count
+            comment_ids += [comment["comment_id"] for comment in response_body["comments"]]
+            params[cursor_name] = response_body["next_cursor"]
+        # 最終ページには次ページのカーソルが存在しない。
+        assert params[cursor_name] is None
+        return comment_ids
+
+    await create_forum()
+    await create_five_comments()
+    assert await get_comments_by_page_and_check("asc", "after_comment_id") == [1, 2, 3, 4, 5]
+    assert await get_comments_by_page_and_check("desc", "before_comment_id") == [5, 4, 3, 2, 1]
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_304(async_client: AsyncClient) -> None:
+    """
+    ResponseCode304を確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def create_comment() -> None:
+        """
+        掲示板コメントを作成する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}/comments"
+        request_body: dict = {
+            "comment": "comment_value",
+        }
+        await async_client.post(endpoint, json=request_body)
+        return None
+
+    async def get_comments_and_check_etag(params: dict, delete_comment_id: int) -> None:
+        """
+        掲示板コメント一覧を取得し、同じETagで再取得すると304になり、変更後は200になることを確認する。
+        """
+        endpoint: str = "/forums/1/comments"
+        response: Response = await async_client.get(endpoint, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        etag: str = response.headers["ETag"]
+        headers: dict = {"If-None-Match": etag}
+        response = await async_client.get(endpoint, params=params, headers=headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        # 掲示板コメントを削除すると304にならない。
+        await async_client.delete(f"/forums/1/comments/{str(delete_comment_id)}")
+        response = await async_client.get(endpoint, params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        return None
+
+    await create_forum()
+    for _ in range(3):
+        await create_comment()
+    await get_comments_and_check_etag({"limit": 2, "order": "asc"}, 1)
+    await get_comments_and_check_etag({}, 3)
+    # 掲示板が存在しない場合は304ではなく404を返却する。
+    headers: dict = {"If-None-Match": "*"}
+    response: Response = await async_client.get("/forums/100/comments", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_404(async_client: AsyncClient) -> None:
     """
@@ -0,0 +1,234 @@
+"""
+掲示板コメントの更新の配信
+GET:/forums/{forum_id}/comments/stream
+"""
+
+import asyncio
+import json
+import os
+import signal
+from pathlib import Path
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+from src import pubsub
+
+
+@pytest.mark.asyncio
+async def test_local_broker_fan_out() -> None:
+    """
+    発行したイベントが同じチャンネルの購読者全員に配信されることを確認するテスト
+    """
+    broker = pubsub.LocalBroker(queue_size=10)
+    first: pubsub.Subscription = broker.subscribe(1)
+    second: pubsub.Subscription = broker.subscribe(1)
+    other: pubsub.Subscription = broker.subscribe(2)
+    assert broker.subscriber_count() == 3
+    broker.publish(pubsub.Event(channel=1, type="created", data="{}"))
+    for subscription in (first, second):
+        event: pubsub.Event | None = await subscription.get(timeout=1)
+        assert event == pubsub.Event(channel=1, type="created", data="{}")
+    # ほかのチャンネルの購読者には配信しない。
+    with pytest.raises(TimeoutError):
+        await other.get(timeout=0.01)
+    for subscription in (first, second, other):
+        subscription.close()
+    assert broker.subscriber_count() == 0
+    assert broker.stats() == pubsub.PubSubStats(published=1, delivered=2, dropped_subscribers=0)
+    return None
+
+
+@pytest.mark.asyncio
+async def test_local_broker_drop_slow_subscriber() -> None:
+    """
+    キューが上限に達した購読者だけが切断されることを確認するテスト
+    """
+    broker = pubsub.LocalBroker(queue_size=1)
+    slow: pubsub.Subscription = broker.subscribe(1)
+    fast: pubsub.Subscription = broker.subscribe(1)
+    broker.publish(pubsub.Event(channel=1, type="created", data="1"))
+    assert (await fast.get(timeout=1)) is not None
+    broker.publish(pubsub.Event(channel=1, type="created", data="2"))
+    # 未受信のイベントは破棄され、切断を表すNoneを受信する。
+    assert slow.dropped
+    assert (await slow.get(timeout=1)) is None
+    assert not fast.dropped
+    assert (await fast.get(timeout=1)) == pubsub.Event(channel=1, type="created", data="2")
+    assert broker.subscriber_count() == 1
+    assert broker.stats().dropped_subscribers == 1
+    return None
+
+
+@pytest.mark.asyncio
+async def test_stream_events() -> None:
+    """
+    イベントとハートビートがServer-Sent Eventsの形式で返却され、終了時に購読が終了することを確認するテスト
+    """
+    broker = pubsub.LocalBroker(queue_size=1)
+    stream = pubsub.stream_events(broker, 1, heartbeat_seconds=0.01)
+    assert (await anext(stream)) == b"retry: 3000\n\n"
+    assert broker.subscriber_count() == 1
+    assert (await anext(stream)) == b": keepalive\n\n"
+    broker.publish(pubsub.Event(channel=1, type="created", data='{"comment_id":1}'))
+    assert (await anext(stream)) == b'event: created\ndata: {"comment_id":1}\n\n'
+    # 受信が遅く切断された場合は、droppedイベントを返却して終了する。
+    for data in ("1", "2"):
+        broker.publish(pubsub.Event(channel=1, type="created", data=data))
+    assert (await anext(stream)) == b"event: dropped\ndata: {}\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert broker.subscriber_count() == 0
+
+    # 掲示板の削除を返却した場合は終了する。
+    stream = pubsub.stream_events(broker, 1, heartbeat_seconds=1)
+    await anext(stream)
+    broker.publish(pubsub.Event(channel=1, type="forum_deleted", data='{"forum_id":1}'))
+    assert (await anext(stream)) == b'event: forum_deleted\ndata: {"forum_id":1}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert broker.subscriber_count() == 0
+
+    # 途中で返却を終了した場合も購読を終了する。
+    stream = pubsub.stream_events(broker, 1, heartbeat_seconds=1)
+    await anext(stream)
+    await stream.aclose()
+    assert broker.subscriber_count() == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_close_broker() -> None:
+    """
+    ブローカーの終了ですべての購読が切断され、droppedイベントを送信せずに返却を終了することを確認するテスト
+    """
+    broker = pubsub.LocalBroker(queue_size=10)
+    await broker.start()
+    stream = pubsub.stream_events(broker, 1, heartbeat_seconds=1)
+    await anext(stream)
+    subscription: pubsub.Subscription = broker.subscribe(2)
+    await broker.close()
+    assert broker.subscriber_count() == 0
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert (await subscription.get(timeout=1)) is None
+    assert not subscription.dropped
+    # 終了後の購読は切断済みとなる。
+    assert (await broker.subscribe(1).get(timeout=1)) is None
+    assert broker.subscriber_count() == 0
+    # 再度開始した場合は購読できる。
+    await broker.start()
+    broker.subscribe(1)
+    assert broker.subscriber_count() == 1
+    return None
+
+
+@pytest.mark.asyncio
+async def test_close_subscriptions_on_exit() -> None:
+    """
+    終了のシグナルを受信した時点で購読が切断され、既存のシグナルハンドラーも呼び出されることを確認するテスト
+    """
+    received: list[int] = list()
+    previous = signal.signal(signal.SIGTERM, lambda signal_number, frame: received.append(signal_number))
+    try:
+        broker = pubsub.LocalBroker(queue_size=10)
+        subscription: pubsub.Subscription = broker.subscribe(1)
+        pubsub.close_subscriptions_on_exit(broker)
+        signal.raise_signal(signal.SIGTERM)
+        assert (await subscription.get(timeout=1)) is None
+        assert received == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    return None
+
+
+@pytest.mark.asyncio
+async def test_unix_datagram_broker(tmp_path: Path) -> None:
+    """
+    ほかのワーカーで発行したイベントが配信され、終了したワーカーのソケットが削除されることを確認するテスト
+    """
+    first = pubsub.UnixDatagramBroker(queue_size=10, socket_dir=str(tmp_path))
+    second = pubsub.UnixDatagramBroker(queue_size=10, socket_dir=str(tmp_path))
+    await first.start()
+    await second.start()
+    # 終了したワーカーのソケットを作成する。
+    stale = pubsub.UnixDatagramBroker(queue_size=10, socket_dir=str(tmp_path))
+    await stale.start()
+    stale._socket.close()  # type: ignore
+    stale._socket = None
+    try:
+        first_subscription: pubsub.Subscription = first.subscribe(1)
+        second_subscription: pubsub.Subscription = second.subscribe(1)
+        first.publish(pubsub.Event(channel=1, type="created", data="{}"))
+        for subscription in (first_subscription, second_subscription):
+            assert (await subscription.get(timeout=1)) == pubsub.Event(channel=1, type="created", data="{}")
+        assert not os.path.exists(stale.path)
+    finally:
+        await first.close()
+        await second.close()
+    assert list(tmp_path.iterdir()) == []
+    return None
+
+
+@pytest.mark.asyncio
+async def test_publish_comment_changes(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントの作成・更新・削除でイベントが発行されることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    subscription: pubsub.Subscription = pubsub.broker.subscribe(1)
+    try:
+        await async_client.post("/forums/1/comments", json={"comment": "comment_1"})
+        await async_client.post("/forums/1/comments/batch", json=[{"comment": "comment_2"}])
+        await async_client.put("/forums/1/comments/1", json={"comment": "comment_3"})
+        await async_client.delete("/forums/1/comments/2")
+        events: list[pubsub.Event] = list()
+        for _ in range(4):
+            event: pubsub.Event | None = await subscription.get(timeout=1)
+            assert event is not None
+            events.append(event)
+    finally:
+        subscription.close()
+    assert [event.type for event in events] == ["created", "created", "updated", "deleted"]
+    assert json.loads(events[0].data)["comment"] == "comment_1"
+    assert json.loads(events[1].data)["comment_id"] == 2
+    assert json.loads(events[2].data)["comment"] == "comment_3"
+    assert json.loads(events[3].data) == {"forum_id": 1, "comment_id": 2}
+    return None
+
+
+@pytest.mark.asyncio
+async def test_stream_comments(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントの更新をServer-Sent Eventsで返却し、掲示板の削除で返却を終了することを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    # テストのクライアントはレスポンスをすべて受信してから返却するため、別のタスクで受信する。
+    task = asyncio.create_task(async_client.get("/forums/1/comments/stream"))
+    while pubsub.broker.subscriber_count() == 0:
+        assert not task.done()
+        await asyncio.sleep(0.01)
+    await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    await async_client.delete("/forums/1")
+    response: Response = await asyncio.wait_for(task, timeout=5)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    blocks: list[str] = response.text.strip().split("\n\n")
+    assert blocks[0] == "retry: 3000"
+    assert blocks[1].startswith("event: created\ndata: ")
+    assert json.loads(blocks[1].split("data: ", 1)[1])["comment"] == "comment_value"
+    assert blocks[2] == 'event: forum_deleted\ndata: {"forum_id": 1}'
+    assert pubsub.broker.subscriber_count() == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_stream_forum_not_found(async_client: AsyncClient) -> None:
+    """
+    存在しない掲示板の配信を要求した場合に404を返却することを確認するテスト
+    """
+    response: Response = await async_client.get("/forums/1/comments/stream")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert pubsub.broker.subscriber_count() == 0
+    return None
@@ -0,0 +1,106 @@
+"""
+データベース接続の設定
+src/settings.py, src/database.py
+"""
+
+import time
+from pathlib import Path
+import pytest
+from httpx import AsyncClient, ASGITransport, Response
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.database import LAST_WRITE_COOKIE, PoolStats, create_engine_from_settings, get_pool_stats, wrote_recently
+from src.middleware import ReadYourWritesMiddleware
+from src.settings import Settings, settings
+
+
+def test_settings_from_environ() -> None:
+    """
+    環境変数から設定を読み込むテスト
+    """
+    environ: dict = {
+        "DATABASE_URL": "sqlite+aiosqlite:///forum.sqlite3",
+        "DATABASE_ECHO": "true",
+        "DATABASE_POOL_SIZE": "20",
+        "DATABASE_POOL_TIMEOUT": "2.5",
+    }
+    settings: Settings = Settings.from_environ(environ)
+    assert settings.database_url == "sqlite+aiosqlite:///forum.sqlite3"
+    assert settings.database_echo is True
+    assert settings.database_pool_size == 20
+    assert settings.database_pool_timeout == 2.5
+    # 指定されていない項目は既定値を使用する。
+    assert settings.database_max_overflow == Settings().database_max_overflow
+    return None
+
+
+def test_settings_invalid_value() -> None:
+    """
+    環境変数の値が不正な場合にValueErrorが送出されることを確認するテスト
+    """
+    with pytest.raises(ValueError):
+        Settings.from_environ({"DATABASE_POOL_SIZE": "many"})
+    with pytest.raises(ValueError):
+        Settings.from_environ({"DATABASE_ECHO": "maybe"})
+    with pytest.raises(ValueError):
+        Settings.from_environ({"PUBSUB_BROKER": "redis"})
+    return None
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(tmp_path: Path) -> None:
+    """
+    コネクションプールから接続を取得した回数と待機時間が記録されることを確認するテスト
+    """
+    url: str = f"sqlite+aiosqlite:///{tmp_path / 'forum.sqlite3'}"
+    engine = create_engine_from_settings(url, Settings(database_pool_size=1))
+    try:
+        for _ in range(3):
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        stats: PoolStats | None = get_pool_stats(engine)
+        assert stats is not None
+        assert stats.checkouts == 3
+        assert stats.timeouts == 0
+        assert stats.max_wait_seconds >= stats.average_wait_seconds >= 0.0
+    finally:
+        await engine.dispose()
+    return None
+
+
+def test_wrote_recently() -> None:
+    """
+    直近に書き込みを行ったクライアントを判定するテスト
+    """
+    now: float = time.time()
+    assert wrote_recently({LAST_WRITE_COOKIE: str(now - 1.0)}, now) is True
+    assert wrote_recently({LAST_WRITE_COOKIE: str(now - settings.read_your_writes_seconds)}, now) is False
+    assert wrote_recently({LAST_WRITE_COOKIE: "invalid"}, now) is False
+    assert wrote_recently({}, now) is False
+    return None
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes_middleware() -> None:
+    """
+    書き込みに成功した場合のみ書き込み時刻のCookieが設定されることを確認するテスト
+    """
+
+    async def endpoint(request) -> PlainTextResponse:  # type: ignore
+        status_code: int = int(request.query_params.get("status", "200"))
+        return PlainTextResponse("ok", status_code=status_code)
+
+    app = Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])
+    app.add_middleware(ReadYourWritesMiddleware, cookie_name=LAST_WRITE_COOKIE, max_age=5.0)
+    transport = ASGITransport(app=app)  # type: ignore
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response: Response = await client.post("/")
+        assert LAST_WRITE_COOKIE in response.cookies
+        response = await client.get("/")
+        assert "set-cookie" not in response.headers
+        response = await client.post("/", params={"status": 404})
+        assert "set-cookie" not in response.headers
+    return None
@@ -0,0 +1,111 @@
+"""
+エクスポート
+GET:/export.ndjson
+"""
+
+import json
+from datetime import datetime
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+from src.cruds import export as export_crud
+
+
+async def create_forums_and_comments(async_client: AsyncClient) -> None:
+    """
+    3件の掲示板を作成し、掲示板ID1に2件、掲示板ID3に1件のコメントを作成する。
+    """
+    request_body: dict = {
+        "title": "title_value",
+        "content": "content_value",
+    }
+    for _ in range(3):
+        await async_client.post("/forums", json=request_body)
+    for forum_id in (1, 1, 3):
+        await async_client.post(f"/forums/{forum_id}/comments", json={"comment": "comment_value"})
+    return None
+
+
+async def export(async_client: AsyncClient, params: dict) -> list[tuple]:
+    """
+    エクスポートして、各行の(type, forum_id, comment_id)を返却する。
+    """
+    response: Response = await async_client.get("/export.ndjson", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records: list[dict] = [json.loads(line) for line in response.text.splitlines()]
+    return [(record["type"], record["forum_id"], record.get("comment_id")) for record in records]
+
+
+@pytest.mark.asyncio
+async def test_export(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    掲示板の行の後にその掲示板のコメントの行が続くことを確認するテスト
+    """
+    await create_forums_and_comments(async_client)
+    # 複数回に分けて取得した場合も同じ結果になる。
+    monkeypatch.setattr(export_crud, "EXPORT_BATCH_SIZE", 2)
+    assert await export(async_client, {}) == [
+        ("forum", 1, None),
+        ("comment", 1, 1),
+        ("comment", 1, 2),
+        ("forum", 2, None),
+        ("forum", 3, None),
+        ("comment", 3, 1),
+    ]
+    response: Response = await async_client.get("/export.ndjson")
+    forum: dict = json.loads(response.text.splitlines()[0])
+    assert forum["title"] == "title_value"
+    assert forum["content"] == "content_value"
+    assert forum["comment_count"] == 2
+    datetime.fromisoformat(forum["created_at"])
+    comment: dict = json.loads(response.text.splitlines()[1])
+    assert comment["comment"] == "comment_value"
+    datetime.fromisoformat(comment["updated_at"])
+    return None
+
+
+@pytest.mark.asyncio
+async def test_export_updated_since(async_client: AsyncClient) -> None:
+    """
+    updated_since以降に更新された掲示板とコメントのみを取得するテスト
+    """
+    await create_forums_and_comments(async_client)
+    updated_since: str = datetime.now().isoformat()
+    await async_client.put("/forums/2", json={"title": "title_value_edit", "content": "content_value_edit"})
+    await async_client.put("/forums/3/comments/1", json={"comment": "comment_value_edit"})
+    await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    # 掲示板が更新されていなくても、更新されたコメントがある掲示板は掲示板の行も取得する。
+    assert await export(async_client, {"updated_since": updated_since}) == [
+        ("forum", 1, None),
+        ("comment", 1, 3),
+        ("forum", 2, None),
+        ("forum", 3, None),
+        ("comment", 3, 1),
+    ]
+    # コメントの作成で変わったコメント数も取得できる。
+    response: Response = await async_client.get("/export.ndjson", params={"updated_since": updated_since})
+    assert json.loads(response.text.splitlines()[0])["comment_count"] == 3
+    return None
+
+
+@pytest.mark.asyncio
+async def test_export_zero_forum(async_client: AsyncClient) -> None:
+    """
+    掲示板が存在しない場合は空のレスポンスを返却することを確認するテスト
+    """
+    assert await export(async_client, {}) == []
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_422(async_client: AsyncClient) -> None:
+    """
+    ResponseCode422を確認するテスト
+    """
+    response: Response = await async_client.get("/export.ndjson", params={"updated_since": "invalid"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response_body: dict = response.json()
+    assert "detail" in response_body
+    return None
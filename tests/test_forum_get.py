@@ -51,6 +51,72 @@ async def test_get_forum(async_client: AsyncClient) -> None:
     return None
 
 
+@pytest.mark.asyncio
+async def test_response_code_304(async_client: AsyncClient) -> None:
+    """
+    ResponseCode304を確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def get_forum_and_check_etag() -> None:
+        """
+        掲示板を取得し、同じETagで再取得すると304になり、変更後は200になることを確認する。
+        """
+        endpoint: str = "/forums/1"
+        response: Response = await async_client.get(endpoint)
+        assert response.status_code == status.HTTP_200_OK
+        etag: str = response.headers["ETag"]
+        headers: dict = {"If-None-Match": etag}
+        response = await async_client.get(endpoint, headers=headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        # 掲示板を編集すると304にならない。
+        request_body: dict = {
+            "title": "title_value_edit",
+            "content": "content_value_edit",
+        }
+        await async_client.put(endpoint, json=request_body)
+        response = await async_client.get(endpoint, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        return None
+
+    await create_forum()
+    await get_forum_and_check_etag()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_200_after_comment_deleted(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントを作成して削除した場合、コメント数が同じでも最終コメント日時が変わるため304にならないことを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    response: Response = await async_client.get("/forums/1")
+    assert response.status_code == status.HTTP_200_OK
+    headers: dict = {"If-None-Match": response.headers["ETag"]}
+    await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    await async_client.delete("/forums/1/comments/1")
+    response = await async_client.get("/forums/1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != headers["If-None-Match"]
+    assert response.json()["comment_count"] == 0
+    return None
+
+
 @pytest.mark.asyncio
 async def test_response_code_404(async_client: AsyncClient) -> None:
     """
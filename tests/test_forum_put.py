@@ -50,8 +50,24 @@ async def test_edit_forum(async_client: AsyncClient) -> None:
         datetime.strptime(response_body["updated_at"], "%Y-%m-%dT%H:%M:%S.%f")
         return None
 
+    async def get_forum_and_check() -> None:
+        """
+        編集後の掲示板を取得して確認する。
+        """
+        forum_id: int = 1
+        endpoint: str = f"/forums/{str(forum_id)}"
+        response: Response = await async_client.get(endpoint)
+        assert response.status_code == status.HTTP_200_OK
+        response_body: dict = response.json()
+        assert response_body["title"] == "title_value_edit"
+        assert response_body["content"] == "content_value_edit"
+        return None
+
     await create_forum()
+    # 編集前に取得して、キャッシュに登録された状態にする。
+    await async_client.get("/forums/1")
     await edit_forum_and_check()
+    await get_forum_and_check()
     return None
 
 
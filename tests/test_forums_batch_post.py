@@ -0,0 +1,89 @@
+"""
+掲示板一括作成
+POST:/forums/batch
+"""
+
+from datetime import datetime
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+
+@pytest.mark.asyncio
+async def test_create_three_forums(async_client: AsyncClient) -> None:
+    """
+    3件の掲示板を一括作成するテスト
+    """
+
+    async def create_forums_and_check() -> None:
+        """
+        掲示板を一括作成して確認する。
+        """
+        request_body: list[dict] = [
+            {"title": f"title_value_{end_string}", "content": f"content_value_{end_string}"}
+            for end_string in ["first", "second", "third"]
+        ]
+        response: Response = await async_client.post("/forums/batch", json=request_body)
+        assert response.status_code == status.HTTP_201_CREATED
+        response_body: dict = response.json()
+        assert response_body["next_cursor"] is None
+        # リクエストの順に、採番されたforum_idとともに返却される。
+        forums: list[dict] = response_body["forums"]
+        assert [forum["forum_id"] for forum in forums] == [1, 2, 3]
+        assert [forum["title"] for forum in forums] == [
+            "title_value_first",
+            "title_value_second",
+            "title_value_third",
+        ]
+        assert forums[2]["content"] == "content_value_third"
+        # 日付変換はassert未使用だが失敗したら例外が発生する。
+        datetime.strptime(forums[0]["created_at"], "%Y-%m-%dT%H:%M:%S.%f")
+        datetime.strptime(forums[0]["updated_at"], "%Y-%m-%dT%H:%M:%S.%f")
+        return None
+
+    async def get_forums_and_check() -> None:
+        """
+        作成した掲示板を取得できることを確認する。
+        """
+        response: Response = await async_client.get("/forums")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["forums"]) == 3
+        return None
+
+    await create_forums_and_check()
+    await get_forums_and_check()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_create_after_single_create(async_client: AsyncClient) -> None:
+    """
+    1件ずつ作成した掲示板の後に一括作成した場合、forum_idが続きから採番されることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    request_body: list[dict] = [{"title": "title_value", "content": "content_value"}] * 2
+    response: Response = await async_client.post("/forums/batch", json=request_body)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [forum["forum_id"] for forum in response.json()["forums"]] == [2, 3]
+    return None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        [],
+        [{"title": "title_value", "content": "content_value"}] * 1001,
+        [{"title": "title_value", "content": "content_value"}, {"title": "a" * 21, "content": "content_value"}],
+        {"title": "title_value", "content": "content_value"},
+    ],
+)
+async def test_response_code_422(async_client: AsyncClient, request_body: list | dict) -> None:
+    """
+    件数や内容が不正な場合は422を返却し、1件も作成しないことを確認するテスト
+    """
+    response: Response = await async_client.post("/forums/batch", json=request_body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.get("/forums")
+    assert len(response.json()["forums"]) == 0
+    return None
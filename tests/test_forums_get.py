@@ -66,3 +66,202 @@ async def test_get_three_forums(async_client: AsyncClient) -> None:
     await create_three_forums()
     await get_three_forums_and_check()
     return None
+
+
+@pytest.mark.asyncio
+async def test_get_forums_with_cursor(async_client: AsyncClient) -> None:
+    """
+    カーソルを使用して掲示板をページごとに取得するテスト
+    """
+
+    async def create_five_forums() -> None:
+        """
+        5件の掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        for _ in range(5):
+            await async_client.post(
+                "/forums",
+                json=request_body,
+            )
+        return None
+
+    async def get_forums_by_page_and_check() -> None:
+        """
+        2件ずつ掲示板を取得して確認する。
+        """
+        forum_ids: list[int] = list()
+        params: dict = {"limit": 2}
+        for expected_count in [2, 2, 1]:
+            response: Response = await async_client.get("/forums", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            response_body: dict = response.json()
+            assert len(response_body["forums"]) == expected_count
+            forum_ids += [forum["forum_id"] for forum in response_body["forums"]]
+            params["cursor"] = response_body["next_cursor"]
+        # 最終ページには次ページのカーソルが存在しない。
+        assert params["cursor"] is None
+        assert forum_ids == [5, 4, 3, 2, 1]
+        return None
+
+    await create_five_forums()
+    await get_forums_by_page_and_check()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_get_forums_sorted_by_activity(async_client: AsyncClient) -> None:
+    """
+    最終コメント日の降順で掲示板をページごとに取得するテスト
+    """
+
+    async def create_five_forums_and_comments() -> None:
+        """
+        5件の掲示板を作成し、掲示板ID2と4の順にコメントを作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        for _ in range(5):
+            await async_client.post("/forums", json=request_body)
+        for forum_id in (2, 4):
+            await async_client.post(f"/forums/{forum_id}/comments", json={"comment": "comment_value"})
+        return None
+
+    async def get_forums_by_page_and_check() -> None:
+        """
+        2件ずつ掲示板を取得して確認する。
+        """
+        forum_ids: list[int] = list()
+        params: dict = {"limit": 2, "sort": "activity"}
+        for expected_count in [2, 2, 1]:
+            response: Response = await async_client.get("/forums", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            response_body: dict = response.json()
+            assert len(response_body["forums"]) == expected_count
+            forum_ids += [forum["forum_id"] for forum in response_body["forums"]]
+            params["cursor"] = response_body["next_cursor"]
+        assert params["cursor"] is None
+        # コメントされた掲示板が新しい順に並び、以降は作成日の新しい順に並ぶ。
+        assert forum_ids == [4, 2, 5, 3, 1]
+        return None
+
+    await create_five_forums_and_comments()
+    await get_forums_by_page_and_check()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_304(async_client: AsyncClient) -> None:
+    """
+    ResponseCode304を確認するテスト
+    """
+
+    async def create_forum() -> None:
+        """
+        掲示板を作成する。
+        """
+        request_body: dict = {
+            "title": "title_value",
+            "content": "content_value",
+        }
+        await async_client.post(
+            "/forums",
+            json=request_body,
+        )
+        return None
+
+    async def get_forums_and_check_etag(params: dict) -> None:
+        """
+        掲示板一覧を取得し、同じETagで再取得すると304になり、変更後は200になることを確認する。
+        """
+        response: Response = await async_client.get("/forums", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        etag: str = response.headers["ETag"]
+        headers: dict = {"If-None-Match": etag}
+        response = await async_client.get("/forums", params=params, headers=headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+        # 掲示板を編集すると304にならない。
+        request_body: dict = {
+            "title": "title_value_edit",
+            "content": "content_value_edit",
+        }
+        await async_client.put("/forums/1", json=request_body)
+        response = await async_client.get("/forums", params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        # 掲示板コメントを作成すると304にならない。
+        headers = {"If-None-Match": response.headers["ETag"]}
+        await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+        response = await async_client.get("/forums", params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != headers["If-None-Match"]
+        return None
+
+    for _ in range(3):
+        await create_forum()
+    await get_forums_and_check_etag({})
+    await get_forums_and_check_etag({"limit": 3})
+    await get_forums_and_check_etag({"limit": 2, "sort": "activity"})
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_200_after_comment_deleted(async_client: AsyncClient) -> None:
+    """
+    掲示板コメントを作成して削除した場合、コメント数が同じでも最終コメント日時が変わるため304にならないことを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    response: Response = await async_client.get("/forums")
+    assert response.status_code == status.HTTP_200_OK
+    headers: dict = {"If-None-Match": response.headers["ETag"]}
+    await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    await async_client.delete("/forums/1/comments/1")
+    response = await async_client.get("/forums", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != headers["If-None-Match"]
+    assert response.json()["forums"][0]["comment_count"] == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_400(async_client: AsyncClient) -> None:
+    """
+    ResponseCode400を確認するテスト
+    """
+    params: dict = {"limit": 2, "cursor": "invalid_cursor"}
+    response: Response = await async_client.get("/forums", params=params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response_body: dict = response.json()
+    assert "detail" in response_body
+    # 並び順が異なるカーソルは使用できない。
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    response = await async_client.get("/forums", params={"limit": 1})
+    params = {"limit": 1, "sort": "activity", "cursor": response.json()["next_cursor"]}
+    response = await async_client.get("/forums", params=params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_422(async_client: AsyncClient) -> None:
+    """
+    ResponseCode422を確認するテスト
+    """
+    params: dict = {"limit": 0}
+    response: Response = await async_client.get("/forums", params=params)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response_body: dict = response.json()
+    assert "detail" in response_body
+    for detail in response_body["detail"]:
+        assert "type" in detail
+        assert "loc" in detail
+        assert "msg" in detail
+    return None
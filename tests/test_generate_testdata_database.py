@@ -0,0 +1,60 @@
+"""
+負荷試験用のテストデータ生成
+python -m src.generate_testdata_database
+"""
+
+import random
+from pathlib import Path
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from src import generate_testdata_database
+
+
+def test_comment_counts() -> None:
+    """
+    掲示板ごとのコメント数の合計が指定した件数になり、シードが同じであれば同じ結果になることを確認するテスト
+    """
+    for distribution in ("zipf", "uniform"):
+        counts = generate_testdata_database.comment_counts(100, 1234, distribution, 1.1, random.Random(1))
+        assert len(counts) == 100
+        assert sum(counts) == 1234
+        assert counts == generate_testdata_database.comment_counts(100, 1234, distribution, 1.1, random.Random(1))
+    # Zipf分布の場合は一部の掲示板にコメントが集中する。
+    zipf = generate_testdata_database.comment_counts(100, 1234, "zipf", 1.1, random.Random(1))
+    assert max(zipf) > 1234 // 10
+    uniform = generate_testdata_database.comment_counts(100, 1234, "uniform", 1.1, random.Random(1))
+    assert max(uniform) - min(uniform) <= 1
+    return None
+
+
+@pytest.mark.asyncio
+async def test_generate(tmp_path: Path) -> None:
+    """
+    テストデータを生成し、コメントIDの採番値とコメント数がコメントの件数と一致することを確認するテスト
+    """
+    url: str = f"sqlite+aiosqlite:///{tmp_path / 'generate.db'}"
+    await generate_testdata_database.generate(url, forums=20, comments=300, seed=1, batch_size=7, migrate=True)
+    # 既存のデータの続きから作成する。
+    await generate_testdata_database.generate(url, forums=5, comments=10, seed=1, batch_size=7)
+    async_engine: AsyncEngine = create_async_engine(url)
+    async with async_engine.connect() as connection:
+        forum_count = (await connection.execute(text("SELECT count(*) FROM forum"))).scalar_one()
+        comment_count = (await connection.execute(text("SELECT count(*) FROM Comment"))).scalar_one()
+        mismatches = (
+            await connection.execute(
+                text(
+                    "SELECT count(*) FROM forum WHERE last_comment_id != "
+                    "(SELECT coalesce(max(comment_id), 0) FROM Comment WHERE Comment.forum_id = forum.forum_id) "
+                    "OR comment_count != (SELECT count(*) FROM Comment WHERE Comment.forum_id = forum.forum_id) "
+                    "OR last_commented_at != (SELECT coalesce(max(Comment.created_at), forum.created_at) "
+                    "FROM Comment WHERE Comment.forum_id = forum.forum_id)"
+                )
+            )
+        ).scalar_one()
+    await async_engine.dispose()
+    assert forum_count == 25
+    assert comment_count == 310
+    assert mismatches == 0
+    return None
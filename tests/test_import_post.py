@@ -0,0 +1,177 @@
+"""
+インポート
+POST:/import
+"""
+
+import json
+from typing import AsyncIterator
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+from src.cruds import importing as importing_crud
+
+
+def to_ndjson(records: list[dict | str]) -> bytes:
+    """
+    レコードをNDJSONに変換する。文字列はそのまま1行とする。
+    """
+    lines: list[str] = [record if isinstance(record, str) else json.dumps(record) for record in records]
+    return "\n".join(lines).encode() + b"\n"
+
+
+async def split_chunks(content: bytes, size: int) -> AsyncIterator[bytes]:
+    """
+    リクエストボディをsizeバイトずつに分割して送信する。
+    """
+    for start in range(0, len(content), size):
+        yield content[start : start + size]
+
+
+@pytest.mark.asyncio
+async def test_import_exported(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    エクスポートした掲示板とコメントを、IDを置き換えてインポートできることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_1", "content": "content_1"})
+    await async_client.post("/forums", json={"title": "title_2", "content": "content_2"})
+    for comment in ("comment_1", "comment_2"):
+        await async_client.post("/forums/2/comments", json={"comment": comment})
+    exported: bytes = (await async_client.get("/export.ndjson")).content
+    # 行の途中で分割して受信し、複数回に分けて作成する。
+    monkeypatch.setattr(importing_crud, "IMPORT_BATCH_SIZE", 2)
+    response: Response = await async_client.post("/import", content=split_chunks(exported, 7))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"forums": 2, "comments": 2, "error_count": 0, "errors": []}
+    # インポートした掲示板は新しいIDで作成され、コメントは新しい掲示板に作成される。
+    response = await async_client.get("/forums/4/comments")
+    assert [comment["comment"] for comment in response.json()["comments"]] == ["comment_1", "comment_2"]
+    response = await async_client.get("/forums/3")
+    assert response.json()["title"] == "title_1"
+    assert response.json()["comment_count"] == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_import_with_errors(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    検証できない行をエラーとして返却し、残りの行をインポートすることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    content: bytes = to_ndjson(
+        [
+            {"type": "forum", "forum_id": 10, "title": "title_value", "content": "content_value"},
+            "invalid json",
+            {"type": "unknown"},
+            {"type": "forum", "forum_id": 11, "title": "x" * 21, "content": "content_value"},
+            {"type": "comment", "forum_id": 11, "comment": "comment_value"},
+            {"type": "comment", "forum_id": 10, "comment": "comment_value"},
+            "",
+            {"type": "comment", "forum_id": 1, "comment": "comment_value"},
+            {"type": "comment", "forum_id": 999, "comment": "comment_value"},
+            {"type": "comment", "comment": "comment_value"},
+            {"type": "comment", "forum_id": 10, "comment": "x" * 101},
+        ]
+    )
+    monkeypatch.setattr(importing_crud, "IMPORT_BATCH_SIZE", 3)
+    response: Response = await async_client.post("/import", content=content)
+    assert response.status_code == status.HTTP_200_OK
+    response_body: dict = response.json()
+    assert response_body["forums"] == 1
+    assert response_body["comments"] == 2
+    assert response_body["error_count"] == 7
+    # 空行は行番号に含めるが、エラーにはしない。作成時のエラーも行番号の順に返却する。
+    assert [error["line"] for error in response_body["errors"]] == [2, 3, 4, 5, 9, 10, 11]
+    for error in response_body["errors"]:
+        assert error["detail"] != ""
+    # エクスポート元のforum_id10は作成した掲示板ID2に、forum_id1は既存の掲示板ID1になる。
+    assert (await async_client.get("/forums/1")).json()["comment_count"] == 1
+    assert (await async_client.get("/forums/2")).json()["comment_count"] == 1
+    return None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [1, 2, 500])
+async def test_import_forward_reference(
+    async_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    batch_size: int,
+) -> None:
+    """
+    コメントの行は、それより前の掲示板の行のみを参照し、一度に作成する行数によらず同じ結果になることを確認するテスト
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    content: bytes = to_ndjson(
+        [
+            {"type": "forum", "forum_id": 2, "title": "title_2", "content": "content_value"},
+            # forum_id1の掲示板の行はこの行より後にあるため、既存の掲示板ID1に作成する。
+            {"type": "comment", "forum_id": 1, "comment": "comment_1"},
+            {"type": "forum", "forum_id": 1, "title": "title_1", "content": "content_value"},
+            # forum_id1の掲示板の行を作成した掲示板ID3に作成する。
+            {"type": "comment", "forum_id": 1, "comment": "comment_2"},
+            # 存在しない掲示板を参照する行は、後にその掲示板の行があってもエラーとする。
+            {"type": "comment", "forum_id": 7, "comment": "comment_3"},
+            {"type": "forum", "forum_id": 7, "title": "title_7", "content": "content_value"},
+        ]
+    )
+    monkeypatch.setattr(importing_crud, "IMPORT_BATCH_SIZE", batch_size)
+    response: Response = await async_client.post("/import", content=content)
+    assert response.status_code == status.HTTP_200_OK
+    response_body: dict = response.json()
+    assert response_body["forums"] == 3
+    assert response_body["comments"] == 2
+    assert [error["line"] for error in response_body["errors"]] == [5]
+    for forum_id, comment in ((1, "comment_1"), (3, "comment_2")):
+        response = await async_client.get(f"/forums/{forum_id}/comments")
+        assert [comment["comment"] for comment in response.json()["comments"]] == [comment]
+    assert (await async_client.get("/forums/4")).json()["comment_count"] == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_import_too_many_forum_ids(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    forum_idを指定した掲示板の行が上限を超えた場合は、以降の行をインポートしないことを確認するテスト
+    """
+    monkeypatch.setattr(importing_crud, "MAX_FORUM_ID_MAPPINGS", 2)
+    content: bytes = to_ndjson(
+        [
+            {"type": "forum", "forum_id": 1, "title": "title_value", "content": "content_value"},
+            {"type": "forum", "forum_id": 2, "title": "title_value", "content": "content_value"},
+            # 同じforum_idの行は件数に含めない。
+            {"type": "forum", "forum_id": 2, "title": "title_value", "content": "content_value"},
+            {"type": "forum", "forum_id": 3, "title": "title_value", "content": "content_value"},
+            {"type": "comment", "forum_id": 1, "comment": "comment_value"},
+        ]
+    )
+    response: Response = await async_client.post("/import", content=content)
+    assert response.status_code == status.HTTP_200_OK
+    response_body: dict = response.json()
+    assert response_body["forums"] == 3
+    assert response_body["comments"] == 0
+    assert [error["line"] for error in response_body["errors"]] == [4]
+    return None
+
+
+@pytest.mark.asyncio
+async def test_import_long_line(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    上限を超えた長さの行を読み飛ばし、返却するエラーの件数が上限までになることを確認するテスト
+    """
+    monkeypatch.setattr(importing_crud, "MAX_LINE_BYTES", 80)
+    monkeypatch.setattr(importing_crud, "MAX_REPORTED_ERRORS", 2)
+    content: bytes = to_ndjson(
+        [
+            {"type": "forum", "title": "title_value", "content": "x" * 100},
+            {"type": "forum", "title": "title_value", "content": "content_value"},
+            "invalid json",
+            "invalid json",
+        ]
+    )
+    response: Response = await async_client.post("/import", content=split_chunks(content, 16))
+    assert response.status_code == status.HTTP_200_OK
+    response_body: dict = response.json()
+    assert response_body["forums"] == 1
+    assert response_body["error_count"] == 3
+    assert [error["line"] for error in response_body["errors"]] == [1, 3]
+    return None
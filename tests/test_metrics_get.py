@@ -0,0 +1,119 @@
+"""
+メトリクス取得
+GET:/metrics
+"""
+
+import re
+import pytest
+from httpx import AsyncClient, Response
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette import status
+
+
+def get_sample(text: str, name: str, labels: str = "") -> float:
+    """
+    メトリクスのテキストから、指定した名前とラベルの値を取得する。存在しない場合は0を返却する。
+    """
+    match = re.search(rf"^{re.escape(name + labels)} (\S+)$", text, re.MULTILINE)
+    return 0.0 if match is None else float(match.group(1))
+
+
+@pytest.mark.asyncio
+async def test_get_metrics(async_client: AsyncClient) -> None:
+    """
+    ルートのテンプレートごとに、リクエスト数とクエリ数を集計することを確認するテスト
+    """
+    route_labels: str = '{method="GET",route="/forums/{forum_id}",status="200"}'
+    query_labels: str = '{method="GET",route="/forums/{forum_id}"}'
+
+    async def get_metrics() -> str:
+        """
+        メトリクスを取得する。
+        """
+        response: Response = await async_client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        return response.text
+
+    async def create_and_get_forums() -> None:
+        """
+        掲示板を作成して、キャッシュを使用せずに2件取得する。
+        """
+        for _ in range(2):
+            await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+        await async_client.get("/forums/1")
+        await async_client.get("/forums/2")
+        await async_client.get("/forums/999")
+        return None
+
+    before: str = await get_metrics()
+    await create_and_get_forums()
+    after: str = await get_metrics()
+    # URLではなくルートのテンプレートで集計する。
+    assert get_sample(after, "http_responses_total", route_labels) - get_sample(
+        before, "http_responses_total", route_labels
+    ) == 2
+    assert get_sample(after, "http_responses_total", route_labels.replace("200", "404")) - get_sample(
+        before, "http_responses_total", route_labels.replace("200", "404")
+    ) == 1
+    assert "/forums/1" not in after
+    # キャッシュに存在しない掲示板の取得は、1リクエストで1回のクエリを実行する。
+    assert get_sample(after, "http_request_db_queries_sum", query_labels) - get_sample(
+        before, "http_request_db_queries_sum", query_labels
+    ) == 3
+    assert get_sample(after, "http_request_duration_seconds_count", query_labels) - get_sample(
+        before, "http_request_duration_seconds_count", query_labels
+    ) == 3
+    # /metrics自身の処理中のリクエストが含まれる。
+    assert get_sample(after, "http_requests_in_flight") == 1
+    assert get_sample(after, "cache_misses_total", '{cache="forum"}') >= 3
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in after
+    return None
+
+
+@pytest.mark.asyncio
+async def test_unmatched_route(async_client: AsyncClient) -> None:
+    """
+    ルートに一致しないリクエストは、URLを含めずに集計することを確認するテスト
+    """
+    await async_client.get("/not_found_path")
+    response: Response = await async_client.get("/metrics")
+    assert '{method="GET",route="unmatched",status="404"}' in response.text
+    assert "/not_found_path" not in response.text
+    return None
+
+
+@pytest.mark.asyncio
+async def test_failed_query(async_client: AsyncClient) -> None:
+    """
+    失敗したクエリの開始時刻が接続に残らないことを確認するテスト
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            await connection.execute(text("SELECT * FROM missing_table"))
+        assert connection.sync_connection.info.get("query_started") == []  # type: ignore
+        await connection.execute(text("SELECT 1"))
+        assert connection.sync_connection.info.get("query_started") == []  # type: ignore
+    await engine.dispose()
+    return None
+
+
+@pytest.mark.asyncio
+async def test_streaming_response(async_client: AsyncClient) -> None:
+    """
+    ストリーミングのレスポンスは、ステータスコードのみ集計し、処理時間を集計しないことを確認するテスト
+    """
+    labels: str = '{method="GET",route="/export.ndjson"}'
+    response: Response = await async_client.get("/metrics")
+    responses: float = get_sample(response.text, "http_responses_total", '{method="GET",route="/export.ndjson",status="200"}')
+    duration_count: float = get_sample(response.text, "http_request_duration_seconds_count", labels)
+    await async_client.get("/export.ndjson")
+    response = await async_client.get("/metrics")
+    assert get_sample(response.text, "http_responses_total", '{method="GET",route="/export.ndjson",status="200"}') == responses + 1
+    assert get_sample(response.text, "http_request_duration_seconds_count", labels) == duration_count
+    # 処理中のリクエストは/metricsのみとなる。
+    assert get_sample(response.text, "http_requests_in_flight") == 1
+    return None
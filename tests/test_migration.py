@@ -0,0 +1,167 @@
+"""
+データベースのマイグレーション
+python -m src.migrate_database
+"""
+
+import datetime
+from pathlib import Path
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from src import migrate_database
+from src.database import Base
+
+
+def _get_schema(connection: Connection) -> dict:
+    """
+    テーブルごとのカラム名とインデックス名を取得する。
+    """
+    inspector = inspect(connection)
+    return {
+        table_name: (
+            sorted(column["name"] for column in inspector.get_columns(table_name)),
+            sorted(index["name"] for index in inspector.get_indexes(table_name)),
+        )
+        for table_name in inspector.get_table_names()
+        if table_name != "alembic_version"
+    }
+
+
+@pytest.mark.asyncio
+async def test_upgrade_matches_models(tmp_path: Path) -> None:
+    """
+    空のデータベースを最新まで更新すると、モデルと同じテーブル構造になることを確認するテスト
+    """
+
+    async def get_schema(url: str, migrate: bool) -> dict:
+        """
+        マイグレーションまたはモデルからテーブルを作成して、テーブル構造を取得する。
+        """
+        async_engine: AsyncEngine = create_async_engine(url)
+        async with async_engine.begin() as connection:
+            if migrate:
+                await connection.run_sync(migrate_database.upgrade)
+            else:
+                await connection.run_sync(Base.metadata.create_all)
+            schema: dict = await connection.run_sync(_get_schema)
+        await async_engine.dispose()
+        return schema
+
+    migrated: dict = await get_schema(f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}", True)
+    created: dict = await get_schema(f"sqlite+aiosqlite:///{tmp_path / 'created.db'}", False)
+    assert migrated == created
+    assert "ix_forum_updated_at" in migrated["forum"][1]
+    assert "ix_Comment_forum_id_created_at" in migrated["Comment"][1]
+    assert "ix_Comment_forum_id_updated_at" in migrated["Comment"][1]
+    return None
+
+
+@pytest.mark.asyncio
+async def test_upgrade_unversioned_database(tmp_path: Path) -> None:
+    """
+    マイグレーション導入前のデータベースを、データを残したまま更新できることを確認するテスト
+    """
+    async_engine: AsyncEngine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+
+    def create_legacy_database(connection: Connection) -> None:
+        """
+        reset_database()で作成していた時点のテーブルとデータを作成する。
+        """
+        migrate_database.upgrade(connection, migrate_database.BASELINE_REVISION)
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+        now = datetime.datetime(2024, 1, 1)
+        connection.execute(
+            text("INSERT INTO forum (forum_id, title, content, created_at, updated_at) VALUES (1, 't', 'c', :now, :now)"),
+            {"now": now},
+        )
+        for comment_id in (1, 2, 5):
+            connection.execute(
+                text("INSERT INTO Comment VALUES (1, :comment_id, 'c', :created_at, :created_at)"),
+                {"comment_id": comment_id, "created_at": now + datetime.timedelta(days=comment_id)},
+            )
+        return None
+
+    async with async_engine.begin() as connection:
+        await connection.run_sync(create_legacy_database)
+    async with async_engine.begin() as connection:
+        await connection.run_sync(migrate_database.upgrade)
+    async with async_engine.connect() as connection:
+        last_comment_id = (await connection.execute(text("SELECT last_comment_id FROM forum"))).scalar_one()
+        last_commented_at = (
+            await connection.execute(text("SELECT last_commented_at FROM forum"))
+        ).scalar_one()
+        comment_count = (await connection.execute(text("SELECT count(*) FROM Comment"))).scalar_one()
+        version = (await connection.execute(text("SELECT version_num FROM alembic_version"))).scalar_one()
+    await async_engine.dispose()
+    # 既存のコメントIDの最大値が採番値として設定される。
+    assert last_comment_id == 5
+    # コメントの作成日時の最大値が最終コメント日時として設定される。
+    assert datetime.datetime.fromisoformat(last_commented_at) == datetime.datetime(2024, 1, 6)
+    assert comment_count == 3
+    assert version == "0006"
+    return None
+
+
+@pytest.mark.asyncio
+async def test_downgrade_to_baseline(tmp_path: Path) -> None:
+    """
+    最新から基準のリビジョンまで戻せることを確認するテスト
+    """
+    async_engine: AsyncEngine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'downgrade.db'}")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(migrate_database.upgrade)
+        await connection.run_sync(migrate_database.downgrade, migrate_database.BASELINE_REVISION)
+        schema: dict = await connection.run_sync(_get_schema)
+    await async_engine.dispose()
+    assert "last_comment_id" not in schema["forum"][0]
+    assert schema["forum"][1] == []
+    assert schema["Comment"][1] == []
+    return None
+
+
+@pytest.mark.asyncio
+async def test_upgrade_builds_search_index(tmp_path: Path) -> None:
+    """
+    既存の掲示板とコメントから検索用の索引が作成されることを確認するテスト
+    """
+    async_engine: AsyncEngine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'search.db'}")
+
+    def create_database(connection: Connection) -> None:
+        """
+        検索用の索引を追加する前のテーブルとデータを作成する。
+        """
+        migrate_database.upgrade(connection, "0005")
+        now = datetime.datetime(2024, 1, 1)
+        connection.execute(
+            text(
+                "INSERT INTO forum (forum_id, title, content, last_comment_id, comment_count, "
+                "created_at, updated_at, last_commented_at) VALUES (1, '東京', '観光地', 1, 1, :now, :now, :now)"
+            ),
+            {"now": now},
+        )
+        connection.execute(
+            text("INSERT INTO Comment VALUES (1, 1, '京都', :now, :now)"),
+            {"now": now},
+        )
+        return None
+
+    async with async_engine.begin() as connection:
+        await connection.run_sync(create_database)
+        await connection.run_sync(migrate_database.upgrade)
+    async with async_engine.connect() as connection:
+        rows = (
+            await connection.execute(
+                text("SELECT token, forum_id, comment_id FROM search_index ORDER BY comment_id, token")
+            )
+        ).all()
+    await async_engine.dispose()
+    # 掲示板はcomment_idを0として、タイトルと内容を別々に分割する。
+    assert [tuple(row) for row in rows] == [
+        ("光地", 1, 0),
+        ("東京", 1, 0),
+        ("観光", 1, 0),
+        ("京都", 1, 1),
+    ]
+    return None
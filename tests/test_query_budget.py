@@ -0,0 +1,140 @@
+"""
+エンドポイントごとのクエリ数の上限
+X-Query-Count
+"""
+
+import logging
+import pytest
+from httpx import AsyncClient, ASGITransport, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from starlette import status
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.metrics import instrument_engines
+from src.middleware import QueryCountMiddleware
+
+# (メソッド, パス, リクエストボディ, クエリ数の上限)
+# 上限を超えた場合は、クエリ数が増える変更(N+1等)が行われていないか確認する。
+# 作成・更新・削除の上限には、SQLiteの検索用の索引(search_index)の更新を含む。MySQLでは索引を更新しない。
+QUERY_BUDGETS: list[tuple[str, str, dict | list | None, int]] = [
+    ("GET", "/forums", None, 1),
+    ("GET", "/forums?limit=1", None, 1),
+    ("GET", "/forums?limit=1&sort=activity", None, 1),
+    ("POST", "/forums", {"title": "title_value", "content": "content_value"}, 2),
+    ("POST", "/forums/batch", [{"title": "title_value", "content": "content_value"}] * 3, 2),
+    ("GET", "/forums/1", None, 1),
+    ("GET", "/forums/999", None, 1),
+    ("PUT", "/forums/1", {"title": "title_value", "content": "content_value"}, 3),
+    ("DELETE", "/forums/1", None, 3),
+    ("GET", "/forums/1/comments", None, 1),
+    ("GET", "/forums/1/comments?limit=1", None, 1),
+    ("GET", "/forums/999/comments", None, 1),
+    ("POST", "/forums/1/comments", {"comment": "comment_value"}, 3),
+    ("POST", "/forums/1/comments/batch", [{"comment": "comment_value"}] * 3, 3),
+    ("GET", "/forums/1/comments/1", None, 1),
+    ("GET", "/forums/1/comments/999", None, 1),
+    ("PUT", "/forums/1/comments/1", {"comment": "comment_value"}, 3),
+    ("PUT", "/forums/1/comments/999", {"comment": "comment_value"}, 2),
+    # 削除と掲示板のコメント数の更新
+    ("DELETE", "/forums/1/comments/1", None, 3),
+    ("DELETE", "/forums/1/comments/999", None, 2),
+    ("GET", "/search?q=value", None, 1),
+]
+
+
+async def create_forum_and_comments(async_client: AsyncClient) -> None:
+    """
+    掲示板と2件の掲示板コメントを作成する。
+    """
+    await async_client.post("/forums", json={"title": "title_value", "content": "content_value"})
+    for _ in range(2):
+        await async_client.post("/forums/1/comments", json={"comment": "comment_value"})
+    return None
+
+
+def get_query_count(response: Response) -> int:
+    """
+    レスポンスヘッダーからクエリ数を取得する。
+    """
+    return int(response.headers["X-Query-Count"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, path, request_body, budget", QUERY_BUDGETS)
+async def test_query_budget(
+    async_client: AsyncClient,
+    method: str,
+    path: str,
+    request_body: dict | list | None,
+    budget: int,
+) -> None:
+    """
+    エンドポイントごとのクエリ数が上限以下であることを確認するテスト
+    """
+    await create_forum_and_comments(async_client)
+    response: Response = await async_client.request(method, path, json=request_body)
+    assert response.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert get_query_count(response) <= budget, f"{method} {path}: {get_query_count(response)} > {budget}"
+    return None
+
+
+@pytest.mark.asyncio
+async def test_query_budget_cached(async_client: AsyncClient) -> None:
+    """
+    キャッシュに存在する掲示板と掲示板コメントの取得は、クエリを実行しないことを確認するテスト
+    """
+    await create_forum_and_comments(async_client)
+    for path in ("/forums/1", "/forums/1/comments/1"):
+        await async_client.get(path)
+        response: Response = await async_client.get(path)
+        assert response.status_code == status.HTTP_200_OK
+        assert get_query_count(response) == 0
+    return None
+
+
+@pytest.mark.asyncio
+async def test_query_budget_not_modified(async_client: AsyncClient) -> None:
+    """
+    ETagが一致する一覧の取得は、集計クエリのみを実行することを確認するテスト
+    """
+    await create_forum_and_comments(async_client)
+    for path in ("/forums", "/forums/1/comments"):
+        response: Response = await async_client.get(path)
+        response = await async_client.get(path, headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert get_query_count(response) == 1
+    return None
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_warning(caplog: pytest.LogCaptureFixture) -> None:
+    """
+    同じSQLを繰り返し実行した場合に、N+1の可能性があるとして警告を出力することを確認するテスト
+    """
+    async_engine: AsyncEngine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engines()
+
+    async def endpoint(request) -> PlainTextResponse:  # type: ignore
+        async with async_engine.connect() as connection:
+            for value in range(int(request.query_params["count"])):
+                await connection.execute(text("SELECT :value"), {"value": value})
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/items/{item_id}", endpoint)])
+    app.add_middleware(QueryCountMiddleware, header_name="X-Query-Count", repeat_threshold=5)
+    transport = ASGITransport(app=app)  # type: ignore
+    with caplog.at_level(logging.WARNING, logger="src.middleware"):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response: Response = await client.get("/items/1", params={"count": 4})
+            assert get_query_count(response) == 4
+            assert len(caplog.records) == 0
+            response = await client.get("/items/1", params={"count": 5})
+            assert get_query_count(response) == 5
+    await async_engine.dispose()
+    assert len(caplog.records) == 1
+    assert "/items/{item_id}" in caplog.records[0].getMessage()
+    assert "SELECT ?" in caplog.records[0].getMessage()
+    return None
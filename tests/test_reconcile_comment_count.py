@@ -0,0 +1,47 @@
+"""
+掲示板のコメント数の修正
+python -m src.reconcile_comment_count
+"""
+
+from pathlib import Path
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from src import generate_testdata_database, reconcile_comment_count
+
+
+@pytest.mark.asyncio
+async def test_reconcile(tmp_path: Path) -> None:
+    """
+    コメント数がコメントの件数と一致しない掲示板のみ修正されることを確認するテスト
+    """
+    url: str = f"sqlite+aiosqlite:///{tmp_path / 'reconcile.db'}"
+    await generate_testdata_database.generate(url, forums=10, comments=100, seed=1, batch_size=50, migrate=True)
+    async_engine: AsyncEngine = create_async_engine(url)
+    async with async_engine.begin() as connection:
+        # コメント数をずらし、更新日時を記録する。
+        await connection.execute(text("UPDATE forum SET comment_count = comment_count + 3 WHERE forum_id IN (2, 9)"))
+        updated_at = (await connection.execute(text("SELECT updated_at FROM forum WHERE forum_id = 2"))).scalar_one()
+
+    reconciled: int = await reconcile_comment_count.reconcile(url, batch_size=3)
+    assert reconciled == 2
+    # 一致している場合は修正しない。
+    assert await reconcile_comment_count.reconcile(url, batch_size=3) == 0
+
+    async with async_engine.connect() as connection:
+        mismatches = (
+            await connection.execute(
+                text(
+                    "SELECT count(*) FROM forum WHERE comment_count != "
+                    "(SELECT count(*) FROM Comment WHERE Comment.forum_id = forum.forum_id)"
+                )
+            )
+        ).scalar_one()
+        reconciled_updated_at = (
+            await connection.execute(text("SELECT updated_at FROM forum WHERE forum_id = 2"))
+        ).scalar_one()
+    await async_engine.dispose()
+    assert mismatches == 0
+    assert reconciled_updated_at == updated_at
+    return None
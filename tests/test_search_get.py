@@ -0,0 +1,107 @@
+"""
+検索
+GET:/search
+"""
+
+import pytest
+from httpx import AsyncClient, Response
+from starlette import status
+
+
+async def create_forums_and_comments(async_client: AsyncClient) -> None:
+    """
+    検索対象の掲示板とコメントを作成する。
+    """
+    await async_client.post("/forums", json={"title": "東京の観光地", "content": "おすすめを教えてください。Tokyo"})
+    await async_client.post("/forums", json={"title": "京都の旅行", "content": "東京から京都へ行きます。"})
+    await async_client.post("/forums/1/comments", json={"comment": "東京タワーと東京スカイツリーです。"})
+    await async_client.post("/forums/1/comments", json={"comment": "浅草もおすすめです。"})
+    return None
+
+
+async def search(async_client: AsyncClient, params: dict) -> list[tuple[int, int | None]]:
+    """
+    検索して、一致した(forum_id, comment_id)を一致度の降順で返却する。
+    """
+    response: Response = await async_client.get("/search", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    return [(hit["forum_id"], hit["comment_id"]) for hit in response.json()["hits"]]
+
+
+@pytest.mark.asyncio
+async def test_search(async_client: AsyncClient) -> None:
+    """
+    掲示板とコメントを一致度の降順で検索できることを確認するテスト
+    """
+    await create_forums_and_comments(async_client)
+    response: Response = await async_client.get("/search", params={"q": "東京"})
+    assert response.status_code == status.HTTP_200_OK
+    response_body: dict = response.json()
+    # 2回出現するコメントが最も一致度が高く、同じ一致度の場合はIDの降順に並ぶ。
+    assert [(hit["forum_id"], hit["comment_id"]) for hit in response_body["hits"]] == [
+        (1, 1),
+        (2, None),
+        (1, None),
+    ]
+    assert response_body["hits"][0]["text"] == "東京タワーと東京スカイツリーです。"
+    assert response_body["hits"][1]["text"] == "京都の旅行"
+    assert response_body["hits"][0]["score"] > response_body["hits"][1]["score"]
+    assert response_body["next_offset"] is None
+    # 全角・半角や大文字・小文字を区別せず、すべての語を含むものを返却する。
+    assert await search(async_client, {"q": "京都 東京"}) == [(2, None)]
+    assert await search(async_client, {"q": "ｔｏｋｙｏ"}) == [(1, None)]
+    assert await search(async_client, {"q": "おすすめ"}) == [(1, 2), (1, None)]
+    # 一致しない場合や、2文字以上の語がない場合は空の一覧を返却する。
+    assert await search(async_client, {"q": "大阪"}) == []
+    assert await search(async_client, {"q": "東 京"}) == []
+    return None
+
+
+@pytest.mark.asyncio
+async def test_search_with_offset(async_client: AsyncClient) -> None:
+    """
+    next_offsetを使用して検索結果をページごとに取得するテスト
+    """
+    await create_forums_and_comments(async_client)
+    hits: list[tuple[int, int | None]] = list()
+    params: dict = {"q": "東京", "limit": 2}
+    for expected_count in [2, 1]:
+        response: Response = await async_client.get("/search", params=params)
+        response_body: dict = response.json()
+        assert len(response_body["hits"]) == expected_count
+        hits += [(hit["forum_id"], hit["comment_id"]) for hit in response_body["hits"]]
+        params["offset"] = response_body["next_offset"]
+    assert params["offset"] is None
+    assert hits == await search(async_client, {"q": "東京"})
+    return None
+
+
+@pytest.mark.asyncio
+async def test_search_after_edit_and_delete(async_client: AsyncClient) -> None:
+    """
+    掲示板とコメントの更新・削除が検索結果に反映されることを確認するテスト
+    """
+    await create_forums_and_comments(async_client)
+    await async_client.put("/forums/2", json={"title": "大阪の旅行", "content": "大阪へ行きます。"})
+    await async_client.put("/forums/1/comments/2", json={"comment": "大阪もおすすめです。"})
+    assert await search(async_client, {"q": "大阪"}) == [(2, None), (1, 2)]
+    assert await search(async_client, {"q": "東京"}) == [(1, 1), (1, None)]
+    await async_client.delete("/forums/1/comments/1")
+    assert await search(async_client, {"q": "東京"}) == [(1, None)]
+    await async_client.delete("/forums/1")
+    assert await search(async_client, {"q": "東京"}) == []
+    assert await search(async_client, {"q": "大阪"}) == [(2, None)]
+    return None
+
+
+@pytest.mark.asyncio
+async def test_response_code_422(async_client: AsyncClient) -> None:
+    """
+    ResponseCode422を確認するテスト
+    """
+    for params in ({}, {"q": ""}, {"q": "東京", "limit": 0}, {"q": "東京", "offset": -1}):
+        response: Response = await async_client.get("/search", params=params)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        response_body: dict = response.json()
+        assert "detail" in response_body
+    return None